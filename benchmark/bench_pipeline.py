@@ -0,0 +1,306 @@
+"""Benchmark the txt2fnt pipeline on synthetic corpora.
+
+Usage:
+    python benchmark/bench_pipeline.py [--scale 1.0] [--jobs 4] [--repeat 3]
+                                       [--output bench.json] [--compare baseline.json]
+
+Generates the corpora below in a temporary folder, then times every stage of
+the pipeline on them: extraction (`scan_files`, serial and on a process pool),
+`split_char_set`, `save_char_set` and `use_fontgen` (run against
+`benchmark/fake_fontgen.py`, so no fontgen.exe is needed). For each stage the
+best wall time of `--repeat` runs, the throughput and the tracemalloc peak (one
+extra traced run, skipped with `--no-memory`) are written to a JSON file.
+`--compare` prints the time ratio of every stage against an earlier result file
+and exits with status 1 if one got slower than `--threshold`.
+
+Corpora:
+    cjk          CJK-heavy text files with mixed punctuation
+    single_line  one huge file without any line break
+    deep_xml     deeply nested XML with text at every level
+    bad_xml      malformed XML (unclosed tags, stray '<', unknown entities)
+    tiny_files   thousands of very small text files
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_FOLDER = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_FOLDER)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util import fontgen  # noqa: E402
+from source.util.codepoint_set import CodepointSet  # noqa: E402
+from source.util.extract_char_set import save_char_set, split_char_set  # noqa: E402
+from source.util.scan_corpus import list_text_files, scan_files  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+RESULT_VERSION = 1
+FAKE_FONTGEN = os.path.join(BENCH_FOLDER, "fake_fontgen.py")
+
+# common CJK ideographs, kana, hangul, plus ASCII and punctuation
+_CJK = [chr(cp) for cp in range(0x4E00, 0x4E00 + 6000)]
+_KANA_HANGUL = [chr(cp) for cp in range(0x3041, 0x3097)] + [chr(cp) for cp in range(0xAC00, 0xAC00 + 800)]
+_ASCII = [chr(cp) for cp in range(0x21, 0x7F)]
+_PUNCT = list("，。、！？「」『』（）：；…—")
+
+
+def _random_text(rng: random.Random, length: int) -> str:
+    pools = rng.choices([_CJK, _KANA_HANGUL, _ASCII, _PUNCT], weights=[70, 10, 15, 5], k=length // 16 + 1)
+    return "".join("".join(rng.choices(pool, k=16)) for pool in pools)[:length]
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+
+
+def make_cjk(folder: str, rng: random.Random, scale: float) -> None:
+    for i in range(max(1, int(8 * scale))):
+        lines = [_random_text(rng, rng.randint(20, 120)) for _ in range(2500)]
+        _write(os.path.join(folder, f"cjk_{i:03d}.txt"), "\n".join(lines))
+
+
+def make_single_line(folder: str, rng: random.Random, scale: float) -> None:
+    _write(os.path.join(folder, "single_line.txt"), _random_text(rng, int(3_000_000 * scale)))
+
+
+def make_deep_xml(folder: str, rng: random.Random, scale: float) -> None:
+    depth = 200
+    for i in range(max(1, int(4 * scale))):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<root>']
+        for _ in range(40):
+            for level in range(depth):
+                parts.append(f'<n{level} id="{level}">{_random_text(rng, 20)}')
+            for level in reversed(range(depth)):
+                parts.append(f"</n{level}>")
+        parts.append("</root>\n")
+        _write(os.path.join(folder, f"deep_{i:03d}.xml"), "".join(parts))
+
+
+def make_bad_xml(folder: str, rng: random.Random, scale: float) -> None:
+    for i in range(max(1, int(4 * scale))):
+        parts = ["<root>"]
+        for j in range(20000):
+            text = _random_text(rng, 30)
+            kind = j % 5
+            if kind == 0:
+                parts.append(f"<open>{text}")  # never closed
+            elif kind == 1:
+                parts.append(f"<p>{text} < {text}</p>")  # stray '<'
+            elif kind == 2:
+                parts.append(f"<p>{text}&unknown;&amp;</p>")
+            elif kind == 3:
+                parts.append(f"</mismatch>{text}")
+            else:
+                parts.append(f"<p attr='x>{text}</p>")  # unterminated attribute
+        _write(os.path.join(folder, f"bad_{i:03d}.xml"), "".join(parts))
+
+
+def make_tiny_files(folder: str, rng: random.Random, scale: float) -> None:
+    for i in range(max(1, int(3000 * scale))):
+        _write(os.path.join(folder, f"tiny_{i:05d}.txt"), _random_text(rng, rng.randint(5, 60)))
+
+
+CORPORA = {
+    "cjk": make_cjk,
+    "single_line": make_single_line,
+    "deep_xml": make_deep_xml,
+    "bad_xml": make_bad_xml,
+    "tiny_files": make_tiny_files,
+}
+
+
+def _folder_bytes(files) -> int:
+    return sum(os.path.getsize(f) for f in files)
+
+
+def measure(stage, repeat: int, memory: bool) -> tuple:
+    """Run `stage()` `repeat` times (output silenced) and report the best wall time.
+
+    With `memory` the stage runs once more under tracemalloc to record the peak
+    Python allocation (worker processes are not traced).
+    """
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = stage()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    out = {"seconds": best}
+    if memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                stage()
+            out["peak_python_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out, result
+
+
+def _record(results: list, corpus: str, stage: str, timing: dict, size: int, unit: str) -> None:
+    entry = {"corpus": corpus, "stage": stage, unit: size, **timing}
+    seconds = timing["seconds"]
+    if unit == "bytes":
+        entry["mb_per_second"] = size / (1024 * 1024) / seconds if seconds else None
+    else:
+        entry["items_per_second"] = size / seconds if seconds else None
+    results.append(entry)
+    peak = timing.get("peak_python_bytes")
+    peak_text = f", peak {peak / (1024 * 1024):.1f} MiB" if peak is not None else ""
+    print(f"  {corpus:12s} {stage:20s} {seconds * 1000:9.1f} ms{peak_text}")
+
+
+def max_rss_bytes() -> int | None:
+    """Peak resident set size of this process and its finished children."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    factor = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * factor
+
+
+def run_benchmarks(args) -> dict:
+    rng = random.Random(args.seed)
+    results: list = []
+    all_chars = CodepointSet()
+
+    for corpus, make in CORPORA.items():
+        if args.corpus and corpus not in args.corpus:
+            continue
+        folder = os.path.join("corpus", corpus)
+        os.makedirs(folder)
+        make(folder, rng, args.scale)
+        files = list_text_files(folder)
+        size = _folder_bytes(files)
+        print(f"{corpus}: {len(files)} files, {size / (1024 * 1024):.1f} MiB")
+
+        timing, chars = measure(lambda: scan_files(files), args.repeat, not args.no_memory)
+        _record(results, corpus, "scan_serial", timing, size, "bytes")
+        if args.jobs > 1:
+            timing, _ = measure(lambda: scan_files(files, jobs=args.jobs), args.repeat, False)
+            _record(results, corpus, f"scan_jobs{args.jobs}", timing, size, "bytes")
+        all_chars |= chars
+
+    print(f"all corpora: {len(all_chars)} unique characters")
+    timing, (accepted, excluded) = measure(lambda: split_char_set(all_chars), args.repeat, not args.no_memory)
+    _record(results, "all", "split_char_set", timing, len(all_chars), "chars")
+
+    os.makedirs("chunks")
+    chunk_file = os.path.join("chunks", "extracted_chunk.txt")
+    timing, _ = measure(lambda: save_char_set(accepted, chunk_file), args.repeat, not args.no_memory)
+    _record(results, "all", "save_char_set", timing, len(accepted), "chars")
+
+    fontgen.fontgen_command = [sys.executable, FAKE_FONTGEN]
+    ttf_file = os.path.join("ttf", "Bench.ttf")
+    os.makedirs("ttf")
+    _write(ttf_file, "")  # the fake fontgen only uses the file name
+    for shards in sorted({1, args.shards}):
+        def build(shards=shards):
+            if not fontgen.use_fontgen(chunk_file, ttf_file, font_size=args.font_size, use_build_cache=False, shards=shards):
+                raise RuntimeError("fake fontgen did not produce a .fnt")
+        timing, _ = measure(build, args.repeat, False)
+        _record(results, "all", "use_fontgen" if shards == 1 else f"use_fontgen_shards{shards}", timing, len(accepted), "chars")
+
+    return {
+        "version": RESULT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "max_rss_bytes": max_rss_bytes(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline_file: str, threshold: float) -> bool:
+    """Print per-stage time ratios against `baseline_file`; return False on regression."""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["corpus"], r["stage"]): r for r in baseline.get("results", [])}
+    ok = True
+    print()
+    print(f"=== Compared with {baseline_file} (threshold x{threshold:.2f}) ===")
+    for r in current["results"]:
+        before = old.get((r["corpus"], r["stage"]))
+        if before is None or not before["seconds"]:
+            print(f"  {r['corpus']:12s} {r['stage']:14s}      (new)")
+            continue
+        ratio = r["seconds"] / before["seconds"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"  {r['corpus']:12s} {r['stage']:14s} x{ratio:6.2f}{flag}")
+    return ok
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark txt2fnt on synthetic corpora")
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for the corpora")
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA), help="Only run this corpus (repeatable)")
+    parser.add_argument("-j", "--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Worker processes for the parallel scan")
+    parser.add_argument("--shards", type=int, default=4, help="Also benchmark a sharded fontgen run with this many shards")
+    parser.add_argument("--font-size", type=int, default=23)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best time is kept")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run of each stage")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Result JSON file")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary corpus folder")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    cwd = os.getcwd()
+    work = tempfile.mkdtemp(prefix="txt2fnt_bench_")
+    os.chdir(work)
+    try:
+        current = run_benchmarks(args)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Corpora kept in {work}")
+        else:
+            import shutil
+            shutil.rmtree(work, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if baseline and not compare(current, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
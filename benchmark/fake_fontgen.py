@@ -0,0 +1,117 @@
+"""Stand-in for fontgen used by the benchmarks (and tests) on machines without it.
+
+Usage:
+    python benchmark/fake_fontgen.py <config.json>
+
+Reads the same config as fontgen (`inputs`, `output`, `charset`, `fontSize`,
+`dfSize`, `spacing`, `packer.size`), lays every requested character out on a grid of fixed-size
+cells and writes a valid text BMFont `.fnt` plus RGBA `.png` pages next to the
+configured output. Glyph cells are filled with a pattern derived from the
+codepoint instead of real MSDF rendering, so outputs are deterministic.
+
+Environment:
+    FAKE_FONTGEN_DELAY_PER_GLYPH  seconds to sleep per glyph, to model the real
+                                  tool's per-glyph cost (default 0)
+"""
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+
+PAGE_SIZE = 1024
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def write_png(path: str, width: int, height: int, rows) -> None:
+    """Write 8-bit RGBA rows (each `width * 4` bytes) as a PNG file."""
+    raw = bytearray()
+    for row in rows:
+        raw.append(0)  # filter type: none
+        raw += row
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(bytes(raw), 6)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def read_charset(entries) -> list:
+    chars = []
+    seen = set()
+    for entry in entries:
+        if os.path.isfile(entry):
+            with open(entry, "r", encoding="utf-8") as f:
+                entry = f.read()
+        for char in entry:
+            if char in "\r\n" or char in seen:
+                continue
+            seen.add(char)
+            chars.append(char)
+    return chars
+
+
+def main(config_path: str) -> int:
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    chars = read_charset(config["charset"])
+    font_size = int(config.get("fontSize", 23))
+    cell = font_size + int(config.get("dfSize", 6))
+    spacing = config.get("spacing", {"x": 1, "y": 1})
+    step_x = cell + int(spacing.get("x", 1))
+    step_y = cell + int(spacing.get("y", 1))
+    page_size = int(config.get("packer", {}).get("size", PAGE_SIZE))
+    per_row = page_size // step_x
+    per_page = per_row * (page_size // step_y)
+
+    delay = float(os.environ.get("FAKE_FONTGEN_DELAY_PER_GLYPH", "0"))
+    if delay:
+        time.sleep(delay * len(chars))
+
+    output_fnt = config["output"]
+    output_folder = os.path.dirname(output_fnt)
+    name = os.path.splitext(os.path.basename(output_fnt))[0]
+    page_count = max(1, -(-len(chars) // per_page))
+    page_files = [f"{name}.png"] if page_count == 1 else [f"{name}_{i}.png" for i in range(page_count)]
+
+    face = os.path.splitext(os.path.basename(config["inputs"][0]))[0]
+    lines = [
+        f'info face="{face}" size={font_size} bold=0 italic=0 charset="" unicode=1 stretchH=100 smooth=1 aa=1 padding=0,0,0,0 spacing={spacing.get("x", 1)},{spacing.get("y", 1)}',
+        f"common lineHeight={cell} base={font_size} scaleW={page_size} scaleH={page_size} pages={page_count} packed=0",
+    ]
+    lines += [f'page id={i} file="{f}"' for i, f in enumerate(page_files)]
+    lines.append(f"chars count={len(chars)}")
+
+    pages = [[bytearray(page_size * 4) for _ in range(page_size)] for _ in range(page_count)]
+    for index, char in enumerate(chars):
+        page, slot = divmod(index, per_page)
+        x = (slot % per_row) * step_x
+        y = (slot // per_row) * step_y
+        cp = ord(char)
+        pixel = bytes(((cp >> 8) & 0xFF, cp & 0xFF, (cp >> 16) & 0xFF, 255))
+        for row in pages[page][y:y + cell]:
+            row[x * 4:(x + cell) * 4] = pixel * cell
+        lines.append(
+            f"char id={cp} x={x} y={y} width={cell} height={cell} xoffset=0 yoffset=0 xadvance={font_size} page={page} chnl=15"
+        )
+
+    for page_file, rows in zip(page_files, pages):
+        write_png(os.path.join(output_folder, page_file), page_size, page_size, rows)
+    with open(output_fnt, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(lines) + "\n")
+
+    print(f"fake fontgen: {len(chars)} glyphs on {page_count} pages -> {output_fnt}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,215 @@
+"""Input files stored inside zip and tar archives.
+
+Archives found in the text folder (or given as the text folder itself) are not
+unpacked: every supported member is an input of its own, addressed by a virtual
+path made of the archive path, `!/` and the member name:
+
+    workspace/text/drop_0412.tar.gz!/locale/zh/strings.xml
+
+`open_input(path)` / `open_input_text(path)` open such a path (or a regular
+file) as a stream that is read straight from the archive, and `input_stat`
+returns the member's size and mtime, so the extractors, the extraction cache and
+the watcher handle members like files. Supported archives: .zip, .tar and
+gzip / bzip2 / xz compressed tars (.tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz).
+
+Opened archives are kept in a small per-thread (and per-process) cache and
+reopened when the archive file changes. Members of a compressed tar can only be
+read in order, so `list_archive_members` returns them in archive order and the
+scan visits them that way; nested archives are not expanded.
+"""
+from __future__ import annotations
+
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Tuple
+
+from source.util.safe_print import safe_print
+
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+MEMBER_SEPARATOR = "!/"
+
+# archives kept open per thread
+_MAX_OPEN_ARCHIVES = 4
+
+# errors raised for corrupt or unreadable archives
+ARCHIVE_ERRORS = (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError)
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_path(archive: str, member: str) -> str:
+    return archive + MEMBER_SEPARATOR + member
+
+
+def split_member_path(path: str) -> Tuple[str, str | None]:
+    """Return (archive, member) for a virtual member path, (path, None) otherwise."""
+    index = path.find(MEMBER_SEPARATOR)
+    while index != -1:
+        if is_archive(path[:index]):
+            return path[:index], path[index + len(MEMBER_SEPARATOR):]
+        index = path.find(MEMBER_SEPARATOR, index + 1)
+    return path, None
+
+
+@dataclass
+class ArchiveMember:
+    name: str
+    size: int
+    mtime_ns: int
+    # position in the archive
+    index: int
+
+
+def _clean_name(name: str) -> str:
+    name = name.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+class _Archive:
+    def __init__(self, path: str, signature: Tuple[int, int]):
+        self.signature = signature
+        self.members: Dict[str, ArchiveMember] = {}
+        self._infos = {}
+        if path.lower().endswith(".zip"):
+            self._zip = zipfile.ZipFile(path)
+            self._tar = None
+            infos = [(i, i.file_size, time.mktime(i.date_time + (0, 0, -1))) for i in self._zip.infolist() if not i.is_dir()]
+        else:
+            self._zip = None
+            self._tar = tarfile.open(path, "r:*")
+            infos = [(i, i.size, i.mtime) for i in self._tar.getmembers() if i.isfile()]
+        for index, (info, size, mtime) in enumerate(infos):
+            name = _clean_name(info.filename if self._zip is not None else info.name)
+            self.members[name] = ArchiveMember(name, size, int(mtime * 1_000_000_000), index)
+            self._infos[name] = info
+
+    def open(self, name: str) -> BinaryIO:
+        info = self._infos.get(name)
+        if info is None:
+            raise FileNotFoundError(f"no member '{name}' in archive")
+        if self._zip is not None:
+            return self._zip.open(info)
+        return self._tar.extractfile(info)
+
+    def close(self) -> None:
+        (self._zip or self._tar).close()
+
+
+_local = threading.local()
+
+
+def _archive(path: str) -> _Archive:
+    cache = getattr(_local, "archives", None)
+    if cache is None or _local.pid != os.getpid():
+        # handles inherited from a forked parent share its file offsets: never reuse them
+        cache = _local.archives = OrderedDict()
+        _local.pid = os.getpid()
+    key = os.path.normpath(path)
+    st = os.stat(path)
+    signature = (st.st_size, st.st_mtime_ns)
+    archive = cache.get(key)
+    if archive is not None and archive.signature == signature:
+        cache.move_to_end(key)
+        return archive
+    if archive is not None:
+        # the archive was replaced since it was opened
+        del cache[key]
+        archive.close()
+    archive = cache[key] = _Archive(path, signature)
+    if len(cache) > _MAX_OPEN_ARCHIVES:
+        cache.popitem(last=False)[1].close()
+    return archive
+
+
+def close_archives() -> None:
+    """Close the archives opened by the current thread."""
+    cache = getattr(_local, "archives", None)
+    if cache is not None and _local.pid == os.getpid():
+        for archive in cache.values():
+            archive.close()
+    _local.archives = None
+
+
+def list_archive_members(archive: str) -> List[ArchiveMember]:
+    """Regular file members of `archive`, in archive order. Raises one of ARCHIVE_ERRORS."""
+    return sorted(_archive(archive).members.values(), key=lambda m: m.index)
+
+
+def open_input(path: str) -> BinaryIO:
+    """Open a file or an archive member (see module docstring) for binary reading."""
+    archive, member = split_member_path(path)
+    if member is None:
+        return open(path, "rb")
+    return _archive(archive).open(member)
+
+
+def open_input_text(path: str, encoding: str = "utf-8", errors: str | None = None, newline: str | None = None):
+    """Open a file or an archive member as text."""
+    archive, member = split_member_path(path)
+    if member is None:
+        return open(path, "r", encoding=encoding, errors=errors, newline=newline)
+    return io.TextIOWrapper(_archive(archive).open(member), encoding=encoding, errors=errors, newline=newline)
+
+
+def input_stat(path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of a file or an archive member. Raises FileNotFoundError if it is gone."""
+    archive, member = split_member_path(path)
+    if member is None:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    info = _archive(archive).members.get(member)
+    if info is None:
+        raise FileNotFoundError(f"no member '{member}' in {archive}")
+    return info.size, info.mtime_ns
+
+
+def input_exists(path: str) -> bool:
+    try:
+        input_stat(path)
+    except ARCHIVE_ERRORS:
+        return False
+    return True
+
+
+def relative_input_path(path: str, root: str) -> str:
+    """"/"-separated path of a file or member relative to `root` (members as `<archive>/<member>`)."""
+    archive, member = split_member_path(path)
+    if member is None:
+        return os.path.relpath(path, root).replace(os.sep, "/")
+    if os.path.normpath(archive) == os.path.normpath(root):
+        return member
+    return os.path.relpath(archive, root).replace(os.sep, "/") + "/" + member
+
+
+def warn_unreadable_archive(archive: str, error: Exception) -> None:
+    safe_print(f"⚠️  Skipping unreadable archive {archive}: {error}")
+
+
+__all__ = [
+    "ARCHIVE_EXTENSIONS",
+    "ARCHIVE_ERRORS",
+    "MEMBER_SEPARATOR",
+    "ArchiveMember",
+    "is_archive",
+    "member_path",
+    "split_member_path",
+    "list_archive_members",
+    "open_input",
+    "open_input_text",
+    "input_stat",
+    "input_exists",
+    "relative_input_path",
+    "close_archives",
+    "warn_unreadable_archive",
+]
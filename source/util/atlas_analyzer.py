@@ -0,0 +1,244 @@
+"""Post-generation atlas statistics and automatic sizing.
+
+`analyze_atlas(fnt_file)` reads the text .fnt and the IHDR header of every page
+PNG (no image library needed) and reports, per page and in total:
+
+    - dimensions and channels of the page image
+    - number of glyphs and the share of the page their rectangles cover (fill ratio)
+    - the estimated texture memory once uploaded uncompressed
+      (width * height * channels * bytes per channel, no mipmaps)
+
+`auto_size` searches fontgen parameters for an atlas within a page count and/or
+texture memory budget: for every page size / spacing candidate it binary-searches
+the largest font size that fits, then keeps the largest font size overall (the
+smallest texture memory on ties). Each trial is a real fontgen run, so keep the
+candidate lists short.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Sequence
+
+from source.util.fnt_file import read_fnt
+from source.util.safe_print import safe_print
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# channels per PNG color type: grayscale, RGB, palette, grayscale + alpha, RGBA
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+@dataclass
+class PngInfo:
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+    @property
+    def channels(self) -> int:
+        return _PNG_CHANNELS.get(self.color_type, 4)
+
+    @property
+    def texture_bytes(self) -> int:
+        # palette images are expanded to RGBA when uploaded
+        channels = 4 if self.color_type == 3 else self.channels
+        return self.width * self.height * channels * max(1, self.bit_depth // 8)
+
+
+def read_png_header(path: str) -> PngInfo:
+    """Return the IHDR fields of a PNG file. Raises ValueError for non-PNG files."""
+    with open(path, "rb") as f:
+        header = f.read(33)
+    if len(header) < 33 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError(f"not a PNG file: {path}")
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", header[16:26])
+    return PngInfo(width, height, bit_depth, color_type)
+
+
+@dataclass
+class PageStats:
+    file: str
+    width: int
+    height: int
+    channels: int
+    glyphs: int
+    glyph_area: int
+    fill_ratio: float
+    texture_bytes: int
+
+
+@dataclass
+class AtlasReport:
+    fnt_file: str
+    font_size: int
+    glyphs: int
+    pages: List[PageStats] = field(default_factory=list)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def texture_bytes(self) -> int:
+        return sum(p.texture_bytes for p in self.pages)
+
+    @property
+    def fill_ratio(self) -> float:
+        area = sum(p.width * p.height for p in self.pages)
+        return sum(p.glyph_area for p in self.pages) / area if area else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.update(page_count=self.page_count, texture_bytes=self.texture_bytes, fill_ratio=self.fill_ratio)
+        return data
+
+
+def analyze_atlas(fnt_file: str) -> AtlasReport:
+    """Collect page and glyph statistics of a generated .fnt and its page images."""
+    font = read_fnt(fnt_file)
+    folder = os.path.dirname(fnt_file)
+    glyphs: Dict[int, List[int]] = {}
+    for char in font.chars:
+        area = int(char.get("width", 0)) * int(char.get("height", 0))
+        glyphs.setdefault(int(char.get("page", 0)), []).append(area)
+
+    report = AtlasReport(fnt_file, abs(int(font.info.get("size", 0))), len(font.chars))
+    for page_id in sorted(font.pages):
+        path = os.path.join(folder, font.pages[page_id])
+        try:
+            png = read_png_header(path)
+        except (OSError, ValueError):
+            # missing or unreadable page: fall back to the size declared in the .fnt
+            png = PngInfo(font.common_int("scaleW"), font.common_int("scaleH"), 8, 6)
+        areas = glyphs.get(page_id, [])
+        page_area = png.width * png.height
+        report.pages.append(PageStats(
+            file=font.pages[page_id],
+            width=png.width,
+            height=png.height,
+            channels=png.channels,
+            glyphs=len(areas),
+            glyph_area=sum(areas),
+            fill_ratio=sum(areas) / page_area if page_area else 0.0,
+            texture_bytes=png.texture_bytes,
+        ))
+    return report
+
+
+def print_atlas_report(report: AtlasReport) -> None:
+    print()
+    safe_print(f"=== Atlas: {report.fnt_file} ===")
+    for p in report.pages:
+        print(f"{p.file:32s} {p.width}x{p.height}x{p.channels}  {p.glyphs:6d} glyphs  "
+              f"fill {p.fill_ratio:6.1%}  {p.texture_bytes / (1024 * 1024):7.2f} MiB")
+    print(f"size {report.font_size}: {report.glyphs} glyphs on {report.page_count} pages, "
+          f"fill {report.fill_ratio:.1%}, texture memory {report.texture_bytes / (1024 * 1024):.2f} MiB")
+
+
+# --- automatic sizing ----------------------------------------------------------
+
+@dataclass
+class SizeBudget:
+    max_pages: int | None = None
+    max_texture_bytes: int | None = None
+
+    def fits(self, report: AtlasReport) -> bool:
+        if self.max_pages is not None and report.page_count > self.max_pages:
+            return False
+        if self.max_texture_bytes is not None and report.texture_bytes > self.max_texture_bytes:
+            return False
+        return True
+
+
+@dataclass
+class SizeTrial:
+    font_size: int
+    # fontgen config overrides, e.g. {"packer": {"size": 1024}, "spacing": {"x": 0, "y": 0}}
+    overrides: dict
+    report: AtlasReport | None
+    fits: bool
+
+
+def size_candidates(page_sizes: Sequence[int] | None, spacings: Sequence[int] | None) -> List[dict]:
+    """Config overrides for every page size x spacing combination (`{}` = fontgen defaults)."""
+    candidates = []
+    for page_size in page_sizes or [None]:
+        for spacing in spacings if spacings else [None]:
+            overrides = {}
+            if page_size is not None:
+                overrides["packer"] = {"size": page_size}
+            if spacing is not None:
+                overrides["spacing"] = {"x": spacing, "y": spacing}
+            candidates.append(overrides)
+    return candidates
+
+
+def auto_size(
+    generate: Callable[[int, dict], str | None],
+    budget: SizeBudget,
+    max_font_size: int,
+    min_font_size: int,
+    candidates: Sequence[dict] = ({},),
+) -> tuple[SizeTrial | None, List[SizeTrial]]:
+    """Find the largest font size (and config overrides) whose atlas fits `budget`.
+
+    `generate(font_size, overrides)` builds a trial atlas and returns its .fnt path
+    (None on failure). Returns (best fitting trial or None, every trial run). The
+    search assumes the page count and memory grow with the font size.
+    """
+    trials: List[SizeTrial] = []
+
+    def trial(font_size: int, overrides: dict) -> SizeTrial:
+        fnt_file = generate(font_size, overrides)
+        report = analyze_atlas(fnt_file) if fnt_file else None
+        result = SizeTrial(font_size, overrides, report, report is not None and budget.fits(report))
+        trials.append(result)
+        pages = f"{report.page_count} pages, {report.texture_bytes / (1024 * 1024):.2f} MiB" if report else "failed"
+        safe_print(f"{'✅' if result.fits else '❌'}  auto-size: font size {font_size} {overrides or ''} -> {pages}")
+        return result
+
+    best: SizeTrial | None = None
+    for overrides in candidates:
+        # the requested size often fits already: try it before searching
+        found = trial(max_font_size, overrides)
+        # smaller sizes than the best so far cannot win, do not search them
+        low, high = max(min_font_size, best.font_size if best else min_font_size), max_font_size - 1
+        if found.fits:
+            low = high + 1
+        else:
+            found = None
+        while low <= high:
+            mid = (low + high + 1) // 2
+            result = trial(mid, overrides)
+            if result.fits:
+                found = result
+                low = mid + 1
+            else:
+                high = mid - 1
+        if found is None:
+            continue
+        if (
+            best is None
+            or found.font_size > best.font_size
+            or (found.font_size == best.font_size and found.report.texture_bytes < best.report.texture_bytes)
+        ):
+            best = found
+    return best, trials
+
+
+__all__ = [
+    "PngInfo",
+    "read_png_header",
+    "PageStats",
+    "AtlasReport",
+    "analyze_atlas",
+    "print_atlas_report",
+    "SizeBudget",
+    "SizeTrial",
+    "size_candidates",
+    "auto_size",
+]
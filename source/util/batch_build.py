@@ -0,0 +1,140 @@
+"""Batch (matrix) font builds from a single character extraction.
+
+A batch is a list of (TTF, font size, output name) jobs that all share the same
+character chunk file. Jobs come from a JSON job file:
+
+    [
+        {"ttf": "NotoSansTC-Regular", "font_size": 23, "output_name": "noto_23"},
+        {"ttf": "NotoSansTC-Regular.ttf", "font_size": 32}
+    ]
+
+(or `{"jobs": [...]}`), or from globbing the TTF folder combined with a list of
+sizes. `run_batch` schedules the fontgen jobs on a bounded thread pool (each job
+waits on its own fontgen process) and reports per-job timing and success.
+"""
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from source.util.safe_print import safe_print
+
+
+@dataclass
+class BatchJob:
+    ttf_file: str
+    font_size: int
+    output_name: str
+
+
+@dataclass
+class BatchResult:
+    job: BatchJob
+    ok: bool
+    seconds: float
+    error: str = ""
+
+
+def resolve_ttf_file(ttf_folder: str, name: str) -> str | None:
+    """Return the path of TTF `name` (basename with/without extension, or a path)."""
+    for candidate in (name, os.path.join(ttf_folder, name), os.path.join(ttf_folder, name + ".ttf")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _default_output_name(ttf_file: str, font_size: int) -> str:
+    return f"{os.path.splitext(os.path.basename(ttf_file))[0]}_{font_size}"
+
+
+def check_output_names(jobs: List[BatchJob]) -> List[BatchJob]:
+    """Return `jobs`, or raise ValueError when two of them share an output name.
+
+    Jobs run concurrently and each writes its chunk, config and .fnt / .png
+    files under its output name, so duplicates would overwrite each other.
+    """
+    owners: Dict[str, List[str]] = {}
+    for job in jobs:
+        owners.setdefault(job.output_name, []).append(f"{os.path.basename(job.ttf_file)} @ {job.font_size}px")
+    clashes = [f"{' and '.join(who)} -> {name}" for name, who in owners.items() if len(who) > 1]
+    if clashes:
+        raise ValueError("batch output names collide: " + "; ".join(clashes) + " (set distinct output_name values)")
+    return jobs
+
+
+def load_batch_file(batch_file: str, ttf_folder: str, default_font_size: int = 23) -> List[BatchJob]:
+    """Read a JSON job file. Raises ValueError for unknown TTFs, malformed entries or duplicate output names."""
+    with open(batch_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.get("jobs", []) if isinstance(data, dict) else data
+
+    jobs = []
+    for entry in entries:
+        if not isinstance(entry, dict) or "ttf" not in entry:
+            raise ValueError(f"Batch job needs a 'ttf' entry: {entry!r}")
+        ttf_file = resolve_ttf_file(ttf_folder, entry["ttf"])
+        if ttf_file is None:
+            raise ValueError(f"Could not find TTF file '{entry['ttf']}' in {ttf_folder}")
+        font_size = int(entry.get("font_size", default_font_size))
+        output_name = entry.get("output_name") or _default_output_name(ttf_file, font_size)
+        jobs.append(BatchJob(ttf_file, font_size, output_name))
+    return check_output_names(jobs)
+
+
+def glob_batch_jobs(ttf_folder: str, pattern: str, font_sizes: List[int]) -> List[BatchJob]:
+    """One job per (TTF in `ttf_folder` matching `pattern`, size) pair. Raises ValueError for duplicate output names."""
+    ttf_files = sorted(f for f in os.listdir(ttf_folder) if fnmatch.fnmatch(f, pattern))
+    return check_output_names([
+        BatchJob(os.path.join(ttf_folder, f), size, _default_output_name(f, size))
+        for f in ttf_files
+        for size in font_sizes
+    ])
+
+
+def run_batch(jobs: List[BatchJob], build_one: Callable[[BatchJob], bool], workers: int) -> List[BatchResult]:
+    """Run `build_one(job)` for every job on at most `workers` threads.
+
+    Results are returned in job order; an exception fails only its own job.
+    """
+    def timed(job: BatchJob) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            ok = bool(build_one(job))
+            error = "" if ok else "fontgen did not produce a .fnt"
+        except Exception as e:  # keep the other jobs going
+            ok = False
+            error = f"{type(e).__name__}: {e}"
+        return BatchResult(job, ok, time.perf_counter() - start, error)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(timed, jobs))
+
+
+def print_batch_report(results: List[BatchResult]) -> None:
+    print()
+    print("=== Batch Report ===")
+    for r in results:
+        status = "✅" if r.ok else "⚠️"
+        line = f"{status}  {r.job.output_name}: {os.path.basename(r.job.ttf_file)} @ {r.job.font_size}px in {r.seconds:.2f}s"
+        if r.error:
+            line += f" ({r.error})"
+        safe_print(line)
+    succeeded = sum(1 for r in results if r.ok)
+    print(f"{succeeded}/{len(results)} jobs succeeded, total job time {sum(r.seconds for r in results):.2f}s")
+
+
+__all__ = [
+    "BatchJob",
+    "BatchResult",
+    "resolve_ttf_file",
+    "check_output_names",
+    "load_batch_file",
+    "glob_batch_jobs",
+    "run_batch",
+    "print_batch_report",
+]
@@ -0,0 +1,280 @@
+"""In-process, reentrant font build.
+
+`txt2fnt.py` works on cwd-relative folders (`workspace/text`, `workspace/char2chunk`,
+`_tools_/ttf`) configured through module globals, so it suits one run per
+process. `build` runs the same pipeline (discovery, extraction, split, fontgen)
+from explicit paths instead:
+
+    from source.util.build_api import build
+
+    result = build("texts/de", "fonts/Noto.ttf", "out/de", output_name="noto_de",
+                   font_size=32, fontgen="tools/fontgen")
+    if result.ok:
+        print(result.fnt_file, result.page_files, result.accepted_count)
+
+Every call gets its own temp work folder (chunk files and fontgen configs) and
+its own fontgen settings (see `fontgen.FontgenSettings`), and never touches the
+module globals or the cwd, so builds can run concurrently from several threads.
+Concurrent builds must use different output files; they may share an
+extraction manifest and a build cache folder.
+
+Invalid arguments (missing folders or TTFs, no input files) raise ValueError; a
+failed fontgen run is reported through `BuildResult.ok` / `error`.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from source.util.atlas_analyzer import AtlasReport, analyze_atlas
+from source.util.char_frequency import FrequencyTiers, order_by_frequency, write_frequency_table
+from source.util.char_policy import CharPolicy, default_char_policy
+from source.util.codepoint_set import CodepointSet
+from source.util.extract_cache import ExtractCache, extract_options
+from source.util.extract_char_set import DEFAULT_CHUNK_SIZE, save_char_set, split_char_set
+from source.util.fnt_output import OutputReport, export_font
+from source.util.fontgen import FontgenSettings, fnt_page_files, resolve_output_fnt, use_fontgen
+from source.util.fontgen_runner import FONTGEN_ENV_VAR
+from source.util.profiler import Profiler
+from source.util.scan_corpus import discover_files, scan_files
+from source.util.text_normalizer import NormalizationReport, TextNormalizer, normalization_report
+from source.util.xml_selectors import XmlSelection
+
+
+@dataclass
+class BuildResult:
+    ok: bool
+    # output .fnt and the page images it references (empty when the build failed)
+    fnt_file: str
+    page_files: List[str] = field(default_factory=list)
+    input_files: List[str] = field(default_factory=list)
+    accepted_count: int = 0
+    excluded_count: int = 0
+    # glyphs eliminated by the text normalizer (None without one)
+    normalization: NormalizationReport | None = None
+    # seconds per stage: discovery, extraction, split, save, fontgen (and output)
+    stages: Dict[str, float] = field(default_factory=dict)
+    seconds: float = 0.0
+    # one dict per fontgen process (command, returncode, seconds, error)
+    fontgen_runs: List[dict] = field(default_factory=list)
+    # page count, fill ratio and texture memory of the generated atlas
+    atlas: AtlasReport | None = None
+    # binary / JSON descriptors and page optimization (None when none was requested)
+    outputs: OutputReport | None = None
+    # only set when keep_work_folder is True
+    work_folder: str | None = None
+    error: str = ""
+
+
+def build(
+    text_folder: str,
+    ttf_file: str,
+    output_folder: str,
+    output_name: str | None = None,
+    font_size: int = 23,
+    *,
+    fallback_ttf_files: Sequence[str] = (),
+    coverage_filter: bool = True,
+    include: Sequence[str] | None = None,
+    exclude: Sequence[str] | None = None,
+    recursive: bool = True,
+    treat_xml_as_text: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    jobs: int = 1,
+    policy: CharPolicy | None = None,
+    shards: int = 1,
+    incremental: bool = False,
+    frequency_tiers: Sequence[float] | None = None,
+    normalizer: TextNormalizer | None = None,
+    xml_selection: XmlSelection | None = None,
+    extract_cache_file: str | None = None,
+    build_cache_folder: str | None = None,
+    glyph_cache_folder: str | None = None,
+    binary_fnt: bool = False,
+    json_index: bool = False,
+    optimize_png: bool = False,
+    fontgen: Sequence[str] | str | None = None,
+    fontgen_folder: str | None = None,
+    fontgen_timeout: float | None = None,
+    temp_folder: str | None = None,
+    keep_work_folder: bool = False,
+    quiet: bool = True,
+) -> BuildResult:
+    """Build `output_folder`/`output_name`.fnt from the texts under `text_folder`.
+
+    `extract_cache_file` / `build_cache_folder` enable the extraction manifest
+    and the fontgen build cache (both off by default); `glyph_cache_folder`
+    enables the per-glyph render cache (see `glyph_cache`). `binary_fnt`,
+    `json_index` and `optimize_png` run the output stage (see `fnt_output`).
+    `fontgen` is the tool path or command (default: `TXT2FNT_FONTGEN`, then the
+    tools in `fontgen_folder`, see `fontgen_runner.resolve_fontgen_command`); with
+    neither `fontgen`, `fontgen_folder` nor the variable, ValueError is raised
+    (the CLI's `_tools_/fontgen` is never used). The work folder is created in
+    `temp_folder` (default: the system temp folder) and deleted afterwards unless
+    `keep_work_folder` is set. `incremental` appends new characters to the
+    existing atlas instead of regenerating it (see `incremental_atlas`).
+    `frequency_tiers` (e.g. `[0.9, 0.99]`) generates the glyphs in frequency
+    tiers, hottest first (see `char_frequency`). A `normalizer` normalizes the
+    extracted text before its characters are collected (see `text_normalizer`).
+    `xml_selection` restricts XML files to selected elements and attributes
+    (see `xml_selectors`).
+    """
+    if not os.path.isdir(text_folder):
+        raise ValueError(f"Text folder not found: {text_folder}")
+    for f in [ttf_file, *fallback_ttf_files]:
+        if not os.path.isfile(f):
+            raise ValueError(f"TTF file not found: {f}")
+    if fallback_ttf_files and not coverage_filter:
+        raise ValueError("fallback_ttf_files needs the coverage filter")
+    if fallback_ttf_files and incremental:
+        raise ValueError("incremental builds do not support fallback_ttf_files")
+    if frequency_tiers and shards > 1:
+        raise ValueError("frequency_tiers cannot be combined with shards")
+    if optimize_png and incremental:
+        raise ValueError("optimize_png cannot be combined with incremental")
+    if glyph_cache_folder and (incremental or shards > 1 or frequency_tiers):
+        raise ValueError("glyph_cache_folder cannot be combined with incremental, shards or frequency_tiers")
+    if xml_selection is not None and treat_xml_as_text:
+        raise ValueError("xml_selection cannot be combined with treat_xml_as_text")
+    if chunk_size <= 0 or shards <= 0 or jobs < 0:
+        raise ValueError("chunk_size and shards must be positive and jobs not negative")
+    if fontgen_timeout is not None and fontgen_timeout <= 0:
+        raise ValueError(f"Invalid fontgen timeout: {fontgen_timeout}")
+    if not fontgen and not fontgen_folder:
+        fontgen = os.environ.get(FONTGEN_ENV_VAR)
+        if not fontgen:
+            raise ValueError(f"No fontgen: pass fontgen or fontgen_folder, or set {FONTGEN_ENV_VAR}")
+    elif not fontgen and not os.path.isdir(fontgen_folder):
+        raise ValueError(f"fontgen folder not found: {fontgen_folder}")
+
+    policy = policy or default_char_policy()
+    prof = Profiler()
+    start = time.perf_counter()
+
+    with prof.stage("discovery"):
+        input_files = discover_files(text_folder, recursive=recursive, include=include, exclude=exclude)
+    if not input_files:
+        raise ValueError(f"No supported input files found in {text_folder}")
+
+    if temp_folder:
+        os.makedirs(temp_folder, exist_ok=True)
+    work_folder = tempfile.mkdtemp(prefix="txt2fnt_build_", dir=temp_folder)
+    settings = FontgenSettings(
+        command=fontgen,
+        timeout=fontgen_timeout,
+        quiet=quiet,
+        folder=fontgen_folder,
+        cache_folder=build_cache_folder,
+        temp_folder=work_folder,
+        profiler=prof,
+        glyph_cache_folder=glyph_cache_folder,
+    )
+    output_fnt = resolve_output_fnt(ttf_file, output_folder, output_name)
+    result = BuildResult(False, output_fnt + ".fnt", input_files=input_files)
+    try:
+        cache = None
+        if extract_cache_file:
+            cache = ExtractCache(extract_cache_file, extract_options(treat_xml_as_text, normalizer, xml_selection))
+
+        if normalizer is not None and not normalizer.active:
+            normalizer = None
+        raw_chars = CodepointSet() if normalizer is not None else None
+        frequencies = Counter() if frequency_tiers else None
+        with prof.stage("extraction"):
+            char_set = scan_files(
+                input_files,
+                jobs if jobs > 0 else (os.cpu_count() or 1),
+                treat_xml_as_text,
+                chunk_size,
+                cache,
+                profiler=prof,
+                verbose=not quiet,
+                frequencies=frequencies,
+                normalizer=normalizer,
+                raw_chars=raw_chars,
+                xml_selection=xml_selection,
+            )
+            if normalizer is not None:
+                result.normalization = normalization_report(raw_chars, char_set, normalizer, policy.skip)
+            if cache is not None:
+                cache.prune(input_files)
+                cache.save()
+
+        with prof.stage("split"):
+            accepted_chars, excluded_chars = split_char_set(char_set, policy)
+            tiers = None
+            if frequencies is not None:
+                accepted_chars = order_by_frequency(accepted_chars, frequencies)
+                tiers = FrequencyTiers(frequencies, frequency_tiers)
+        result.accepted_count = len(accepted_chars)
+        result.excluded_count = len(excluded_chars)
+
+        with prof.stage("save"):
+            chunk_file = os.path.join(work_folder, f"extracted_chunk_{len(accepted_chars)}.txt")
+            save_char_set(accepted_chars, chunk_file)
+            save_char_set(excluded_chars, os.path.join(work_folder, f"igored_{len(excluded_chars)}.txt"))
+            if frequencies is not None:
+                write_frequency_table(frequencies, accepted_chars, os.path.join(work_folder, f"char_frequency_{len(accepted_chars)}.tsv"))
+
+        fontgen_kwargs = dict(
+            font_size=font_size,
+            use_build_cache=build_cache_folder is not None,
+            policy=policy,
+            shards=shards,
+            settings=settings,
+            tiers=tiers,
+        )
+        if incremental:
+            from source.util.incremental_atlas import use_fontgen_incremental as generate
+        else:
+            generate = use_fontgen
+        with prof.stage("fontgen"):
+            if coverage_filter:
+                from source.util.glyph_coverage import use_fontgen_with_coverage
+
+                ok = use_fontgen_with_coverage(
+                    accepted_chars, ttf_file, list(fallback_ttf_files), work_folder, output_fnt, generate, **fontgen_kwargs
+                )
+            else:
+                ok = generate(
+                    char_chunk_file=chunk_file,
+                    ttf_file=ttf_file,
+                    custom_fnt_output_folder=output_folder,
+                    custom_fnt_output_name=os.path.basename(output_fnt),
+                    **fontgen_kwargs,
+                )
+
+        if ok and (binary_fnt or json_index or optimize_png):
+            with prof.stage("output"):
+                try:
+                    result.outputs = export_font(output_fnt, binary_fnt, json_index, optimize_png)
+                except (OSError, ValueError) as e:
+                    ok = False
+                    result.error = f"output stage failed: {e}"
+        if ok:
+            result.ok = True
+            result.page_files = [os.path.join(os.path.dirname(output_fnt), p) for p in fnt_page_files(result.fnt_file)]
+            result.atlas = analyze_atlas(result.fnt_file)
+        elif not result.error:
+            failed = [r for r in prof.fontgen_runs if r["error"] or r["returncode"] != 0]
+            if failed:
+                result.error = failed[-1]["error"] or f"fontgen exit code {failed[-1]['returncode']}"
+            else:
+                result.error = "fontgen did not produce a .fnt"
+    finally:
+        if keep_work_folder:
+            result.work_folder = work_folder
+        else:
+            shutil.rmtree(work_folder, ignore_errors=True)
+        result.stages = {name: entry["seconds"] for name, entry in prof.stages.items()}
+        result.fontgen_runs = [dict(r) for r in prof.fontgen_runs]
+        result.seconds = time.perf_counter() - start
+    return result
+
+
+__all__ = ["BuildResult", "build"]
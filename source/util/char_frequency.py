@@ -0,0 +1,87 @@
+"""Character frequencies and frequency-ranked glyph tiers.
+
+With `--frequency-tiers` the extraction also counts how often every character
+occurs (`scan_files(..., frequencies=Counter())`). The accepted characters are
+then ordered from most to least frequent and cut into tiers by cumulative share
+of all occurrences:
+
+    tiers = FrequencyTiers(counts, [0.9, 0.99])
+    tiers.split(chars)   # [chars covering 90% of the text, the next 9%, the rest]
+
+Each tier is generated by its own fontgen run and the results are merged in
+tier order (see `fontgen_shard.use_fontgen_sharded`), so the hot glyphs share the
+first page(s) and rare glyphs only occupy trailing pages. The table of counts is
+written next to the extracted chunk file (`char_frequency_<n>.tsv`).
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable, List, Sequence
+
+from source.util.safe_print import safe_print
+
+
+def parse_thresholds(value: str) -> List[float]:
+    """Parse "0.9,0.99" (or percentages "90,99") into increasing fractions in (0, 1)."""
+    thresholds = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        number = float(part)
+        if number >= 1:
+            number /= 100
+        thresholds.append(number)
+    if not thresholds or any(not 0 < t < 1 for t in thresholds) or thresholds != sorted(set(thresholds)):
+        raise ValueError(f"expected increasing coverage thresholds between 0 and 1, got '{value}'")
+    return thresholds
+
+
+def order_by_frequency(chars: Iterable[str], counts: Counter) -> List[str]:
+    """Most frequent first; ties (and characters never counted) in codepoint order."""
+    return sorted(chars, key=lambda c: (-counts.get(c, 0), ord(c)))
+
+
+class FrequencyTiers:
+    def __init__(self, counts: Counter, thresholds: Sequence[float]):
+        self.counts = counts
+        self.thresholds = list(thresholds)
+
+    def split(self, chars: Iterable[str]) -> List[str]:
+        """Return the non-empty tiers of `chars` as strings, hottest first.
+
+        Shares are relative to the occurrences of `chars` only, so the thresholds
+        keep their meaning after characters are filtered out (e.g. by the TTF
+        coverage filter).
+        """
+        ordered = order_by_frequency(chars, self.counts)
+        total = sum(self.counts.get(c, 0) for c in ordered)
+        if not total:
+            return ["".join(ordered)] if ordered else []
+        tiers: List[List[str]] = [[] for _ in range(len(self.thresholds) + 1)]
+        tier = 0
+        seen = 0
+        for char in ordered:
+            # a character goes to the first tier whose threshold is not reached yet
+            while tier < len(self.thresholds) and seen >= self.thresholds[tier] * total:
+                tier += 1
+            tiers[tier].append(char)
+            seen += self.counts.get(char, 0)
+        return ["".join(t) for t in tiers if t]
+
+
+def write_frequency_table(counts: Counter, chars: Iterable[str], output_file: str) -> None:
+    """Write `rank<TAB>U+XXXX<TAB>char<TAB>count<TAB>cumulative share` lines for `chars`."""
+    ordered = order_by_frequency(chars, counts)
+    total = sum(counts.get(c, 0) for c in ordered) or 1
+    seen = 0
+    with open(output_file, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# rank\tcodepoint\tchar\tcount\tcumulative\n")
+        for rank, char in enumerate(ordered, start=1):
+            count = counts.get(char, 0)
+            seen += count
+            f.write(f"{rank}\tU+{ord(char):04X}\t{char}\t{count}\t{seen / total:.6f}\n")
+    safe_print(f"Character frequencies ({len(ordered)}): saved to {output_file}")
+
+
+__all__ = ["parse_thresholds", "order_by_frequency", "FrequencyTiers", "write_frequency_table"]
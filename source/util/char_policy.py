@@ -0,0 +1,155 @@
+"""Character classification policy shared by extraction and font generation.
+
+Every codepoint falls in one of three classes:
+    ACCEPT          extracted from the text and written to the character chunk file
+    SKIP            dropped entirely (e.g. tab / newline)
+    ALWAYS_INCLUDE  always sent to fontgen through the config charset, so it is
+                    listed in the "ignored" file instead of the chunk file
+
+The classes are stored in a table indexed by codepoint that is built once per
+policy, so classifying a character is a single lookup and `split_char_set` and
+`create_fontgen_config_json` always agree on which characters are always included.
+
+A policy can be loaded from a JSON file:
+    {
+        "skip": "\\t\\n",
+        "always_include": ["0123456789", "ABC..."],
+        "always_include_ranges": [["U+3040", "U+309F"]]
+    }
+Missing keys fall back to the defaults below.
+"""
+from __future__ import annotations
+
+import json
+import string
+from typing import Iterable, List, Tuple
+
+
+ACCEPT = 0
+SKIP = 1
+ALWAYS_INCLUDE = 2
+
+MAX_CODEPOINT = 0x10FFFF
+
+DEFAULT_SKIP = "\t\n"
+
+DEFAULT_ALWAYS_INCLUDE = [
+    string.digits,
+    string.ascii_letters,
+    " ",
+    "`~!@#$%^&*()-_=+[]{}\\|;:'\",<.>/?",
+    "０１２３４５６７８９",
+    "ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ",
+    "ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ",
+    "　",
+    "｀～！＠＃＄％＾＆＊（）－＿＝＋［］｛｝＼｜；：＇＂，＜．＞／？",
+    "｢｣《》｟｠“”･·。｡､、…—",
+    "©",
+]
+
+
+def _parse_codepoint(value) -> int:
+    # accepts 12354, "12354", "0x3042" or "U+3042"
+    if isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if text[:2].upper() == "U+":
+        return int(text[2:], 16)
+    return int(text, 0)
+
+
+class CharPolicy:
+    """Precompiled skip / always-include classification.
+
+    Usage:
+        policy = CharPolicy()
+        policy.classify("梁")          # ACCEPT
+        accepted, ignored = policy.split(char_set)
+    """
+
+    def __init__(
+        self,
+        skip: str = DEFAULT_SKIP,
+        always_include: Iterable[str] = DEFAULT_ALWAYS_INCLUDE,
+        always_include_ranges: Iterable[Tuple[int, int]] = (),
+    ):
+        self.skip = skip
+        self.always_include: List[str] = list(always_include)
+        self.always_include_ranges: List[Tuple[int, int]] = [(int(a), int(b)) for a, b in always_include_ranges]
+
+        # one byte per codepoint (~1.1 MB), built once
+        table = bytearray(MAX_CODEPOINT + 1)
+        for group in self.always_include:
+            for char in group:
+                table[ord(char)] = ALWAYS_INCLUDE
+        for start, end in self.always_include_ranges:
+            if not 0 <= start <= end <= MAX_CODEPOINT:
+                raise ValueError(f"Invalid codepoint range: {start:#x}-{end:#x}")
+            table[start:end + 1] = bytes([ALWAYS_INCLUDE]) * (end - start + 1)
+        for char in skip:
+            table[ord(char)] = SKIP
+        self._table = table
+
+    def classify(self, char: str) -> int:
+        return self._table[ord(char)]
+
+    def split(self, char_set: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Return (accepted, ignored) characters, each sorted by codepoint."""
+        table = self._table
+        found = []
+        ignored = []
+        for char in char_set:
+            kind = table[ord(char)]
+            if kind == ACCEPT:
+                found.append(char)
+            elif kind == ALWAYS_INCLUDE:
+                ignored.append(char)
+
+        found.sort()
+        ignored.sort()
+        return found, ignored
+
+    def fontgen_charset(self) -> List[str]:
+        """Return the always-included characters as fontgen config charset strings."""
+        table = self._table
+        # skip wins over always-include, here as in the table
+        charset = ["".join(c for c in group if table[ord(c)] == ALWAYS_INCLUDE) for group in self.always_include]
+        for start, end in self.always_include_ranges:
+            charset.append("".join(chr(cp) for cp in range(start, end + 1) if table[cp] == ALWAYS_INCLUDE))
+        return [group for group in charset if group]
+
+
+_default_policy: CharPolicy | None = None
+
+
+def default_char_policy() -> CharPolicy:
+    """Return the shared default policy (built on first use)."""
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = CharPolicy()
+    return _default_policy
+
+
+def load_char_policy(policy_file: str) -> CharPolicy:
+    """Load a policy from a JSON file (see module docstring for the format)."""
+    with open(policy_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    ranges = [(_parse_codepoint(a), _parse_codepoint(b)) for a, b in data.get("always_include_ranges", [])]
+    return CharPolicy(
+        skip=data.get("skip", DEFAULT_SKIP),
+        always_include=data.get("always_include", DEFAULT_ALWAYS_INCLUDE),
+        always_include_ranges=ranges,
+    )
+
+
+__all__ = [
+    "ACCEPT",
+    "SKIP",
+    "ALWAYS_INCLUDE",
+    "DEFAULT_SKIP",
+    "DEFAULT_ALWAYS_INCLUDE",
+    "CharPolicy",
+    "default_char_policy",
+    "load_char_policy",
+]
@@ -0,0 +1,218 @@
+"""Compact set of Unicode codepoints backed by a bitmap.
+
+A `set[str]` of single characters costs 50+ bytes per entry and merging two of
+them is a Python-level loop. `CodepointSet` keeps one bit per codepoint in a
+`bytearray` (at most 0x110000 bits = 136 KiB, allocated only up to the highest
+codepoint seen, so ASCII-only sets stay tiny):
+
+    chars = CodepointSet()
+    chars.update(decoded_text)        # bulk insert, deduplicated in C first
+    chars |= other                    # bitwise union / difference / intersection
+    for char in chars: ...            # characters in codepoint order
+    data = chars.to_bytes()           # zlib-compressed bitmap (see from_bytes)
+
+Iterating yields 1-character strings, so a `CodepointSet` can be passed wherever
+the pipeline used to take a set of characters.
+"""
+from __future__ import annotations
+
+import base64
+import zlib
+from typing import Iterable, Iterator
+
+MAX_CODEPOINT = 0x10FFFF
+BITMAP_SIZE = (MAX_CODEPOINT + 1) // 8
+
+_MAGIC = b"CPS1"
+# maps every non-zero byte to 1, so nonzero bytes can be found with bytes.find
+_NONZERO_TABLE = bytes([0]) + bytes([1]) * 255
+# bit offsets set in each byte value
+_BIT_OFFSETS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def _nonzero_indexes(bits: bytearray) -> Iterator[int]:
+    # translate + find run in C, much faster than a regex or a Python loop over
+    # the (mostly zero) bitmap
+    marks = bits.translate(_NONZERO_TABLE)
+    index = marks.find(1)
+    while index != -1:
+        yield index
+        index = marks.find(1, index + 1)
+
+
+class CodepointSet:
+    __slots__ = ("_bits",)
+
+    def __init__(self, chars: Iterable[str] | str = ()):
+        self._bits = bytearray()
+        if chars:
+            self.update(chars)
+
+    @classmethod
+    def _from_int(cls, value: int) -> "CodepointSet":
+        result = cls()
+        if value:
+            result._bits = bytearray(value.to_bytes((value.bit_length() + 7) // 8, "little"))
+        return result
+
+    @classmethod
+    def from_codepoints(cls, codepoints: Iterable[int]) -> "CodepointSet":
+        result = cls()
+        result.update_codepoints(codepoints)
+        return result
+
+    def _int(self) -> int:
+        return int.from_bytes(self._bits, "little")
+
+    def _grow(self, codepoint: int) -> None:
+        size = (codepoint >> 3) + 1
+        if size > len(self._bits):
+            self._bits.extend(bytes(size - len(self._bits)))
+
+    # --- insertion / removal -------------------------------------------------
+
+    def update(self, chars: Iterable[str] | str) -> None:
+        """Add every character of `chars` (a string, set or other iterable)."""
+        if isinstance(chars, CodepointSet):
+            self |= chars
+            return
+        # deduplicate in C first: a large chunk usually has few distinct characters
+        self.update_codepoints(map(ord, set(chars)))
+
+    def update_codepoints(self, codepoints: Iterable[int]) -> None:
+        codepoints = list(codepoints)
+        if not codepoints:
+            return
+        top = max(codepoints)
+        bottom = min(codepoints)
+        if top > MAX_CODEPOINT or bottom < 0:
+            raise ValueError(f"codepoint out of range: {bottom if bottom < 0 else top:#x}")
+        self._grow(top)
+        bits = self._bits
+        for cp in codepoints:
+            bits[cp >> 3] |= 1 << (cp & 7)
+
+    def add(self, char: str) -> None:
+        cp = ord(char)
+        self._grow(cp)
+        self._bits[cp >> 3] |= 1 << (cp & 7)
+
+    def discard(self, char: str) -> None:
+        cp = ord(char)
+        if (cp >> 3) < len(self._bits):
+            self._bits[cp >> 3] &= ~(1 << (cp & 7)) & 0xFF
+
+    def clear(self) -> None:
+        self._bits = bytearray()
+
+    def copy(self) -> "CodepointSet":
+        result = CodepointSet()
+        result._bits = bytearray(self._bits)
+        return result
+
+    # --- queries ---------------------------------------------------------------
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, int):
+            cp = item
+        elif isinstance(item, str) and len(item) == 1:
+            cp = ord(item)
+        else:
+            return False
+        index = cp >> 3
+        return 0 <= index < len(self._bits) and bool(self._bits[index] >> (cp & 7) & 1)
+
+    def __len__(self) -> int:
+        return self._int().bit_count()
+
+    def __bool__(self) -> bool:
+        return self._bits.count(0) != len(self._bits)
+
+    def codepoints(self) -> Iterator[int]:
+        """Yield the codepoints in ascending order."""
+        bits = self._bits
+        for index in _nonzero_indexes(bits):
+            base = index << 3
+            for bit in _BIT_OFFSETS[bits[index]]:
+                yield base + bit
+
+    def __iter__(self) -> Iterator[str]:
+        return map(chr, self.codepoints())
+
+    def to_string(self) -> str:
+        """All characters concatenated in codepoint order."""
+        return "".join(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CodepointSet):
+            return self._int() == other._int()
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(c in self for c in other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        preview = "".join(c for _, c in zip(range(20), self))
+        return f"CodepointSet({len(self)} codepoints: {preview!r}{'...' if len(self) > 20 else ''})"
+
+    # --- set algebra -----------------------------------------------------------
+
+    def __or__(self, other: "CodepointSet") -> "CodepointSet":
+        return CodepointSet._from_int(self._int() | other._int())
+
+    def __and__(self, other: "CodepointSet") -> "CodepointSet":
+        return CodepointSet._from_int(self._int() & other._int())
+
+    def __sub__(self, other: "CodepointSet") -> "CodepointSet":
+        return CodepointSet._from_int(self._int() & ~other._int())
+
+    def __ior__(self, other: "CodepointSet") -> "CodepointSet":
+        other_bits = other._bits
+        if len(other_bits) > len(self._bits):
+            self._bits.extend(bytes(len(other_bits) - len(self._bits)))
+        bits = self._bits
+        if len(other_bits) - other_bits.count(0) < len(bits) >> 6:
+            # sparse (e.g. one small file merged into the corpus): touch only its bytes
+            for index in _nonzero_indexes(other_bits):
+                bits[index] |= other_bits[index]
+        else:
+            bits[:] = (self._int() | other._int()).to_bytes(len(bits), "little")
+        return self
+
+    def __isub__(self, other: "CodepointSet") -> "CodepointSet":
+        if self._bits:
+            self._bits[:] = (self._int() & ~other._int()).to_bytes(len(self._bits), "little")
+        return self
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+
+    # --- serialization ---------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a magic header plus the zlib-compressed bitmap."""
+        return _MAGIC + zlib.compress(bytes(self._bits.rstrip(b"\x00")), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CodepointSet":
+        if data[:4] != _MAGIC:
+            raise ValueError("not a serialized CodepointSet")
+        bits = zlib.decompress(data[4:])
+        if len(bits) > BITMAP_SIZE:
+            raise ValueError("serialized CodepointSet is too large")
+        result = cls()
+        result._bits = bytearray(bits)
+        return result
+
+    def to_base64(self) -> str:
+        """`to_bytes` as ASCII text, for JSON files."""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, text: str) -> "CodepointSet":
+        return cls.from_bytes(base64.b64decode(text))
+
+
+__all__ = ["CodepointSet", "MAX_CODEPOINT", "BITMAP_SIZE"]
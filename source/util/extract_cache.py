@@ -0,0 +1,211 @@
+"""Persistent per-file cache of extracted characters.
+
+The manifest is a JSON file (default `workspace/cache/extract_manifest.json`)
+that records, for every scanned input file, its size, mtime and SHA-1 hash along
+with the unique characters extracted from it (a base64 `CodepointSet` bitmap)
+and, when the scan counted character frequencies, the occurrence counts (with
+text normalization, also the characters as they were before it).
+On the next run a file whose size and mtime are unchanged is skipped entirely; a
+file whose mtime changed but whose content hash is the same is also reused (e.g.
+after a `git checkout`). Archive members (see `archive_inputs`) are checked the
+same way, using the size and mtime recorded in the archive.
+
+The whole manifest is discarded when the extraction options it was built with
+(such as `--treat-xml-as-text`) differ from the current ones.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, Tuple
+
+from source.util.archive_inputs import input_stat, open_input
+from source.util.codepoint_set import CodepointSet
+from source.util.safe_print import safe_print
+
+
+MANIFEST_VERSION = 2
+
+# bump whenever the extraction logic changes in a way that alters results,
+# so manifests written by an older version are invalidated
+EXTRACTOR_VERSION = 2
+
+# files modified this close to the moment they were cached may have been
+# written again within the same mtime tick, so their hash is always re-checked
+_RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+def file_sha1(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Return the hex SHA-1 of a file (or archive member), read in blocks."""
+    digest = hashlib.sha1()
+    with open_input(file_path) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# (size, mtime_ns, SHA-1) of an input file
+Fingerprint = Tuple[int, int, str]
+
+
+def file_fingerprint(file_path: str) -> Fingerprint:
+    """Size, mtime and SHA-1 of a file, taken before it is extracted.
+
+    Taken first, they can only be older than the extracted characters: a file
+    edited during extraction then fails its next hash check and is rescanned.
+    Extraction workers compute it, so the hashing runs in parallel with `-j`.
+    """
+    size, mtime_ns = input_stat(file_path)
+    return size, mtime_ns, file_sha1(file_path)
+
+
+def extract_options(treat_xml_as_text: bool, normalizer=None, xml_selection=None) -> Dict[str, Any]:
+    """Cache options of a scan: everything that changes what is extracted from a file."""
+    options: Dict[str, Any] = {"treat_xml_as_text": treat_xml_as_text}
+    if normalizer is not None and normalizer.active:
+        options["normalizer"] = normalizer.options()
+    if xml_selection is not None and xml_selection.active:
+        options["xml_selection"] = xml_selection.options()
+    return options
+
+
+class ExtractCache:
+    """Manifest of previously extracted files, keyed by normalized path.
+
+    Usage:
+        cache = ExtractCache(manifest_path, {"treat_xml_as_text": False})
+        chars = cache.lookup(path)      # None on a miss
+        fingerprint = file_fingerprint(path)
+        chars = extract(path)
+        cache.store(path, chars, fingerprint=fingerprint)
+        cache.save()
+    """
+
+    def __init__(self, manifest_path: str, options: Dict[str, Any]):
+        self.manifest_path = manifest_path
+        self.options = dict(options, extractor_version=EXTRACTOR_VERSION)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            safe_print(f"⚠️  Ignoring unreadable extraction cache {self.manifest_path}: {e}")
+            return
+
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("options") != self.options:
+            safe_print("🚮  Extraction options changed, discarding the extraction cache.")
+            return
+        self.entries = manifest.get("files", {})
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normpath(file_path)
+
+    def lookup(self, file_path: str) -> CodepointSet | None:
+        """Return the cached characters of `file_path`, or None if it must be rescanned."""
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        size, mtime_ns = input_stat(file_path)
+        if size != entry["size"]:
+            self.misses += 1
+            return None
+
+        racy = entry["mtime_ns"] >= entry["cached_at_ns"] - _RACY_WINDOW_NS
+        if mtime_ns != entry["mtime_ns"] or racy:
+            # same size but touched: compare content before rescanning
+            if file_sha1(file_path) != entry["sha1"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = mtime_ns
+            entry["cached_at_ns"] = time.time_ns()
+
+        self.hits += 1
+        return CodepointSet.from_base64(entry["codepoints"])
+
+    def lookup_counts(self, file_path: str) -> Counter | None:
+        """Like `lookup`, but return the character counts (None if they were not stored)."""
+        entry = self.entries.get(self._key(file_path))
+        if entry is None or "counts" not in entry:
+            self.misses += 1
+            return None
+        if self.lookup(file_path) is None:
+            return None
+        return Counter(entry["counts"])
+
+    def lookup_raw(self, file_path: str) -> CodepointSet | None:
+        """Characters of `file_path` before normalization, after a successful `lookup`."""
+        entry = self.entries.get(self._key(file_path))
+        if entry is None or "raw_codepoints" not in entry:
+            return None
+        return CodepointSet.from_base64(entry["raw_codepoints"])
+
+    def store(
+        self,
+        file_path: str,
+        chars: CodepointSet,
+        counts: Counter | None = None,
+        raw: CodepointSet | None = None,
+        fingerprint: Fingerprint | None = None,
+    ) -> None:
+        """Record the characters (and optionally their counts and pre-normalization characters) of `file_path`.
+
+        `fingerprint` is the `file_fingerprint` taken before the file was
+        extracted; without it the file is hashed now.
+        """
+        size, mtime_ns, sha1 = fingerprint or file_fingerprint(file_path)
+        entry = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "sha1": sha1,
+            "cached_at_ns": time.time_ns(),
+            "codepoints": chars.to_base64(),
+        }
+        if counts is not None:
+            entry["counts"] = dict(counts)
+        if raw is not None:
+            entry["raw_codepoints"] = raw.to_base64()
+        self.entries[self._key(file_path)] = entry
+
+    def prune(self, file_paths) -> None:
+        """Drop entries for files that are no longer part of the scan."""
+        keep = {self._key(p) for p in file_paths}
+        for key in list(self.entries):
+            if key not in keep:
+                del self.entries[key]
+
+    def save(self) -> None:
+        """Write the manifest atomically (write to a temp file, then replace)."""
+        folder = os.path.dirname(self.manifest_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        manifest = {"version": MANIFEST_VERSION, "options": self.options, "files": self.entries}
+        # unique temp name: two builds sharing a manifest must not write the same temp file
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.manifest_path) + ".", suffix=".tmp", dir=folder or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+__all__ = ["ExtractCache", "extract_options", "file_sha1", "file_fingerprint", "Fingerprint", "MANIFEST_VERSION", "EXTRACTOR_VERSION"]
@@ -1,60 +1,77 @@
+from __future__ import annotations
+
 import os
-import re
 import time
+from itertools import islice
+from typing import Iterator
+from source.util.archive_inputs import open_input_text
+from source.util.char_policy import CharPolicy, default_char_policy
+from source.util.codepoint_set import CodepointSet
 from source.util.safe_print import safe_print
 
 
-# need to pass previousSet by reference
-def update_text_file(text_file:str, char_set:set[str]) -> set[str]:
-    with open(text_file, "r", encoding="utf-8") as file:
-        content = file.read()
-        char_set.update(content)
+# number of decoded characters read per chunk when streaming text files
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_text_chunks(text_file:str, chunk_size:int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield the decoded content of `text_file` in chunks of at most `chunk_size` characters.
+
+    The text layer keeps the incremental UTF-8 decoder state between reads, so a
+    multi-byte sequence split across a chunk boundary is never broken, and only one
+    chunk is held in memory at a time (even for huge single-line files).
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    with open_input_text(text_file, encoding="utf-8") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
 
-    first_10_chars = list(char_set)[:10]
-    print(f"File: {text_file}")
-    safe_print("First 10 characters", first_10_chars)
+
+def _print_preview(file_path:str, char_set:set[str] | CodepointSet) -> None:
+    # islice: only the first 10 characters are copied, not the whole (growing) set
+    print(f"File: {file_path}")
+    safe_print("First 10 characters", list(islice(char_set, 10)))
     print()
 
+
+# need to pass previousSet by reference (a set of characters or a CodepointSet)
+def update_text_file(text_file:str, char_set:set[str] | CodepointSet, chunk_size:int = DEFAULT_CHUNK_SIZE, verbose:bool = True) -> set[str] | CodepointSet:
+    for chunk in iter_text_chunks(text_file, chunk_size):
+        char_set.update(chunk)
+
+    if verbose:
+        _print_preview(text_file, char_set)
+
     return char_set
 
-def update_xml_file(xml_file:str, char_set:set[str]) -> set[str]:
-    from source.util.read_xml_txt import read_xml_texts
+def update_xml_file(xml_file:str, char_set:set[str] | CodepointSet, verbose:bool = True, selection=None) -> set[str] | CodepointSet:
+    from source.util.read_xml_txt import iter_xml_texts
 
-    texts = read_xml_texts(xml_file)
-    for text in texts:
+    # selection: optional XmlSelection (see xml_selectors) restricting the elements read
+    for text in iter_xml_texts(xml_file, selection=selection):
         char_set.update(text)
 
-    first_10_chars = list(char_set)[:10]
-    print(f"File: {xml_file}")
-    safe_print("First 10 characters", first_10_chars)
-    print()
+    if verbose:
+        _print_preview(xml_file, char_set)
 
     return char_set
 
 
 # split char_set into 2 sets
 # one for supported characters
-# one for unsupported characters
-# unsupported regex: [©\t\nA-Za-z0-9 `~!@#$%^&*\(\)-_=+\[\{\]\}\\|;:'",<.>/?｀～！＠＃＄％＾＆＊（）－＿＝＋［］｛｝＼｜；：＇＂，＜．＞／？｢｣《》｟｠“”･·。｡､、…—]+
-def split_char_set(char_set):
-    regexSkip = r"[\t\n]+"
-    regexIgnore = r"[©\t\nA-Za-z0-9 `~!@#$%^&*\(\)-_=+\[\{\]\}\\|;:'\",<.>/?｀～！＠＃＄％＾＆＊（）－＿＝＋［］｛｝＼｜；：＇＂，＜．＞／？｢｣《》｟｠“”･·。｡､、…—]+"
-    found = set()
-    ingored = set()
-    for char in char_set:
-        if re.match(regexSkip, char):
-            continue
-
-        if not re.match(regexIgnore, char):
-            found.add(char)
-        else:
-            ingored.add(char)
-
-    # sort the supported characters by their unicode code point
-    found = sorted(found)
-    ingored = sorted(ingored)
-
-    return found, ingored
+# one for characters that are always included by the fontgen config (see char_policy)
+# tab and newline are skipped entirely
+def split_char_set(char_set, policy: CharPolicy | None = None):
+    if policy is None:
+        policy = default_char_policy()
+
+    # both lists are sorted by their unicode code point
+    return policy.split(char_set)
 
 
 def save_char_set(char_set, output_file):
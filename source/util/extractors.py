@@ -0,0 +1,312 @@
+"""Per-format text extractors, looked up by file extension.
+
+Every extractor is a function `(file_path, chunk_size) -> Iterator[str]` that
+streams the file and yields only the strings that end up on screen, never keys,
+identifiers or markup:
+
+    .txt          the whole content, in chunks
+    .xml          text nodes (see `read_xml_txt`), optionally restricted by an
+                  `XmlSelection` (see `xml_selectors`)
+    .json         string values (object keys are skipped)
+    .csv          every cell, except the header row and key/id/context columns
+    .po / .pot    msgstr entries (msgid when the entry is untranslated)
+    .xlf / .xliff <target> of every unit (<source> when there is no target);
+                  inline code elements (<ph>, <bpt>, <ept>, <it>) are skipped
+
+Use `register_extractor(".ext", func)` to add a format and `get_extractor(path)`
+to find the extractor of a file. Extractors open their input with
+`archive_inputs.open_input` / `open_input_text`, so the path may also name a
+member of a zip or tar archive.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import os
+import re
+from functools import partial
+from typing import Callable, Dict, Iterator, List
+
+from source.util.archive_inputs import open_input, open_input_text
+from source.util.extract_char_set import DEFAULT_CHUNK_SIZE, iter_text_chunks
+from source.util.xml_selectors import XmlSelection
+
+
+Extractor = Callable[[str, int], Iterator[str]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(extension: str, extractor: Extractor) -> None:
+    """Register `extractor` for files ending in `extension` (e.g. ".json")."""
+    EXTRACTORS[extension.lower()] = extractor
+
+
+def supported_extensions() -> List[str]:
+    return sorted(EXTRACTORS)
+
+
+def get_extractor(file_path: str, treat_xml_as_text: bool = False, xml_selection: XmlSelection | None = None) -> Extractor | None:
+    """Return the extractor for `file_path`, or None for unsupported files."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".xml" and treat_xml_as_text:
+        return extract_text
+    if ext == ".xml" and xml_selection is not None and EXTRACTORS.get(ext) is extract_xml:
+        return partial(extract_xml, selection=xml_selection)
+    return EXTRACTORS.get(ext)
+
+
+def _iter_decoded(file_path: str, chunk_size: int) -> Iterator[str]:
+    # like iter_text_chunks, but drops a UTF-8 BOM (common in exported JSON/CSV)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    with open_input(file_path) as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def extract_text(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    return iter_text_chunks(file_path, chunk_size)
+
+
+def extract_xml(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, selection: XmlSelection | None = None) -> Iterator[str]:
+    from source.util.read_xml_txt import iter_xml_texts
+
+    return iter_xml_texts(file_path, chunk_size, selection)
+
+
+# --- JSON --------------------------------------------------------------------
+
+# a complete JSON string (group 1 = raw body) and the structural characters
+_JSON_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_JSON_TOKEN_RE = re.compile(r'["{}\[\],:]')
+
+
+def _json_unescape(raw: str) -> str:
+    if "\\" not in raw:
+        return raw
+    try:
+        return json.loads('"' + raw + '"')
+    except ValueError:
+        return raw
+
+
+def extract_json(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    # A string is an object key when it directly follows "{" or "," inside an
+    # object; everything else is a value. Only the container stack is kept, so
+    # memory does not depend on the document size.
+    stack: List[str] = []
+    expect_key = False
+    buf = ""
+    for chunk in _iter_decoded(file_path, chunk_size):
+        buf += chunk
+        pos = 0
+        while True:
+            match = _JSON_TOKEN_RE.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            token = match.group()
+            if token == '"':
+                string = _JSON_STRING_RE.match(buf, match.start())
+                if string is None:
+                    # string continues in the next chunk
+                    pos = match.start()
+                    break
+                pos = string.end()
+                if not (expect_key and stack and stack[-1] == "{"):
+                    text = _json_unescape(string.group(1))
+                    if text:
+                        yield text
+                expect_key = False
+                continue
+            pos = match.end()
+            if token in "{[":
+                stack.append(token)
+                expect_key = token == "{"
+            elif token in "}]":
+                if stack:
+                    stack.pop()
+                expect_key = False
+            elif token == ",":
+                expect_key = bool(stack) and stack[-1] == "{"
+            else:  # ":"
+                expect_key = False
+        buf = buf[pos:]
+
+
+# --- CSV ---------------------------------------------------------------------
+
+# header names of columns holding identifiers rather than display text
+CSV_KEY_COLUMNS = {"key", "id", "identifier", "string_id", "stringid", "context", "msgctxt", "comment", "comments", "note", "notes"}
+
+
+def extract_csv(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    with open_input_text(file_path, encoding="utf-8-sig", newline="") as f:
+        sample = f.read(min(chunk_size, 64 * 1024))
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        first = next(reader, [])
+        skip_columns = {i for i, name in enumerate(first) if name.strip().lower() in CSV_KEY_COLUMNS}
+        # a first row naming a key column is a header; otherwise ask the sniffer
+        has_header = bool(skip_columns)
+        if not has_header:
+            try:
+                has_header = bool(sample) and csv.Sniffer().has_header(sample)
+            except csv.Error:
+                has_header = False
+        if not has_header:
+            yield from (cell for cell in first if cell)
+        for row in reader:
+            for i, cell in enumerate(row):
+                if cell and i not in skip_columns:
+                    yield cell
+
+
+# --- gettext PO --------------------------------------------------------------
+
+_PO_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+_PO_ESCAPE_RE = re.compile(r"\\(.)")
+_PO_KEYWORD_RE = re.compile(r'^(msgctxt|msgid_plural|msgid|msgstr(?:\[\d+\])?)\s+"(.*)"\s*$')
+_PO_CONTINUATION_RE = re.compile(r'^"(.*)"\s*$')
+
+
+def _po_unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return _PO_ESCAPE_RE.sub(lambda m: _PO_ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def _po_entry_texts(entry: Dict[str, List[str]]) -> Iterator[str]:
+    if not "".join(entry.get("msgid", [])):
+        # the header entry (msgid "") holds metadata, not display text
+        return
+    translations = ["".join(parts) for key, parts in entry.items() if key.startswith("msgstr")]
+    if any(translations):
+        yield from (t for t in translations if t)
+        return
+    # untranslated: gettext displays the source strings instead
+    for key in ("msgid", "msgid_plural"):
+        text = "".join(entry.get(key, []))
+        if text:
+            yield text
+
+
+def extract_po(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    entry: Dict[str, List[str]] = {}
+    current = None
+    with open_input_text(file_path, encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                # a blank line or comment ends the entry's continuation lines
+                current = None
+                continue
+            match = _PO_KEYWORD_RE.match(line)
+            if match:
+                keyword = match.group(1)
+                if keyword in ("msgctxt", "msgid") and any(k.startswith("msgstr") for k in entry):
+                    yield from (_po_unescape(t) for t in _po_entry_texts(entry))
+                    entry = {}
+                current = keyword
+                entry.setdefault(current, []).append(match.group(2))
+                continue
+            match = _PO_CONTINUATION_RE.match(line)
+            if match and current is not None:
+                entry[current].append(match.group(1))
+    if entry:
+        yield from (_po_unescape(t) for t in _po_entry_texts(entry))
+
+
+# --- XLIFF -------------------------------------------------------------------
+
+# inline elements carrying native code rather than translatable text
+_XLIFF_CODE_ELEMENTS = {"ph", "bpt", "ept", "it", "sc", "ec", "cp"}
+_XLIFF_UNITS = {"trans-unit", "unit"}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xliff_text(elem) -> str:
+    parts = [elem.text or ""]
+    for child in elem:
+        if _local_name(child.tag) not in _XLIFF_CODE_ELEMENTS:
+            parts.append(_xliff_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def extract_xliff(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    import xml.etree.ElementTree as ET
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    try:
+        with open_input(file_path) as f:
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    break
+                parser.feed(block)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        stack.append(elem)
+                        continue
+                    stack.pop()
+                    if _local_name(elem.tag) not in _XLIFF_UNITS:
+                        continue
+                    sources, targets = [], []
+                    for child in elem.iter():
+                        name = _local_name(child.tag)
+                        if name == "source":
+                            sources.append(_xliff_text(child))
+                        elif name == "target":
+                            targets.append(_xliff_text(child))
+                    for text in (targets if any(targets) else sources):
+                        if text.strip():
+                            yield text
+                    # drop the finished unit so memory stays flat
+                    if stack:
+                        stack[-1].remove(elem)
+        parser.close()
+    except ET.ParseError:
+        # malformed file: fall back to every text node (a superset is safe for a font)
+        yield from extract_xml(file_path, chunk_size)
+
+
+register_extractor(".txt", extract_text)
+register_extractor(".xml", extract_xml)
+register_extractor(".json", extract_json)
+register_extractor(".csv", extract_csv)
+register_extractor(".po", extract_po)
+register_extractor(".pot", extract_po)
+register_extractor(".xlf", extract_xliff)
+register_extractor(".xliff", extract_xliff)
+
+
+__all__ = [
+    "EXTRACTORS",
+    "register_extractor",
+    "supported_extensions",
+    "get_extractor",
+    "extract_text",
+    "extract_xml",
+    "extract_json",
+    "extract_csv",
+    "extract_po",
+    "extract_xliff",
+]
@@ -0,0 +1,375 @@
+"""Read, write and merge text BMFont (.fnt) descriptors as produced by fontgen.
+
+A descriptor is a sequence of lines `tag key=value key="quoted value" ...`.
+`BMFont` keeps the `info` / `common` blocks, the page table, the `char` and
+`kerning` records and any other lines (e.g. `distanceField`) with their raw
+attribute values, so a parsed file is written back unchanged apart from the
+`count` fields, which are recomputed.
+
+Functions:
+    read_fnt(path) -> BMFont
+    write_fnt(font, path)
+    merge_fonts(fonts, page_files) -> BMFont
+        Combine several descriptors into one multi-page font with remapped page ids.
+    to_binary(font) -> bytes / parse_binary(data) -> BMFont
+        The BMFont binary format (version 3), see below.
+    font_values(font) -> dict
+        The values the binary format stores, as numbers, to compare descriptors.
+
+Binary format: "BMF", version byte 3, then blocks of `type (uint8), size
+(uint32)` followed by the block data, all little endian:
+
+    1 info      size int16, flags uint8 (0x80 smooth, 0x40 unicode, 0x20 italic,
+                0x10 bold, 0x08 fixedHeight), charSet uint8, stretchH uint16,
+                aa uint8, padding 4 x uint8 (up, right, down, left), spacing
+                2 x uint8, outline uint8, face name (NUL terminated)
+    2 common    lineHeight, base, scaleW, scaleH, pages (uint16 each), flags
+                uint8 (0x01 packed), alphaChnl, redChnl, greenChnl, blueChnl uint8
+    3 pages     page file names, each NUL terminated
+    4 chars     20 bytes per char: id uint32, x, y, width, height uint16,
+                xoffset, yoffset, xadvance int16, page, chnl uint8
+    5 kerning   10 bytes per pair: first, second uint32, amount int16
+
+Lines other than info / common / page / char / kerning (e.g. `distanceField`)
+and unknown attributes have no place in it and are dropped.
+"""
+from __future__ import annotations
+
+import re
+import struct
+from typing import Dict, List, Tuple
+
+
+_ATTR_RE = re.compile(r'(\w+)=("[^"]*"|\S*)')
+
+Attrs = Dict[str, str]
+
+
+def _parse_line(line: str) -> Tuple[str, Attrs]:
+    tag, _, rest = line.strip().partition(" ")
+    return tag, {key: value for key, value in _ATTR_RE.findall(rest)}
+
+
+def _format_line(tag: str, attrs: Attrs) -> str:
+    if not attrs:
+        return tag
+    return tag + " " + " ".join(f"{key}={value}" for key, value in attrs.items())
+
+
+def unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+class BMFont:
+    """In-memory text BMFont descriptor.
+
+    `pages` maps page id to file name (unquoted); `chars` and `kernings` hold the
+    raw attribute dicts of every record, in file order.
+    """
+
+    def __init__(self) -> None:
+        self.info: Attrs = {}
+        self.common: Attrs = {}
+        self.pages: Dict[int, str] = {}
+        self.chars: List[Attrs] = []
+        self.kernings: List[Attrs] = []
+        # any other line, kept in order after the page table
+        self.extra: List[Tuple[str, Attrs]] = []
+
+    def common_int(self, key: str, default: int = 0) -> int:
+        return int(self.common.get(key, default))
+
+    def char_ids(self) -> List[int]:
+        return [int(c["id"]) for c in self.chars]
+
+    @classmethod
+    def parse(cls, content: str) -> "BMFont":
+        font = cls()
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            tag, attrs = _parse_line(line)
+            if tag == "info":
+                font.info = attrs
+            elif tag == "common":
+                font.common = attrs
+            elif tag == "page":
+                font.pages[int(attrs["id"])] = unquote(attrs["file"])
+            elif tag == "char":
+                font.chars.append(attrs)
+            elif tag == "kerning":
+                font.kernings.append(attrs)
+            elif tag in ("chars", "kernings"):
+                # counts are recomputed when writing
+                continue
+            else:
+                font.extra.append((tag, attrs))
+        return font
+
+    def to_text(self) -> str:
+        lines = [_format_line("info", self.info)]
+        common = dict(self.common)
+        if "pages" in common or self.pages:
+            common["pages"] = str(len(self.pages))
+        lines.append(_format_line("common", common))
+        for page_id in sorted(self.pages):
+            lines.append(f'page id={page_id} file="{self.pages[page_id]}"')
+        for tag, attrs in self.extra:
+            lines.append(_format_line(tag, attrs))
+        lines.append(f"chars count={len(self.chars)}")
+        lines.extend(_format_line("char", c) for c in self.chars)
+        if self.kernings:
+            lines.append(f"kernings count={len(self.kernings)}")
+            lines.extend(_format_line("kerning", k) for k in self.kernings)
+        return "\n".join(lines) + "\n"
+
+
+def read_fnt(path: str) -> BMFont:
+    with open(path, "r", encoding="utf-8") as f:
+        return BMFont.parse(f.read())
+
+
+def write_fnt(font: BMFont, path: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(font.to_text())
+
+
+def merge_fonts(fonts: List[BMFont], page_files: List[List[str]]) -> BMFont:
+    """Merge descriptors generated from the same TTF and size into one font.
+
+    `page_files[i]` lists the new file names for the pages of `fonts[i]` (in page
+    id order); pages are renumbered consecutively across fonts and every char is
+    moved to its new page id. Line metrics come from the first font, the page size
+    is the largest one used, and a character or kerning pair present in several
+    fonts is kept once (first occurrence wins).
+    """
+    if not fonts:
+        raise ValueError("merge_fonts needs at least one font")
+
+    merged = BMFont()
+    merged.info = dict(fonts[0].info)
+    merged.common = dict(fonts[0].common)
+    merged.extra = list(fonts[0].extra)
+    for key in ("scaleW", "scaleH"):
+        if key in merged.common:
+            merged.common[key] = str(max(font.common_int(key) for font in fonts))
+
+    seen_chars = set()
+    seen_kernings = set()
+    next_page = 0
+    for font, files in zip(fonts, page_files):
+        page_ids = sorted(font.pages)
+        if len(files) != len(page_ids):
+            raise ValueError(f"expected {len(page_ids)} page file names, got {len(files)}")
+
+        remap = {}
+        for old_id, file_name in zip(page_ids, files):
+            remap[old_id] = next_page
+            merged.pages[next_page] = file_name
+            next_page += 1
+
+        for char in font.chars:
+            if char["id"] in seen_chars:
+                continue
+            seen_chars.add(char["id"])
+            char = dict(char)
+            char["page"] = str(remap[int(char.get("page", 0))])
+            merged.chars.append(char)
+
+        for kerning in font.kernings:
+            pair = (kerning["first"], kerning["second"])
+            if pair in seen_kernings:
+                continue
+            seen_kernings.add(pair)
+            merged.kernings.append(dict(kerning))
+
+    return merged
+
+
+BINARY_MAGIC = b"BMF\x03"
+
+# Windows character set names used in text descriptors of non-unicode fonts
+_CHARSETS = {
+    "ANSI": 0, "DEFAULT": 1, "SYMBOL": 2, "MAC": 77, "SHIFTJIS": 128, "HANGUL": 129, "JOHAB": 130,
+    "GB2312": 134, "CHINESEBIG5": 136, "GREEK": 161, "TURKISH": 162, "VIETNAMESE": 163, "HEBREW": 177,
+    "ARABIC": 178, "BALTIC": 186, "RUSSIAN": 204, "THAI": 222, "EASTEUROPE": 238, "OEM": 255,
+}
+_CHARSET_NAMES = {value: name for name, value in _CHARSETS.items()}
+
+_INFO_FLAGS = (("smooth", 0x80), ("unicode", 0x40), ("italic", 0x20), ("bold", 0x10), ("fixedHeight", 0x08))
+_INFO_FIELDS = ("size", "stretchH", "aa", "outline")
+_COMMON_FIELDS = ("lineHeight", "base", "scaleW", "scaleH", "packed", "alphaChnl", "redChnl", "greenChnl", "blueChnl")
+CHAR_FIELDS = ("id", "x", "y", "width", "height", "xoffset", "yoffset", "xadvance", "page", "chnl")
+KERNING_FIELDS = ("first", "second", "amount")
+
+# defaults of attributes a text descriptor may leave out
+_DEFAULTS = {"stretchH": 100, "aa": 1}
+
+_INFO_STRUCT = struct.Struct("<hBBHB4B2BB")
+_COMMON_STRUCT = struct.Struct("<5H5B")
+_CHAR_STRUCT = struct.Struct("<I4H3h2B")
+_KERNING_STRUCT = struct.Struct("<IIh")
+
+
+def _int(attrs: Attrs, key: str) -> int:
+    value = unquote(attrs.get(key, ""))
+    return int(value) if value else _DEFAULTS.get(key, 0)
+
+
+def _ints(attrs: Attrs, key: str, count: int) -> List[int]:
+    values = [int(v) for v in unquote(attrs.get(key, "")).split(",") if v.strip()]
+    return (values + [0] * count)[:count]
+
+
+def font_values(font: BMFont) -> dict:
+    """Everything the binary format stores, as numbers and strings (see module docstring)."""
+    info = font.info
+    charset = unquote(info.get("charset", ""))
+    return {
+        "info": {
+            "face": unquote(info.get("face", "")),
+            **{key: _int(info, key) for key in _INFO_FIELDS},
+            **{key: _int(info, key) for key, _ in _INFO_FLAGS},
+            # the character set of a unicode font is not used
+            "charset": 0 if _int(info, "unicode") else _CHARSETS.get(charset.upper(), int(charset) if charset.isdigit() else 0),
+            "padding": _ints(info, "padding", 4),
+            "spacing": _ints(info, "spacing", 2),
+        },
+        "common": {key: _int(font.common, key) for key in _COMMON_FIELDS},
+        "pages": [font.pages[page_id] for page_id in sorted(font.pages)],
+        "chars": [[_int(char, key) for key in CHAR_FIELDS] for char in font.chars],
+        "kernings": [[_int(kerning, key) for key in KERNING_FIELDS] for kerning in font.kernings],
+    }
+
+
+def unrepresentable(font: BMFont) -> List[str]:
+    """Content of a text descriptor that the binary format drops."""
+    dropped = [f"line '{tag}'" for tag, _ in font.extra]
+    known = {
+        "info": {"face", "charset", "padding", "spacing", *_INFO_FIELDS, *(key for key, _ in _INFO_FLAGS)},
+        "common": {"pages", *_COMMON_FIELDS},
+    }
+    for tag, attrs in (("info", font.info), ("common", font.common)):
+        dropped += [f"{tag} {key}" for key in attrs if key not in known[tag]]
+    extra_char_keys = {key for char in font.chars for key in char} - set(CHAR_FIELDS)
+    dropped += [f"char {key}" for key in sorted(extra_char_keys)]
+    return dropped
+
+
+def _block(kind: int, data: bytes) -> bytes:
+    return struct.pack("<BI", kind, len(data)) + data
+
+
+def to_binary(font: BMFont) -> bytes:
+    """Encode a descriptor in the BMFont binary format. Raises ValueError for values out of range."""
+    values = font_values(font)
+    info = values["info"]
+    flags = 0
+    for key, bit in _INFO_FLAGS:
+        if info[key]:
+            flags |= bit
+    common = values["common"]
+    try:
+        data = bytearray(BINARY_MAGIC)
+        data += _block(1, _INFO_STRUCT.pack(
+            info["size"], flags, info["charset"], info["stretchH"], info["aa"],
+            *info["padding"], *info["spacing"], info["outline"],
+        ) + info["face"].encode("utf-8") + b"\0")
+        data += _block(2, _COMMON_STRUCT.pack(
+            common["lineHeight"], common["base"], common["scaleW"], common["scaleH"], len(values["pages"]),
+            0x01 if common["packed"] else 0, common["alphaChnl"], common["redChnl"], common["greenChnl"], common["blueChnl"],
+        ))
+        data += _block(3, b"".join(name.encode("utf-8") + b"\0" for name in values["pages"]))
+        data += _block(4, b"".join(_CHAR_STRUCT.pack(*char) for char in values["chars"]))
+        if values["kernings"]:
+            data += _block(5, b"".join(_KERNING_STRUCT.pack(*kerning) for kerning in values["kernings"]))
+    except struct.error as e:
+        raise ValueError(f"value out of range for the binary BMFont format: {e}") from None
+    return bytes(data)
+
+
+def _records(data: bytes, record: struct.Struct) -> List[tuple]:
+    if len(data) % record.size:
+        raise ValueError(f"binary BMFont block of {len(data)} bytes is not a multiple of {record.size}")
+    return [record.unpack_from(data, pos) for pos in range(0, len(data), record.size)]
+
+
+def parse_binary(data: bytes) -> BMFont:
+    """Decode a BMFont binary descriptor (version 3). Raises ValueError for other data."""
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError("not a version 3 binary BMFont file")
+    font = BMFont()
+    pos = len(BINARY_MAGIC)
+    try:
+        while pos < len(data):
+            kind, size = struct.unpack_from("<BI", data, pos)
+            block = data[pos + 5:pos + 5 + size]
+            pos += 5 + size
+            if kind == 1:
+                size_, flags, charset, stretch, aa, *rest = _INFO_STRUCT.unpack_from(block)
+                padding, spacing, outline = rest[:4], rest[4:6], rest[6]
+                face = block[_INFO_STRUCT.size:].split(b"\0", 1)[0].decode("utf-8")
+                unicode = 1 if flags & 0x40 else 0
+                font.info = {
+                    "face": f'"{face}"',
+                    "size": str(size_),
+                    "bold": str(int(bool(flags & 0x10))),
+                    "italic": str(int(bool(flags & 0x20))),
+                    "charset": '""' if unicode else f'"{_CHARSET_NAMES.get(charset, charset)}"',
+                    "unicode": str(unicode),
+                    "stretchH": str(stretch),
+                    "smooth": str(int(bool(flags & 0x80))),
+                    "aa": str(aa),
+                    "padding": ",".join(map(str, padding)),
+                    "spacing": ",".join(map(str, spacing)),
+                    "outline": str(outline),
+                }
+                if flags & 0x08:
+                    font.info["fixedHeight"] = "1"
+            elif kind == 2:
+                line_height, base, scale_w, scale_h, pages, flags, *channels = _COMMON_STRUCT.unpack_from(block)
+                font.common = {
+                    "lineHeight": str(line_height), "base": str(base), "scaleW": str(scale_w), "scaleH": str(scale_h),
+                    "pages": str(pages), "packed": str(flags & 0x01),
+                    **{key: str(value) for key, value in zip(_COMMON_FIELDS[5:], channels)},
+                }
+            elif kind == 3:
+                names = block.split(b"\0")[:-1]
+                font.pages = {i: name.decode("utf-8") for i, name in enumerate(names)}
+            elif kind == 4:
+                font.chars = [dict(zip(CHAR_FIELDS, map(str, record))) for record in _records(block, _CHAR_STRUCT)]
+            elif kind == 5:
+                font.kernings = [dict(zip(KERNING_FIELDS, map(str, record))) for record in _records(block, _KERNING_STRUCT)]
+    except struct.error as e:
+        raise ValueError(f"truncated binary BMFont file: {e}") from None
+    return font
+
+
+def read_fnt_binary(path: str) -> BMFont:
+    with open(path, "rb") as f:
+        return parse_binary(f.read())
+
+
+def write_fnt_binary(font: BMFont, path: str) -> None:
+    with open(path, "wb") as f:
+        f.write(to_binary(font))
+
+
+__all__ = [
+    "BMFont",
+    "read_fnt",
+    "write_fnt",
+    "merge_fonts",
+    "unquote",
+    "BINARY_MAGIC",
+    "CHAR_FIELDS",
+    "KERNING_FIELDS",
+    "font_values",
+    "unrepresentable",
+    "to_binary",
+    "parse_binary",
+    "read_fnt_binary",
+    "write_fnt_binary",
+]
@@ -0,0 +1,178 @@
+"""Output stage run on a generated font: binary descriptor, JSON index, PNG optimization.
+
+fontgen writes a text .fnt and plain PNG pages. `export_font(output_fnt, ...)`
+adds, next to them:
+
+    binary_fnt      `<output>.bin.fnt`, the same descriptor in the BMFont binary
+                    format (see `fnt_file.to_binary`), parsed without any text
+                    processing by engines that support it
+    json_index      `<output>.fnt.json`, a compact JSON index: info / common
+                    values, page files, one array per char (`char_fields` order)
+                    and kerning triples
+    optimize_png    every page is losslessly re-encoded in place (see
+                    `png_image.optimize_png_file`)
+
+The text .fnt is kept: it is what the other stages (build cache, incremental
+updates, atlas analysis) read. Each written file is checked against it —
+`check_font_outputs` reads the binary and JSON files back and compares every
+value the text descriptor holds, and optimized pages must decode to the
+original pixels — so a mismatch fails the build instead of shipping.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+from source.util.fnt_file import CHAR_FIELDS, KERNING_FIELDS, font_values, read_fnt, read_fnt_binary, unrepresentable, write_fnt_binary
+from source.util.png_image import optimize_png_file
+from source.util.safe_print import safe_print
+
+
+def binary_fnt_path(output_fnt: str) -> str:
+    return output_fnt + ".bin.fnt"
+
+
+def json_index_path(output_fnt: str) -> str:
+    return output_fnt + ".fnt.json"
+
+
+@dataclass
+class OutputReport:
+    fnt_file: str
+    binary_file: str | None = None
+    json_file: str | None = None
+    # total size of the optimized pages before and after
+    png_bytes_before: int = 0
+    png_bytes_after: int = 0
+    pages_optimized: int = 0
+    # what the binary descriptor loses or what strict readers may trip over
+    warnings: List[str] = field(default_factory=list)
+
+
+def build_json_index(values: dict) -> dict:
+    """JSON index of the `fnt_file.font_values` of a descriptor."""
+    return {
+        "info": values["info"],
+        "common": values["common"],
+        "pages": values["pages"],
+        "char_fields": list(CHAR_FIELDS),
+        "chars": values["chars"],
+        "kerning_fields": list(KERNING_FIELDS),
+        "kernings": values["kernings"],
+    }
+
+
+def write_json_index(output_fnt: str) -> str:
+    path = json_index_path(output_fnt)
+    index = build_json_index(font_values(read_fnt(output_fnt + ".fnt")))
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+def _differences(expected: dict, actual: dict, label: str) -> List[str]:
+    problems = []
+    for section in ("info", "common"):
+        for key, value in expected[section].items():
+            if actual[section].get(key) != value:
+                problems.append(f"{label}: {section} {key} is {actual[section].get(key)!r}, expected {value!r}")
+    if actual["pages"] != expected["pages"]:
+        problems.append(f"{label}: pages {actual['pages']} differ from {expected['pages']}")
+    for section in ("chars", "kernings"):
+        if len(actual[section]) != len(expected[section]):
+            problems.append(f"{label}: {len(actual[section])} {section}, expected {len(expected[section])}")
+            continue
+        for i, (got, want) in enumerate(zip(actual[section], expected[section])):
+            if list(got) != list(want):
+                problems.append(f"{label}: {section}[{i}] is {list(got)}, expected {list(want)}")
+                break
+    return problems
+
+
+def check_font_outputs(output_fnt: str, binary_fnt: bool = True, json_index: bool = True) -> List[str]:
+    """Compare the binary and JSON outputs that exist for `output_fnt` with its text .fnt.
+
+    Returns a description of every difference (empty when they are equivalent).
+    """
+    expected = font_values(read_fnt(output_fnt + ".fnt"))
+    problems = []
+    if binary_fnt and os.path.exists(binary_fnt_path(output_fnt)):
+        try:
+            actual = font_values(read_fnt_binary(binary_fnt_path(output_fnt)))
+        except (OSError, ValueError) as e:
+            problems.append(f"{binary_fnt_path(output_fnt)}: {e}")
+        else:
+            problems += _differences(expected, actual, binary_fnt_path(output_fnt))
+    if json_index and os.path.exists(json_index_path(output_fnt)):
+        try:
+            with open(json_index_path(output_fnt), "r", encoding="utf-8") as f:
+                actual = json.load(f)
+            problems += _differences(expected, actual, json_index_path(output_fnt))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            problems.append(f"{json_index_path(output_fnt)}: {e}")
+    return problems
+
+
+def export_font(
+    output_fnt: str,
+    binary_fnt: bool = False,
+    json_index: bool = False,
+    optimize_png: bool = False,
+) -> OutputReport:
+    """Write the requested outputs for the generated `output_fnt`.fnt (see module docstring).
+
+    Raises ValueError when a written file does not match the text descriptor.
+    """
+    fnt_file = output_fnt + ".fnt"
+    report = OutputReport(fnt_file)
+    font = read_fnt(fnt_file)
+    if binary_fnt:
+        report.binary_file = binary_fnt_path(output_fnt)
+        write_fnt_binary(font, report.binary_file)
+        report.warnings = [f"{item} is not stored in the binary descriptor" for item in unrepresentable(font)]
+        if len({len(name) for name in font.pages.values()}) > 1:
+            # the format expects equal lengths; readers that split at NUL bytes do not care
+            report.warnings.append("page file names differ in length, which strict binary BMFont readers reject")
+    if json_index:
+        report.json_file = write_json_index(output_fnt)
+    if binary_fnt or json_index:
+        problems = check_font_outputs(output_fnt, binary_fnt, json_index)
+        if problems:
+            raise ValueError("round trip check failed:\n  " + "\n  ".join(problems))
+    if optimize_png:
+        folder = os.path.dirname(fnt_file)
+        for page_id in sorted(font.pages):
+            before, after = optimize_png_file(os.path.join(folder, font.pages[page_id]))
+            report.png_bytes_before += before
+            report.png_bytes_after += after
+            report.pages_optimized += 1
+    return report
+
+
+def print_output_report(report: OutputReport) -> None:
+    if report.binary_file:
+        safe_print(f"💾  Binary descriptor: {report.binary_file} ({os.path.getsize(report.binary_file)} bytes, "
+                   f"text {os.path.getsize(report.fnt_file)} bytes), round trip verified")
+        for warning in report.warnings:
+            safe_print(f"⚠️  {warning}")
+    if report.json_file:
+        safe_print(f"💾  JSON index: {report.json_file} ({os.path.getsize(report.json_file)} bytes), round trip verified")
+    if report.pages_optimized:
+        saved = report.png_bytes_before - report.png_bytes_after
+        share = saved / report.png_bytes_before if report.png_bytes_before else 0
+        safe_print(f"🗜️  Optimized {report.pages_optimized} page(s): {report.png_bytes_before} -> {report.png_bytes_after} bytes "
+                   f"({share:.1%} smaller, pixels unchanged)")
+
+
+__all__ = [
+    "binary_fnt_path",
+    "json_index_path",
+    "OutputReport",
+    "build_json_index",
+    "write_json_index",
+    "check_font_outputs",
+    "export_font",
+    "print_output_report",
+]
@@ -0,0 +1,154 @@
+"""Per-group subset fonts.
+
+Instead of one font holding every character of the corpus, `--groups` assigns
+the input files to groups (scenes, levels, UI screens) and builds one subset
+font per group from the characters of its files only:
+
+    --groups folders        one group per top-level folder of the text folder
+                            (files directly inside it form the "root" group)
+    --groups groups.json    explicit groups of globs on the relative path,
+                            {"menu": ["ui/*", "*.po"], "chapter1": ["story/ch1/*"]};
+                            a file may belong to several groups
+
+With `--core-font`, the characters used by at least `--core-min-groups` groups
+(plus the always-included policy characters) go to a shared core font instead,
+and each group font only holds what is left, so a scene loads the core font and
+its own small font; group fonts are built without the always-included list, and
+a group left empty gets no font.
+
+Fonts are named `<output>_<group>` and `<output>_core` (see `group_output_names`)
+and listed in `<output>_groups.json`:
+
+    {"core": {"fnt": "x_core.fnt", "chars": 812} | null,
+     "groups": {"menu": {"fnt": "x_menu.fnt" | null, "chars": 40, "files": ["ui/a.txt"]}}}
+
+where `fnt` is null for a font that was not needed or failed to build and
+`files` are relative to the text folder.
+"""
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from source.util.archive_inputs import relative_input_path
+from source.util.codepoint_set import CodepointSet
+from source.util.scan_corpus import path_matches
+from source.util.safe_print import safe_print
+
+
+ROOT_GROUP = "root"
+FOLDER_GROUPS = "folders"
+
+
+def _relative(file_path: str, root: str) -> str:
+    return relative_input_path(file_path, root)
+
+
+def group_by_top_folder(file_paths: Sequence[str], root: str) -> Dict[str, List[str]]:
+    """Group files by the first folder of their path relative to `root`."""
+    groups: Dict[str, List[str]] = {}
+    for file_path in file_paths:
+        rel_path = _relative(file_path, root)
+        group = rel_path.split("/", 1)[0] if "/" in rel_path else ROOT_GROUP
+        groups.setdefault(group, []).append(file_path)
+    return dict(sorted(groups.items()))
+
+
+def load_group_manifest(manifest_file: str) -> Dict[str, List[str]]:
+    """Read `{"group": ["glob", ...]}`. Raises ValueError for malformed files."""
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not data:
+        raise ValueError("expected an object mapping group names to lists of globs")
+    groups = {}
+    for name, patterns in data.items():
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            raise ValueError(f"group '{name}' must be a glob or a list of globs")
+        groups[name] = patterns
+    return groups
+
+
+def group_by_manifest(file_paths: Sequence[str], root: str, manifest: Mapping[str, Sequence[str]]) -> Dict[str, List[str]]:
+    """Assign files to every manifest group whose globs match their relative path."""
+    groups: Dict[str, List[str]] = {name: [] for name in manifest}
+    for file_path in file_paths:
+        rel_path = _relative(file_path, root)
+        for name, patterns in manifest.items():
+            if path_matches(rel_path, patterns):
+                groups[name].append(file_path)
+    return groups
+
+
+def group_chars(groups: Mapping[str, Sequence[str]], per_file_chars: Mapping[str, str]) -> Dict[str, CodepointSet]:
+    """Union of the characters of each group's files (`per_file_chars` as filled by `scan_files`)."""
+    result = {}
+    for name, files in groups.items():
+        chars = CodepointSet()
+        for file_path in files:
+            chars.update(per_file_chars.get(file_path, ""))
+        result[name] = chars
+    return result
+
+
+def split_core(chars_by_group: Mapping[str, Sequence[str]], min_groups: int) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Move the characters used by at least `min_groups` groups to a shared core.
+
+    Returns (core characters, remaining characters of each group), all in codepoint order.
+    """
+    usage = Counter()
+    for chars in chars_by_group.values():
+        usage.update(set(chars))
+    core = sorted((c for c, n in usage.items() if n >= min_groups), key=ord)
+    core_set = set(core)
+    rest = {name: [c for c in chars if c not in core_set] for name, chars in chars_by_group.items()}
+    return core, rest
+
+
+def safe_group_name(name: str) -> str:
+    """Group name usable in a file name."""
+    return re.sub(r"[^\w\-]+", "_", name).strip("_") or "group"
+
+
+def group_output_names(base_name: str, group_names: Sequence[str], core_font: bool) -> Dict[str, str]:
+    """Output name of every group font (`<base>_<group>`), plus `None` -> `<base>_core` with a core font.
+
+    Raises ValueError when two fonts would get the same name, e.g. a folder named
+    "core" next to the core font, or groups "ch 1" and "ch_1".
+    """
+    names: Dict[str | None, str] = {}
+    if core_font:
+        names[None] = f"{base_name}_core"
+    for group in group_names:
+        names[group] = f"{base_name}_{safe_group_name(group)}"
+    owners: Dict[str, List[str]] = {}
+    for group, output_name in names.items():
+        owners.setdefault(output_name, []).append("the core font" if group is None else f"group '{group}'")
+    clashes = [f"{' and '.join(who)} -> {output_name}" for output_name, who in owners.items() if len(who) > 1]
+    if clashes:
+        raise ValueError("font output names collide: " + "; ".join(clashes) + " (rename the groups)")
+    return names
+
+
+def write_group_index(index_file: str, core: dict | None, groups: Dict[str, dict]) -> None:
+    """Write `{"core": {...} | null, "groups": {name: {"fnt", "chars", "files"}}}`."""
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump({"core": core, "groups": groups}, f, indent=2, ensure_ascii=False)
+    safe_print(f"Group font index saved to {index_file}")
+
+
+__all__ = [
+    "ROOT_GROUP",
+    "FOLDER_GROUPS",
+    "group_by_top_folder",
+    "load_group_manifest",
+    "group_by_manifest",
+    "group_chars",
+    "split_core",
+    "safe_group_name",
+    "group_output_names",
+    "write_group_index",
+]
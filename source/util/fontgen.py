@@ -1,13 +1,85 @@
 # use the _tools_/fontgen/fontgen.exe to generate font atlas from ttf file and char chunk file and predefined charset
 
 
+from __future__ import annotations
+
 import os
 import shutil
-import string
+import sys
+import tempfile
+import hashlib
+import json
+from dataclasses import dataclass
+from source.util import profiler
+from source.util.char_frequency import FrequencyTiers
+from source.util.char_policy import CharPolicy, default_char_policy
+from source.util.fnt_file import read_fnt
+from source.util.fnt_output import binary_fnt_path, json_index_path
+from source.util.fontgen_runner import (
+    FontgenResult,
+    command_for_tool,
+    resolve_fontgen_command,
+    run_fontgen_many_sync,
+    run_fontgen_sync,
+)
 from source.util.safe_print import safe_print
 
 
 fontgen_folder = os.path.join("_tools_", "fontgen")
+fontgen_cache_folder = os.path.join("workspace", "cache", "fontgen")
+
+# optional command run instead of the fontgen found in fontgen_folder, e.g.
+# [sys.executable, "benchmark/fake_fontgen.py"] (see fontgen_runner.resolve_fontgen_command);
+# the config path is appended as the last argument
+fontgen_command: list[str] | str | None = None
+
+# seconds before a fontgen process is killed (None = no limit)
+fontgen_timeout: float | None = None
+
+# drop fontgen's stdout (still printed when it fails)
+quiet = False
+
+# per-glyph render cache folder (None = off, see glyph_cache)
+glyph_cache_folder: str | None = None
+
+# bump to invalidate every cached build (e.g. when the output layout changes)
+BUILD_CACHE_VERSION = 1
+
+
+@dataclass
+class FontgenSettings:
+    """Per-build fontgen configuration.
+
+    The module globals above configure the CLI run. Library callers building
+    several fonts at once (see `build_api.build`) pass their own settings down
+    instead, so concurrent builds never read or change shared state. Every
+    `None` folder falls back to the cwd-relative default.
+    """
+    command: list[str] | str | None = None
+    timeout: float | None = None
+    quiet: bool = False
+    folder: str | None = None
+    cache_folder: str | None = None
+    # fontgen configs and shard work folders are created here
+    temp_folder: str | None = None
+    profiler: "profiler.Profiler | None" = None
+    # merged into every generated fontgen config, e.g. {"spacing": {"x": 0, "y": 0}}
+    config_overrides: dict | None = None
+    # reuse glyphs rendered by earlier builds (None = off, see glyph_cache)
+    glyph_cache_folder: str | None = None
+
+
+def current_settings() -> FontgenSettings:
+    """Snapshot of the module-level configuration (what the CLI sets up)."""
+    return FontgenSettings(
+        command=fontgen_command,
+        timeout=fontgen_timeout,
+        quiet=quiet,
+        folder=fontgen_folder,
+        cache_folder=fontgen_cache_folder,
+        profiler=profiler.active,
+        glyph_cache_folder=glyph_cache_folder,
+    )
 
 
 def create_fontgen_config_json(
@@ -15,28 +87,17 @@ def create_fontgen_config_json(
     ttf_file: str,
     output_fnt: str,
     font_size: int = 23,
+    policy: CharPolicy | None = None,
+    overrides: dict | None = None,
 ) -> dict:
+    if policy is None:
+        policy = default_char_policy()
 
     config = {
         "inputs": [ttf_file],
         "output": output_fnt + ".fnt",
-        "charset": [
-            char_chunk_file,
-            # "0123456789",
-            # "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
-            # "abcdefghijklmnopqrstuvwxyz",
-            string.digits,
-            string.ascii_letters,
-            " ",
-            "`~!@#$%^&*()-_=+[]{}\\|;:'\",<.>/?",
-            "０１２３４５６７８９",
-            "ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ",
-            "ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ",
-            "　",
-            "｀～！＠＃＄％＾＆＊（）－＿＝＋［］｛｝＼｜；：＇＂，＜．＞／？",
-            "｢｣《》｟｠“”･·。｡､、…—",
-            "©",
-        ],
+        # the chunk file plus the characters the policy always includes
+        "charset": [char_chunk_file] + policy.fontgen_charset(),
         "dfSize": 6,
         "fontSize": font_size,
         "mode": "msdf",
@@ -44,25 +105,141 @@ def create_fontgen_config_json(
         "padding": {"bottom": 0, "left": 0, "right": 0, "top": 0},
         "spacing": {"x": 1, "y": 1},
     }
+    # e.g. the page size ("packer": {"size": 1024}) or spacing tried by --auto-size
+    config.update(overrides or {})
 
     return config
 
 
-def use_fontgen(
-    char_chunk_file: str,
+def _update_with_file(digest, path: str) -> None:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+
+
+def fontgen_build_key(config: dict, fontgen_exe: str) -> str:
+    """Return a content hash identifying a fontgen build.
+
+    The key covers everything that affects the generated files: the bytes of the
+    TTF inputs and of the character chunk files referenced by the config, the
+    literal charset strings and other config values, the output file name (the
+    .fnt references its pages by name) and the fontgen binary itself. Folder
+    locations are deliberately left out so moving the workspace keeps the cache.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"txt2fnt-build-cache-v{BUILD_CACHE_VERSION}".encode("utf-8"))
+
+    keyed = dict(config)
+    keyed["inputs"] = []
+    for ttf in config["inputs"]:
+        ttf_digest = hashlib.sha256()
+        _update_with_file(ttf_digest, ttf)
+        keyed["inputs"].append(ttf_digest.hexdigest())
+
+    keyed["charset"] = []
+    for entry in config["charset"]:
+        if os.path.isfile(entry):
+            entry_digest = hashlib.sha256()
+            _update_with_file(entry_digest, entry)
+            keyed["charset"].append({"file": entry_digest.hexdigest()})
+        else:
+            keyed["charset"].append(entry)
+
+    keyed["output"] = os.path.basename(config["output"])
+    digest.update(json.dumps(keyed, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+    _update_with_file(digest, fontgen_exe)
+    return digest.hexdigest()
+
+
+def config_codepoints(config: dict) -> list[int]:
+    """Codepoints requested by a config's charset (chunk files and literal strings), in order."""
+    codepoints = []
+    seen = set()
+    for entry in config["charset"]:
+        if os.path.isfile(entry):
+            with open(entry, "r", encoding="utf-8") as f:
+                entry = f.read()
+        for char in entry:
+            if char in "\r\n" or char in seen:
+                continue
+            seen.add(char)
+            codepoints.append(ord(char))
+    return codepoints
+
+
+def fnt_page_files(fnt_file: str) -> list[str]:
+    """Return the page image file names referenced by a text BMFont .fnt file."""
+    font = read_fnt(fnt_file)
+    return [font.pages[page_id] for page_id in sorted(font.pages)]
+
+
+def _fontgen_output_files(output_fnt: str) -> list[str]:
+    # the .fnt itself plus every page image it references (relative to the .fnt)
+    fnt_file = output_fnt + ".fnt"
+    folder = os.path.dirname(fnt_file)
+    return [fnt_file] + [os.path.join(folder, page) for page in fnt_page_files(fnt_file)]
+
+
+def store_fontgen_output(cache_key: str, output_fnt: str, cache_folder: str | None = None) -> bool:
+    """Copy a finished build (.fnt and its pages) into the build cache."""
+    cache_folder = cache_folder or fontgen_cache_folder
+    entry_folder = os.path.join(cache_folder, cache_key)
+    if os.path.exists(entry_folder):
+        return True
+
+    files = _fontgen_output_files(output_fnt)
+    if not all(os.path.exists(f) for f in files):
+        return False
+
+    # fill a temp folder first so an interrupted copy never looks like a valid entry;
+    # the name is unique so concurrent builds of the same key do not collide
+    os.makedirs(cache_folder, exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(prefix=cache_key + ".", suffix=".tmp", dir=cache_folder)
+    try:
+        for f in files:
+            shutil.copyfile(f, os.path.join(tmp_folder, os.path.basename(f)))
+        os.replace(tmp_folder, entry_folder)
+    except OSError:
+        # another build stored the same entry first
+        if not os.path.exists(entry_folder):
+            raise
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+    return True
+
+
+def restore_fontgen_output(cache_key: str, output_fnt: str, cache_folder: str | None = None) -> bool:
+    """Copy a cached build to `output_fnt`.fnt (+ pages). Returns False on a cache miss."""
+    cache_folder = cache_folder or fontgen_cache_folder
+    entry_folder = os.path.join(cache_folder, cache_key)
+    fnt_name = os.path.basename(output_fnt) + ".fnt"
+    cached_fnt = os.path.join(entry_folder, fnt_name)
+    if not os.path.exists(cached_fnt):
+        return False
+
+    names = [fnt_name] + fnt_page_files(cached_fnt)
+    if not all(os.path.exists(os.path.join(entry_folder, n)) for n in names):
+        return False
+
+    # copies rather than hard links, so editing an output never corrupts the cache
+    output_folder = os.path.dirname(output_fnt)
+    for name in names:
+        shutil.copyfile(os.path.join(entry_folder, name), os.path.join(output_folder, name))
+    return True
+
+
+def resolve_output_fnt(
     ttf_file: str,
-    font_size: int = 23,
     custom_fnt_output_folder: str | None = None,
     custom_fnt_output_name: str | None = None,
-) -> bool:
-    import subprocess
-    import json
+) -> str:
+    """Return the output path (without extension) and make sure its folder exists."""
+    ttf_file_name = os.path.splitext(os.path.basename(ttf_file))[0]
 
-    fontgen_exe = os.path.join(fontgen_folder, "fontgen.exe")
-    ttf_file_basename = os.path.basename(ttf_file)
-    ttf_file_name = os.path.splitext(ttf_file_basename)[0]
-
-    output_fnt = ""
     output_fnt_folder = ""
     if custom_fnt_output_folder:
         output_fnt_folder = custom_fnt_output_folder
@@ -75,8 +252,150 @@ def use_fontgen(
         output_fnt = os.path.join(output_fnt_folder, ttf_file_name)
 
     # ensure workspace/fnt folder exists
-    if not os.path.exists(output_fnt_folder):
-        os.makedirs(output_fnt_folder)
+    os.makedirs(output_fnt_folder, exist_ok=True)
+
+    return output_fnt
+
+
+def delete_existing_output(output_fnt: str) -> None:
+    """Delete a previous .fnt and every page it references (plus `output_fnt`.png
+    and the binary / JSON descriptors of the output stage)."""
+    files = []
+    if os.path.exists(output_fnt + ".fnt"):
+        files = _fontgen_output_files(output_fnt)
+    files += [output_fnt + ".png", binary_fnt_path(output_fnt), json_index_path(output_fnt)]
+
+    foundOriAndDelete = False
+    for f in dict.fromkeys(files):
+        if os.path.exists(f):
+            os.remove(f)
+            foundOriAndDelete = True
+
+    if foundOriAndDelete:
+        safe_print(f"🚮  Deleted existing output files for clean generation. ({output_fnt}.fnt and {output_fnt}.png)")
+
+
+def find_fontgen_command(settings: FontgenSettings | None = None) -> list[str] | None:
+    """Return the command that launches fontgen, or None (with a warning) if it is missing."""
+    settings = settings or current_settings()
+    folder = settings.folder or fontgen_folder
+    command = resolve_fontgen_command(folder, settings.command)
+    if command is not None:
+        return command
+
+    # fontgen folder check if folder exists, if not, create folder, exit with error and ask user to add fontgen tool
+    if not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+        safe_print(f"⚠️  fontgen folder not found at {folder}. Please ensure the tool is present.")
+        return None
+
+    if sys.platform == "win32":
+        safe_print(f"⚠️  fontgen.exe not found at {os.path.join(folder, 'fontgen.exe')}. Please ensure the tool is present.")
+    else:
+        safe_print(f"⚠️  No runnable fontgen in {folder} (a native `fontgen`, `fontgen.hl` with `hl`, or `fontgen.exe` with `wine`). "
+                   "Use --fontgen to point to it.")
+    return None
+
+
+def find_fontgen_exe(settings: FontgenSettings | None = None) -> str | None:
+    """Return the fontgen tool path (hashed by the build cache), or None if it is missing."""
+    command = find_fontgen_command(settings)
+    # the last element is the tool itself, after any interpreter (python, hl, wine)
+    return None if command is None else command[-1]
+
+
+def write_fontgen_config(config: dict, config_json_path: str) -> None:
+    with open(config_json_path, "w", encoding="utf-8") as json_file:
+        json.dump(config, json_file, indent=2)
+
+
+def _print_fontgen_line(stream: str, line: str) -> None:
+    safe_print(line)
+
+
+def _report_fontgen(result: FontgenResult, settings: FontgenSettings) -> None:
+    if settings.profiler is not None:
+        settings.profiler.record_fontgen(result.command, result.returncode, result.seconds, result.error)
+    if result.ok:
+        return
+    if settings.quiet:
+        # the output was not streamed, show it now that it matters
+        for line in result.stderr or result.stdout:
+            safe_print(line)
+    reason = result.error or f"exit code {result.returncode}"
+    safe_print(f"⚠️  fontgen failed ({reason}): {result.command[-1]}")
+
+
+def _fontgen_command_for(fontgen_exe: str, settings: FontgenSettings) -> list[str]:
+    command = resolve_fontgen_command(settings.folder or fontgen_folder, settings.command)
+    return command if command is not None else command_for_tool(fontgen_exe)
+
+
+def run_fontgen(fontgen_exe: str, config_json_path: str, settings: FontgenSettings | None = None) -> FontgenResult:
+    """Run fontgen on a config file, streaming its output line by line unless `quiet`."""
+    settings = settings or current_settings()
+    if not settings.quiet:
+        safe_print(f"fontgen_exe: {fontgen_exe}")
+        safe_print(f"config_json_path: {config_json_path}")
+    result = run_fontgen_sync(
+        _fontgen_command_for(fontgen_exe, settings),
+        config_json_path,
+        on_line=None if settings.quiet else _print_fontgen_line,
+        timeout=settings.timeout,
+    )
+    _report_fontgen(result, settings)
+    return result
+
+
+def run_fontgen_configs(
+    fontgen_exe: str,
+    config_json_paths: list[str],
+    settings: FontgenSettings | None = None,
+) -> list[FontgenResult]:
+    """Run fontgen on several config files concurrently (one process each)."""
+    settings = settings or current_settings()
+    results = run_fontgen_many_sync(
+        _fontgen_command_for(fontgen_exe, settings),
+        config_json_paths,
+        on_line=None if settings.quiet else _print_fontgen_line,
+        timeout=settings.timeout,
+    )
+    for result in results:
+        _report_fontgen(result, settings)
+    return results
+
+
+def use_fontgen(
+    char_chunk_file: str,
+    ttf_file: str,
+    font_size: int = 23,
+    custom_fnt_output_folder: str | None = None,
+    custom_fnt_output_name: str | None = None,
+    use_build_cache: bool = True,
+    policy: CharPolicy | None = None,
+    shards: int = 1,
+    settings: FontgenSettings | None = None,
+    tiers: FrequencyTiers | None = None,
+) -> bool:
+    settings = settings or current_settings()
+    if shards > 1 or tiers is not None:
+        from source.util.fontgen_shard import use_fontgen_sharded
+
+        return use_fontgen_sharded(
+            char_chunk_file=char_chunk_file,
+            ttf_file=ttf_file,
+            shards=shards,
+            tiers=tiers,
+            font_size=font_size,
+            custom_fnt_output_folder=custom_fnt_output_folder,
+            custom_fnt_output_name=custom_fnt_output_name,
+            use_build_cache=use_build_cache,
+            policy=policy,
+            settings=settings,
+        )
+
+    ttf_file_basename = os.path.basename(ttf_file)
+    output_fnt = resolve_output_fnt(ttf_file, custom_fnt_output_folder, custom_fnt_output_name)
 
     # create config json and save to temp file in workspace folder
     config = create_fontgen_config_json(
@@ -84,57 +403,83 @@ def use_fontgen(
         ttf_file=ttf_file,
         output_fnt=output_fnt,
         font_size=font_size,
+        policy=policy,
+        overrides=settings.config_overrides,
     )
 
-    config_json_path = os.path.join("temp_fontgen_config.json")
-    with open(config_json_path, "w", encoding="utf-8") as json_file:
-        json.dump(config, json_file, indent=2)
+    # unique name per call so concurrent builds (batch mode) never share a config
+    config_folder = settings.temp_folder or "."
+    os.makedirs(config_folder, exist_ok=True)
+    config_fd, config_json_path = tempfile.mkstemp(prefix="temp_fontgen_config_", suffix=".json", dir=config_folder)
+    os.close(config_fd)
+    if settings.temp_folder is None:
+        config_json_path = os.path.basename(config_json_path)
+    write_fontgen_config(config, config_json_path)
+    try:
+        return _generate(config, config_json_path, output_fnt, ttf_file_basename, use_build_cache, settings)
+    finally:
+        os.remove(config_json_path)
 
-    foundOriAndDelete = False
-    # delete original output_fnt .fnt and .png if exists
-    if os.path.exists(output_fnt + ".fnt"):
-        os.remove(output_fnt + ".fnt")
-        foundOriAndDelete = True
-    if os.path.exists(output_fnt + ".png"):
-        os.remove(output_fnt + ".png")
-        foundOriAndDelete = True
 
-    if foundOriAndDelete:
-        safe_print(f"🚮  Deleted existing output files for clean generation. ({output_fnt}.fnt and {output_fnt}.png)")
+def _generate(
+    config: dict,
+    config_json_path: str,
+    output_fnt: str,
+    ttf_file_basename: str,
+    use_build_cache: bool,
+    settings: FontgenSettings,
+) -> bool:
+    # delete original output_fnt .fnt and .png if exists
+    delete_existing_output(output_fnt)
 
     # run fontgen exe with config json
     print()
     safe_print(f"⏳  Generating font: {output_fnt}.fnt using TTF: {ttf_file_basename}")
 
-    # fontgen_folder check if folder exists, if not, create folder, exit with error and ask user to add fontgen tool
-    if not os.path.exists(fontgen_folder):
-        os.makedirs(fontgen_folder)
-        safe_print(f"⚠️  fontgen folder not found at {fontgen_folder}. Please ensure the tool is present.")
+    fontgen_exe = find_fontgen_exe(settings)
+    if fontgen_exe is None:
         return False
 
-    # if fontgen exe not found, exit with error
-    if not os.path.exists(fontgen_exe):
-        safe_print(f"⚠️  fontgen.exe not found at {fontgen_exe}. Please ensure the tool is present.")
-        return False
+    cache_key = None
+    if use_build_cache:
+        # glyph-cache builds are shelf-packed and may lack kerning pairs: never
+        # serve one to a regular build or the other way round
+        keyed_config = dict(config, glyph_cache=True) if settings.glyph_cache_folder else config
+        cache_key = fontgen_build_key(keyed_config, fontgen_exe)
+        if restore_fontgen_output(cache_key, output_fnt, settings.cache_folder):
+            safe_print(f"♻️  Inputs unchanged, reused cached build {cache_key[:12]} for {output_fnt}.fnt")
+            return True
 
-    safe_print(f"fontgen_exe: {fontgen_exe}")
-    safe_print(f"config_json_path: {config_json_path}")
-    result = subprocess.run(
-        [
-            ".\\" + fontgen_exe,
-        ]
-        + [
-            ".\\" + config_json_path,
-        ],
-        capture_output=True,
-        text=True,
-    )
-    safe_print(result.stdout)
-    safe_print(result.stderr)
+    if settings.glyph_cache_folder:
+        from source.util.glyph_cache import generate_with_glyph_cache
+
+        generated = generate_with_glyph_cache(
+            config,
+            config_codepoints(config),
+            output_fnt,
+            fontgen_exe,
+            lambda path: run_fontgen(fontgen_exe, path, settings),
+            settings.glyph_cache_folder,
+            settings.temp_folder or os.path.dirname(config_json_path) or ".",
+        )
+        if generated is False:
+            safe_print("⚠️  Font generation failed.")
+            return False
+        if generated:
+            if cache_key is not None:
+                store_fontgen_output(cache_key, output_fnt, settings.cache_folder)
+            safe_print(f"✅  Font generation completed. Please check the {os.path.dirname(output_fnt) or '.'} folder.")
+            return True
+        # the cache cannot hold this output: regular build
+        delete_existing_output(output_fnt)
+
+    run_fontgen(fontgen_exe, config_json_path, settings)
 
     # check if output fnt file is created
     if os.path.exists(output_fnt + ".fnt"):
-        safe_print("✅  Font generation completed. Please check the workspace/fnt/ folder.")
+        if cache_key is not None:
+            store_fontgen_output(cache_key, output_fnt, settings.cache_folder)
+        safe_print(f"✅  Font generation completed. Please check the {os.path.dirname(output_fnt) or '.'} folder.")
         return True
     else:
         safe_print("⚠️  Font generation failed.")
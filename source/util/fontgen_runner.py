@@ -0,0 +1,204 @@
+"""Run fontgen as an asyncio subprocess.
+
+Functions:
+    resolve_fontgen_command(fontgen_folder, override) -> list[str] | None
+        Find how to launch fontgen on this platform (see below).
+    run_fontgen_async(command, config_path, on_line, timeout) -> FontgenResult
+        Start fontgen on one config file, stream each stdout / stderr line to
+        `on_line(stream, line)` as it arrives and wait for it, killing the process
+        on timeout or cancellation.
+    run_fontgen_many(command, config_paths, on_line, timeout, concurrency)
+        Run several configs concurrently (e.g. shards) and return their results.
+    run_fontgen_sync(...)
+        Blocking wrapper around `run_fontgen_async` for synchronous callers.
+
+Resolution order: an explicit `override` command, the `TXT2FNT_FONTGEN`
+environment variable, then inside `fontgen_folder`: `fontgen.exe` on Windows;
+elsewhere a native `fontgen` binary, `fontgen.hl` run with HashLink (`hl`), or
+`fontgen.exe` run with `wine`. Paths ending in `.py` / `.hl` are launched with
+the Python / HashLink interpreter. The config path is always passed as the last
+argument, as an absolute path, so the working directory does not matter.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import shlex
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Sequence
+
+# on_line(stream, line) with stream "stdout" or "stderr" and the line without its newline
+LineCallback = Callable[[str, str], None]
+
+FONTGEN_ENV_VAR = "TXT2FNT_FONTGEN"
+
+
+@dataclass
+class FontgenResult:
+    command: List[str]
+    returncode: int | None
+    seconds: float
+    stdout: List[str] = field(default_factory=list)
+    stderr: List[str] = field(default_factory=list)
+    timed_out: bool = False
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.error
+
+
+def command_for_tool(tool: str) -> List[str]:
+    """Return the command launching the fontgen `tool` path (interpreter added if needed)."""
+    ext = os.path.splitext(tool)[1].lower()
+    if ext == ".py":
+        return [sys.executable, tool]
+    if ext == ".hl":
+        return ["hl", tool]
+    return [tool]
+
+
+def resolve_fontgen_command(fontgen_folder: str, override: Sequence[str] | str | None = None) -> List[str] | None:
+    """Return the command prefix that runs fontgen, or None if it cannot be found."""
+    if override:
+        if isinstance(override, str):
+            return command_for_tool(override) if os.path.exists(override) else shlex.split(override)
+        return list(override)
+
+    env = os.environ.get(FONTGEN_ENV_VAR)
+    if env:
+        return command_for_tool(env) if os.path.exists(env) else shlex.split(env)
+
+    exe = os.path.join(fontgen_folder, "fontgen.exe")
+    if sys.platform == "win32":
+        return [os.path.abspath(exe)] if os.path.isfile(exe) else None
+
+    native = os.path.join(fontgen_folder, "fontgen")
+    if os.path.isfile(native) and os.access(native, os.X_OK):
+        return [os.path.abspath(native)]
+    hl_file = os.path.join(fontgen_folder, "fontgen.hl")
+    if os.path.isfile(hl_file) and shutil.which("hl"):
+        return ["hl", os.path.abspath(hl_file)]
+    if os.path.isfile(exe) and shutil.which("wine"):
+        return ["wine", os.path.abspath(exe)]
+    return None
+
+
+async def _pump(stream: asyncio.StreamReader, name: str, lines: List[str], on_line: LineCallback | None) -> None:
+    while True:
+        raw = await stream.readline()
+        if not raw:
+            return
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        lines.append(line)
+        if on_line is not None:
+            on_line(name, line)
+
+
+async def run_fontgen_async(
+    command: Sequence[str],
+    config_path: str,
+    on_line: LineCallback | None = None,
+    timeout: float | None = None,
+) -> FontgenResult:
+    """Run `command + [config_path]` and return its result (never raises for process errors).
+
+    Cancelling the awaiting task kills the process before the cancellation propagates.
+    """
+    argv = list(command) + [os.path.abspath(config_path)]
+    result = FontgenResult(argv, None, 0.0)
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.perf_counter() - start
+        return result
+
+    async def communicate() -> int:
+        await asyncio.gather(
+            _pump(process.stdout, "stdout", result.stdout, on_line),
+            _pump(process.stderr, "stderr", result.stderr, on_line),
+        )
+        return await process.wait()
+
+    try:
+        result.returncode = await asyncio.wait_for(communicate(), timeout)
+    except asyncio.TimeoutError:
+        result.timed_out = True
+        result.error = f"timed out after {timeout}s"
+        await _kill(process)
+        result.returncode = process.returncode
+    except asyncio.CancelledError:
+        await _kill(process)
+        raise
+    finally:
+        result.seconds = time.perf_counter() - start
+    return result
+
+
+async def _kill(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+async def run_fontgen_many(
+    command: Sequence[str],
+    config_paths: Sequence[str],
+    on_line: LineCallback | None = None,
+    timeout: float | None = None,
+    concurrency: int | None = None,
+) -> List[FontgenResult]:
+    """Run one fontgen process per config, at most `concurrency` at a time, in input order."""
+    semaphore = asyncio.Semaphore(concurrency or len(config_paths) or 1)
+
+    async def one(config_path: str) -> FontgenResult:
+        async with semaphore:
+            return await run_fontgen_async(command, config_path, on_line, timeout)
+
+    return list(await asyncio.gather(*(one(p) for p in config_paths)))
+
+
+def run_fontgen_sync(
+    command: Sequence[str],
+    config_path: str,
+    on_line: LineCallback | None = None,
+    timeout: float | None = None,
+) -> FontgenResult:
+    """Blocking `run_fontgen_async`; safe to call from worker threads (one event loop each)."""
+    return asyncio.run(run_fontgen_async(command, config_path, on_line, timeout))
+
+
+def run_fontgen_many_sync(
+    command: Sequence[str],
+    config_paths: Sequence[str],
+    on_line: LineCallback | None = None,
+    timeout: float | None = None,
+    concurrency: int | None = None,
+) -> List[FontgenResult]:
+    return asyncio.run(run_fontgen_many(command, config_paths, on_line, timeout, concurrency))
+
+
+__all__ = [
+    "FONTGEN_ENV_VAR",
+    "FontgenResult",
+    "LineCallback",
+    "command_for_tool",
+    "resolve_fontgen_command",
+    "run_fontgen_async",
+    "run_fontgen_many",
+    "run_fontgen_sync",
+    "run_fontgen_many_sync",
+]
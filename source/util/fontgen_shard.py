@@ -0,0 +1,161 @@
+"""Sharded font generation for very large character sets.
+
+fontgen packs one atlas on a single thread, which dominates build time for
+20k+ CJK glyphs. `use_fontgen_sharded` splits the accepted characters into N
+contiguous codepoint ranges, runs one fontgen process per shard concurrently
+(each with its own config and temp folder) and merges the shard descriptors into
+one multi-page .fnt whose page ids are remapped (see `fnt_file.merge_fonts`).
+
+With `tiers` (see `char_frequency.FrequencyTiers`) the characters are split by
+frequency instead, hottest tier first, so the merged pages are ordered from the
+most to the least used glyphs.
+
+Only the first shard receives the always-included policy charset. Kerning pairs
+whose two characters ended up in different shards are not generated.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import List
+
+from source.util.char_frequency import FrequencyTiers
+from source.util.char_policy import CharPolicy
+from source.util.fnt_file import merge_fonts, read_fnt, write_fnt
+from source.util.fontgen import (
+    FontgenSettings,
+    create_fontgen_config_json,
+    current_settings,
+    delete_existing_output,
+    find_fontgen_exe,
+    fontgen_build_key,
+    resolve_output_fnt,
+    restore_fontgen_output,
+    run_fontgen_configs,
+    store_fontgen_output,
+    write_fontgen_config,
+)
+from source.util.safe_print import safe_print
+
+
+# shard work folders are created here (relative to cwd, like the fontgen config)
+shard_temp_folder = os.path.join("workspace", "temp")
+
+
+def read_char_chunk_file(char_chunk_file: str) -> str:
+    """Return the characters of a chunk file written by `save_char_set`."""
+    with open(char_chunk_file, "r", encoding="utf-8") as f:
+        return f.read().replace("\n", "")
+
+
+def split_into_shards(chars: str, shards: int) -> List[str]:
+    """Split `chars` into at most `shards` contiguous, evenly sized, non-empty parts."""
+    shards = max(1, min(shards, len(chars)))
+    size, extra = divmod(len(chars), shards)
+    parts = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        parts.append(chars[start:end])
+        start = end
+    return [p for p in parts if p] or [chars]
+
+
+def use_fontgen_sharded(
+    char_chunk_file: str,
+    ttf_file: str,
+    shards: int,
+    font_size: int = 23,
+    custom_fnt_output_folder: str | None = None,
+    custom_fnt_output_name: str | None = None,
+    use_build_cache: bool = True,
+    policy: CharPolicy | None = None,
+    settings: FontgenSettings | None = None,
+    tiers: FrequencyTiers | None = None,
+) -> bool:
+    settings = settings or current_settings()
+    output_fnt = resolve_output_fnt(ttf_file, custom_fnt_output_folder, custom_fnt_output_name)
+    output_folder = os.path.dirname(output_fnt)
+    output_name = os.path.basename(output_fnt)
+
+    chars = read_char_chunk_file(char_chunk_file)
+    if tiers is not None:
+        parts = tiers.split(chars)
+        kind = "frequency tiers"
+    else:
+        parts = split_into_shards(chars, shards)
+        kind = "shards"
+
+    print()
+    safe_print(f"⏳  Generating font: {output_fnt}.fnt using TTF: {os.path.basename(ttf_file)} in {len(parts)} {kind}")
+
+    fontgen_exe = find_fontgen_exe(settings)
+    if fontgen_exe is None:
+        return False
+
+    cache_key = None
+    if use_build_cache:
+        full_config = create_fontgen_config_json(char_chunk_file, ttf_file, output_fnt, font_size, policy, settings.config_overrides)
+        layout = [len(p) for p in parts] if tiers is not None else len(parts)
+        cache_key = fontgen_build_key(dict(full_config, shards=layout), fontgen_exe)
+        if restore_fontgen_output(cache_key, output_fnt, settings.cache_folder):
+            safe_print(f"♻️  Inputs unchanged, reused cached build {cache_key[:12]} for {output_fnt}.fnt")
+            return True
+
+    delete_existing_output(output_fnt)
+
+    temp_folder = settings.temp_folder or shard_temp_folder
+    os.makedirs(temp_folder, exist_ok=True)
+    work_folder = tempfile.mkdtemp(prefix="fontgen_shards_", dir=temp_folder)
+    try:
+        config_paths = []
+        shard_outputs = []
+        for i, part in enumerate(parts):
+            shard_chunk = os.path.join(work_folder, f"shard_{i}.txt")
+            with open(shard_chunk, "w", encoding="utf-8") as f:
+                f.write(part)
+
+            shard_output = os.path.join(work_folder, f"shard_{i}")
+            config = create_fontgen_config_json(shard_chunk, ttf_file, shard_output, font_size, policy, settings.config_overrides)
+            if i > 0:
+                # the always-included characters only need to be packed once
+                config["charset"] = [shard_chunk]
+
+            config_path = os.path.join(work_folder, f"shard_{i}.json")
+            write_fontgen_config(config, config_path)
+            config_paths.append(config_path)
+            shard_outputs.append(shard_output)
+
+        # one fontgen process per shard, all awaited on one event loop
+        run_fontgen_configs(fontgen_exe, config_paths, settings)
+
+        missing = [o + ".fnt" for o in shard_outputs if not os.path.exists(o + ".fnt")]
+        if missing:
+            safe_print(f"⚠️  Font generation failed for {len(missing)} of {len(parts)} {kind}: {', '.join(missing)}")
+            return False
+
+        fonts = [read_fnt(o + ".fnt") for o in shard_outputs]
+        page_files = []
+        page_number = 0
+        for font in fonts:
+            names = []
+            for page_id in sorted(font.pages):
+                source_page = os.path.join(work_folder, font.pages[page_id])
+                new_name = f"{output_name}_{page_number}{os.path.splitext(source_page)[1]}"
+                shutil.move(source_page, os.path.join(output_folder, new_name))
+                names.append(new_name)
+                page_number += 1
+            page_files.append(names)
+
+        write_fnt(merge_fonts(fonts, page_files), output_fnt + ".fnt")
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    if cache_key is not None:
+        store_fontgen_output(cache_key, output_fnt, settings.cache_folder)
+    safe_print(f"✅  Font generation completed ({page_number} pages from {len(parts)} {kind}). Please check the {output_folder} folder.")
+    return True
+
+
+__all__ = ["read_char_chunk_file", "split_into_shards", "use_fontgen_sharded"]
@@ -0,0 +1,374 @@
+"""Glyph-level render cache reused across builds.
+
+The build cache (`fontgen.fontgen_build_key`) only helps when a build's inputs
+are identical to a previous one; adding a single string to the corpus reruns
+fontgen on every glyph. With `--glyph-cache`, each glyph fontgen renders is kept
+instead: its bitmap (cut out of the generated page) and its metrics, keyed by
+the render settings — TTF bytes, font size, `dfSize`, mode, padding, options,
+the fontgen binary — and the codepoint. A later build only sends the characters
+missing from the cache to fontgen, then packs the cached and the new glyphs
+onto fresh pages and writes the .fnt itself.
+
+Layout: one folder per render key in the cache folder, holding one pair of
+files per fontgen run (so concurrent builds never write the same file):
+
+    <render key>/run-<time>-<pid>-<n>.bin    zlib-compressed glyph bitmaps
+    <render key>/run-<time>-<pid>-<n>.json   metrics, bitmap offsets, the info /
+                                             common lines and kerning pairs
+
+Cost: the pages fontgen outputs are decoded in Python (see `png_image`), so
+once the output page size is known the miss-only run is given pages just large
+enough for the missing glyphs, and only the rows down to the lowest glyph are
+decoded. None / Sub / Up rows decode quickly; a page with more than
+`MAX_SLOW_PAGE_BYTES` in Average / Paeth rows makes the build fall back to a
+regular fontgen run, which is faster than decoding it. Every build still packs and writes all output pages itself (about
+0.1 s per 1024 x 1024 page).
+
+Spacing and page size are not part of the key (they only affect packing), so
+`--auto-size` trials with other page sizes or spacings reuse the same glyphs.
+Glyph placement differs from fontgen's packer (a shelf packer is used), and a
+kerning pair is only known when both characters were rendered in the same run.
+Delete the cache folder to reset it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from itertools import count
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from source.util.fnt_file import BMFont, read_fnt, write_fnt
+from source.util.png_image import PngImage, read_png, write_png
+from source.util.safe_print import safe_print
+
+
+DEFAULT_GLYPH_CACHE_FOLDER = os.path.join("workspace", "cache", "glyphs")
+
+# bump to invalidate every cached glyph (e.g. when the stored layout changes)
+GLYPH_CACHE_VERSION = 1
+
+# config keys that only decide which glyphs are packed where, not how they look
+_PACKING_KEYS = ("charset", "output", "spacing", "packer")
+
+# the glyph cache is not used when a fontgen page holds more image bytes than this
+# in Average / Paeth rows (undone in Python, about 3 s per 4 MB): a regular build is faster
+MAX_SLOW_PAGE_BYTES = 4 * 1024 * 1024
+
+# char record fields set by the packer ("page" is kept to preserve the field order)
+_PLACEMENT_FIELDS = ("id", "x", "y")
+
+_run_numbers = count()
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def glyph_render_key(config: dict, fontgen_exe: str) -> str:
+    """Hash of everything in a fontgen config that changes how a glyph is rendered."""
+    keyed = {k: v for k, v in config.items() if k not in _PACKING_KEYS}
+    keyed["inputs"] = [_file_digest(ttf) for ttf in config["inputs"]]
+    keyed["fontgen"] = _file_digest(fontgen_exe)
+    keyed["version"] = GLYPH_CACHE_VERSION
+    return hashlib.sha256(json.dumps(keyed, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class GlyphCache:
+    """The cached glyphs of one render key (see module docstring)."""
+
+    def __init__(self, cache_folder: str, render_key: str):
+        self.folder = os.path.join(cache_folder, render_key)
+        # codepoint -> (run name, entry); later runs win
+        self._glyphs: Dict[int, Tuple[str, dict]] = {}
+        # codepoints fontgen was asked for but did not output (not in the TTF)
+        self._absent = set()
+        self._kernings: Dict[Tuple[str, str], dict] = {}
+        self._channels: Dict[str, int] = {}
+        self.font: dict | None = None
+        self.page_size = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isdir(self.folder):
+            return
+        for name in sorted(os.listdir(self.folder)):
+            if not (name.startswith("run-") and name.endswith(".json")):
+                continue
+            run = name[:-len(".json")]
+            try:
+                with open(os.path.join(self.folder, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._channels[run] = data["channels"]
+            for cp, entry in data["glyphs"].items():
+                self._glyphs[int(cp)] = (run, entry)
+                self._absent.discard(int(cp))
+            for cp in data["absent"]:
+                if cp not in self._glyphs:
+                    self._absent.add(cp)
+            for kerning in data["kernings"]:
+                self._kernings[(kerning["first"], kerning["second"])] = kerning
+            self.font = data["font"]
+            self.page_size = max(self.page_size, data["page_size"])
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    def split(self, codepoints: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """Return (cached, missing) codepoints; characters known to be absent from the TTF count as cached."""
+        cached, missing = [], []
+        for cp in codepoints:
+            (cached if cp in self._glyphs or cp in self._absent else missing).append(cp)
+        return cached, missing
+
+    def load(self, codepoints: Iterable[int]) -> Dict[int, Tuple[dict, PngImage]]:
+        """Metrics and bitmap of each cached glyph among `codepoints`."""
+        by_run: Dict[str, List[int]] = {}
+        for cp in codepoints:
+            if cp in self._glyphs:
+                by_run.setdefault(self._glyphs[cp][0], []).append(cp)
+        result = {}
+        for run, cps in by_run.items():
+            channels = self._channels[run]
+            with open(os.path.join(self.folder, run + ".bin"), "rb") as f:
+                for cp in sorted(cps, key=lambda c: self._glyphs[c][1]["offset"]):
+                    entry = self._glyphs[cp][1]
+                    f.seek(entry["offset"])
+                    pixels = bytearray(zlib.decompress(f.read(entry["length"])))
+                    attrs = entry["attrs"]
+                    image = PngImage(int(attrs.get("width", 0)), int(attrs.get("height", 0)), channels, pixels)
+                    result[cp] = (attrs, image)
+        return result
+
+    def kernings(self, codepoints: Iterable[int]) -> List[dict]:
+        present = {str(cp) for cp in codepoints}
+        return [k for pair, k in sorted(self._kernings.items()) if pair[0] in present and pair[1] in present]
+
+    def add_run(self, font: BMFont, pages: Dict[int, PngImage], requested: Sequence[int], page_size: int = 0) -> int:
+        """Cut the glyphs of a fontgen output out of its pages and store them. Returns the number stored.
+
+        `page_size` is the page size recorded for later builds (default: the one
+        fontgen used), for runs made on pages shrunk to the missing glyphs.
+        """
+        if not pages:
+            return 0
+        channels = next(iter(pages.values())).channels
+        os.makedirs(self.folder, exist_ok=True)
+        # names sort by creation time, so later runs win when loading
+        run = f"run-{time.time_ns():020d}-{os.getpid()}-{next(_run_numbers)}"
+        glyphs = {}
+        with open(os.path.join(self.folder, run + ".bin"), "wb") as f:
+            offset = 0
+            for char in font.chars:
+                page = pages.get(int(char.get("page", 0)))
+                if page is None or page.channels != channels:
+                    continue
+                image = page.crop(int(char["x"]), int(char["y"]), int(char.get("width", 0)), int(char.get("height", 0)))
+                data = zlib.compress(bytes(image.pixels), 6)
+                f.write(data)
+                attrs = {k: v for k, v in char.items() if k not in _PLACEMENT_FIELDS}
+                attrs["width"], attrs["height"] = str(image.width), str(image.height)
+                glyphs[char["id"]] = {"attrs": attrs, "offset": offset, "length": len(data)}
+                offset += len(data)
+        data = {
+            "channels": channels,
+            "glyphs": glyphs,
+            "absent": [cp for cp in requested if str(cp) not in glyphs],
+            "kernings": font.kernings,
+            "font": {"info": font.info, "common": font.common, "extra": font.extra},
+            "page_size": page_size or max(font.common_int("scaleW"), font.common_int("scaleH")),
+        }
+        # the .json makes the run visible, so write it last and atomically
+        fd, tmp_path = tempfile.mkstemp(prefix=run, suffix=".tmp", dir=self.folder)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.folder, run + ".json"))
+
+        self._channels[run] = channels
+        for cp, entry in glyphs.items():
+            self._glyphs[int(cp)] = (run, entry)
+        self._absent.update(cp for cp in data["absent"] if cp not in self._glyphs)
+        for kerning in font.kernings:
+            self._kernings[(kerning["first"], kerning["second"])] = kerning
+        self.font = data["font"]
+        self.page_size = max(self.page_size, data["page_size"])
+        return len(glyphs)
+
+
+def shelf_pack(sizes: Sequence[Tuple[int, int]], page_size: int, spacing_x: int = 1, spacing_y: int = 1) -> List[Tuple[int, int, int]]:
+    """Place rectangles on `page_size` square pages, tallest first, in rows.
+
+    Returns (page, x, y) for each size, in input order. Empty rectangles are put
+    at (0, 0) of page 0. Raises ValueError for a rectangle larger than a page.
+    """
+    placements = [(0, 0, 0)] * len(sizes)
+    order = sorted((i for i, (w, h) in enumerate(sizes) if w > 0 and h > 0), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    page = x = y = shelf_height = 0
+    for i in order:
+        width, height = sizes[i]
+        if width > page_size or height > page_size:
+            raise ValueError(f"glyph of {width}x{height} does not fit a {page_size}x{page_size} page")
+        if x + width > page_size:
+            x, y, shelf_height = 0, y + shelf_height + spacing_y, 0
+        if y + height > page_size:
+            page, x, y, shelf_height = page + 1, 0, 0, 0
+        placements[i] = (page, x, y)
+        x += width + spacing_x
+        shelf_height = max(shelf_height, height)
+    return placements
+
+
+def _miss_page_size(config: dict, count: int, page_size: int) -> int:
+    """Page size for a fontgen run on `count` missing glyphs: the smallest power of
+    two from 64 that holds them on one page (estimated from the font size, `dfSize`,
+    padding and spacing, with room for a glyph twice that size), at most `page_size`.
+    Pages are decoded in Python, so a 1024 page for a handful of glyphs is wasted time.
+    """
+    padding = config.get("padding", {})
+    spacing = config.get("spacing", {})
+    cell = (
+        int(config.get("fontSize", 0))
+        + int(config.get("dfSize", 0))
+        + max(int(padding.get("left", 0)) + int(padding.get("right", 0)), int(padding.get("top", 0)) + int(padding.get("bottom", 0)))
+        + max(int(spacing.get("x", 1)), int(spacing.get("y", 1)))
+    )
+    size = 64
+    while size < page_size and (size < 2 * cell or (size // max(cell, 1)) ** 2 < count):
+        size *= 2
+    return min(size, page_size)
+
+
+def _used_rows(font: BMFont) -> Dict[int, int]:
+    """Page id -> number of rows down to the bottom of its lowest glyph."""
+    rows = {page_id: 0 for page_id in font.pages}
+    for char in font.chars:
+        page_id = int(char.get("page", 0))
+        rows[page_id] = max(rows.get(page_id, 0), int(char["y"]) + int(char.get("height", 0)))
+    return rows
+
+
+def write_cached_font(
+    cache: GlyphCache,
+    codepoints: Sequence[int],
+    output_fnt: str,
+    page_size: int,
+    spacing: dict,
+) -> int:
+    """Pack the cached glyphs of `codepoints` and write `output_fnt`.fnt plus its pages. Returns the page count."""
+    glyphs = cache.load(codepoints)
+    present = [cp for cp in codepoints if cp in glyphs]
+    spacing_x, spacing_y = int(spacing.get("x", 1)), int(spacing.get("y", 1))
+    placements = shelf_pack([(glyphs[cp][1].width, glyphs[cp][1].height) for cp in present], page_size, spacing_x, spacing_y)
+    page_count = max([p for p, _, _ in placements], default=0) + 1
+    channels = next((image.channels for _, image in glyphs.values()), 4)
+    pages = [PngImage.blank(page_size, page_size, channels) for _ in range(page_count)]
+
+    output_folder = os.path.dirname(output_fnt)
+    output_name = os.path.basename(output_fnt)
+    font = BMFont()
+    font.info = dict(cache.font["info"])
+    if "spacing" in font.info:
+        font.info["spacing"] = f"{spacing_x},{spacing_y}"
+    font.common = dict(cache.font["common"], scaleW=str(page_size), scaleH=str(page_size))
+    font.extra = [tuple(line) for line in cache.font["extra"]]
+    font.pages = {i: f"{output_name}_{i}.png" for i in range(page_count)}
+    for cp, (page, x, y) in zip(present, placements):
+        attrs, image = glyphs[cp]
+        if image.width and image.height:
+            pages[page].paste(image, x, y)
+        char = {"id": str(cp), "x": str(x), "y": str(y)}
+        char.update(attrs)
+        char["page"] = str(page)
+        font.chars.append(char)
+    font.kernings = [dict(k) for k in cache.kernings(present)]
+
+    for i, image in enumerate(pages):
+        write_png(os.path.join(output_folder, font.pages[i]), image)
+    write_fnt(font, output_fnt + ".fnt")
+    return page_count
+
+
+def generate_with_glyph_cache(
+    config: dict,
+    codepoints: Sequence[int],
+    output_fnt: str,
+    fontgen_exe: str,
+    run_fontgen,
+    cache_folder: str,
+    work_root: str,
+) -> bool | None:
+    """Build `output_fnt` from cached glyphs, running fontgen (`run_fontgen(config_path)`) on the misses only.
+
+    Returns True on success, False when fontgen failed, and None when the cache
+    cannot be used for this output (unsupported PNG format, glyph larger than a
+    page), in which case the caller runs a regular build.
+    """
+    cache = GlyphCache(cache_folder, glyph_render_key(config, fontgen_exe))
+    cached, missing = cache.split(codepoints)
+    # unknown until fontgen ran once without a packer size
+    page_size = int(config.get("packer", {}).get("size", 0)) or cache.page_size
+    if missing:
+        os.makedirs(work_root, exist_ok=True)
+        work_folder = tempfile.mkdtemp(prefix="glyph_cache_", dir=work_root)
+        try:
+            chunk = os.path.join(work_folder, "missing.txt")
+            with open(chunk, "w", encoding="utf-8") as f:
+                f.write("".join(chr(cp) for cp in missing))
+            run_config = dict(config, charset=[chunk], output=os.path.join(work_folder, "missing.fnt"))
+            if page_size:
+                run_config["packer"] = dict(config.get("packer", {}), size=_miss_page_size(config, len(missing), page_size))
+            config_path = os.path.join(work_folder, "missing.json")
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump(run_config, f, indent=2)
+            run_fontgen(config_path)
+            if not os.path.exists(run_config["output"]):
+                return False
+            font = read_fnt(run_config["output"])
+            rows = _used_rows(font)
+            try:
+                pages = {
+                    page_id: read_png(os.path.join(work_folder, file), rows[page_id], MAX_SLOW_PAGE_BYTES)
+                    for page_id, file in font.pages.items()
+                }
+            except (OSError, ValueError) as e:
+                safe_print(f"⚠️  Glyph cache not used: {e}")
+                return None
+            added = cache.add_run(font, pages, missing, page_size)
+        finally:
+            shutil.rmtree(work_folder, ignore_errors=True)
+        safe_print(f"🧩  Glyph cache: {len(cached)} glyphs reused, {added} rendered by fontgen")
+    else:
+        safe_print(f"🧩  Glyph cache: all {len(cached)} glyphs reused, fontgen not run")
+
+    if cache.font is None:
+        return None
+    page_size = page_size or cache.page_size
+    try:
+        page_count = write_cached_font(cache, codepoints, output_fnt, page_size, config.get("spacing", {}))
+    except ValueError as e:
+        safe_print(f"⚠️  Glyph cache not used: {e}")
+        return None
+    safe_print(f"📦  Packed {len(codepoints)} characters on {page_count} page(s) from the glyph cache")
+    return True
+
+
+__all__ = [
+    "DEFAULT_GLYPH_CACHE_FOLDER",
+    "GLYPH_CACHE_VERSION",
+    "MAX_SLOW_PAGE_BYTES",
+    "glyph_render_key",
+    "GlyphCache",
+    "shelf_pack",
+    "write_cached_font",
+    "generate_with_glyph_cache",
+]
@@ -0,0 +1,149 @@
+"""Filter characters by TTF coverage and route the rest to fallback fonts.
+
+Characters the selected TTF has no glyph for used to reach fontgen anyway,
+wasting time and atlas space on empty glyphs. `use_fontgen_with_coverage`
+checks the accepted characters against the font's `cmap` (see `ttf_cmap`),
+generates the primary font from the covered ones only, hands each uncovered
+character to the first fallback font that has it (generated as a separate
+fontgen run and appended to the primary .fnt as extra pages, baseline-aligned)
+and writes a report of the characters no font covers.
+"""
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Sequence, Set, Tuple
+
+from source.util.char_policy import CharPolicy
+from source.util.extract_char_set import save_char_set
+from source.util.fnt_file import BMFont, merge_fonts, read_fnt, write_fnt
+from source.util.safe_print import safe_print
+from source.util.ttf_cmap import FontFormatError, read_cmap_coverage
+
+
+def partition_by_coverage(chars: Sequence[str], coverages: List[Set[int]]) -> Tuple[List[List[str]], List[str]]:
+    """Assign each character to the first coverage set containing it.
+
+    Returns (one list per coverage set, characters covered by none), keeping the
+    input order inside each list.
+    """
+    assigned: List[List[str]] = [[] for _ in coverages]
+    missing: List[str] = []
+    for char in chars:
+        cp = ord(char)
+        for i, coverage in enumerate(coverages):
+            if cp in coverage:
+                assigned[i].append(char)
+                break
+        else:
+            missing.append(char)
+    return assigned, missing
+
+
+def write_missing_report(report_file: str, missing: List[str], font_names: List[str]) -> None:
+    """Write one `U+XXXX<TAB>char` line per character that no font covers."""
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write(f"# {len(missing)} characters not covered by: {', '.join(font_names)}\n")
+        for char in missing:
+            f.write(f"U+{ord(char):04X}\t{char}\n")
+    safe_print(f"Missing glyph report ({len(missing)}): saved to {report_file}")
+
+
+def append_fallback_pages(primary: BMFont, fallback: BMFont) -> BMFont:
+    """Return `primary` with the pages and glyphs of `fallback` appended.
+
+    Fallback glyphs are shifted so both fonts share the primary baseline.
+    """
+    shift = primary.common_int("base") - fallback.common_int("base")
+    if shift:
+        fallback.chars = [dict(c, yoffset=str(int(c.get("yoffset", 0)) + shift)) for c in fallback.chars]
+    return merge_fonts(
+        [primary, fallback],
+        [[primary.pages[i] for i in sorted(primary.pages)], [fallback.pages[i] for i in sorted(fallback.pages)]],
+    )
+
+
+def use_fontgen_with_coverage(
+    accepted_chars: List[str],
+    ttf_file: str,
+    fallback_ttf_files: List[str],
+    chunk_folder: str,
+    output_fnt: str,
+    use_fontgen,
+    **fontgen_kwargs,
+) -> bool:
+    """Generate `output_fnt` from the characters `ttf_file` covers, plus fallback pages.
+
+    `use_fontgen` is called as `use_fontgen(char_chunk_file=..., ttf_file=...,
+    custom_fnt_output_folder=..., custom_fnt_output_name=..., **fontgen_kwargs)`.
+    If the primary TTF cannot be read, every character is sent to it as before.
+    """
+    output_folder = os.path.dirname(output_fnt)
+    output_name = os.path.basename(output_fnt)
+    ttf_files = [ttf_file] + list(fallback_ttf_files)
+    font_names = [os.path.basename(f) for f in ttf_files]
+
+    coverages: List[Set[int]] = []
+    for f in ttf_files:
+        try:
+            coverages.append(read_cmap_coverage(f))
+        except (OSError, FontFormatError) as e:
+            if f == ttf_file:
+                safe_print(f"⚠️  Could not read the cmap of {f} ({e}); skipping the coverage filter.")
+                coverages = [{ord(c) for c in accepted_chars}]
+                ttf_files, font_names = [ttf_file], font_names[:1]
+                break
+            safe_print(f"⚠️  Could not read the cmap of fallback font {f} ({e}); ignoring it.")
+            coverages.append(set())
+
+    assigned, missing = partition_by_coverage(accepted_chars, coverages)
+
+    primary_chunk = os.path.join(chunk_folder, f"covered_{output_name}_{len(assigned[0])}.txt")
+    save_char_set(assigned[0], primary_chunk)
+    if missing:
+        write_missing_report(os.path.join(chunk_folder, f"missing_{output_name}_{len(missing)}.txt"), missing, font_names)
+    print(f"Coverage: {len(assigned[0])} characters in {font_names[0]}, "
+          f"{sum(len(a) for a in assigned[1:])} routed to fallback fonts, {len(missing)} missing")
+
+    ok = use_fontgen(
+        char_chunk_file=primary_chunk,
+        ttf_file=ttf_file,
+        custom_fnt_output_folder=output_folder,
+        custom_fnt_output_name=output_name,
+        **fontgen_kwargs,
+    )
+    if not ok:
+        return False
+
+    # fallback fonts only need their routed characters, not the always-included set
+    fallback_kwargs = dict(fontgen_kwargs, policy=CharPolicy(always_include=[]))
+
+    merged = read_fnt(output_fnt + ".fnt")
+    fallback_outputs: Dict[int, str] = {}
+    for i, chars in enumerate(assigned[1:], start=1):
+        if not chars:
+            continue
+        fallback_name = f"{output_name}_fallback{i}"
+        fallback_chunk = os.path.join(chunk_folder, f"fallback_{fallback_name}_{len(chars)}.txt")
+        save_char_set(chars, fallback_chunk)
+        if not use_fontgen(
+            char_chunk_file=fallback_chunk,
+            ttf_file=ttf_files[i],
+            custom_fnt_output_folder=output_folder,
+            custom_fnt_output_name=fallback_name,
+            **fallback_kwargs,
+        ):
+            safe_print(f"⚠️  Fallback font generation failed for {font_names[i]}.")
+            return False
+        fallback_outputs[i] = os.path.join(output_folder, fallback_name + ".fnt")
+        merged = append_fallback_pages(merged, read_fnt(fallback_outputs[i]))
+
+    if fallback_outputs:
+        write_fnt(merged, output_fnt + ".fnt")
+        # the fallback pages now belong to the primary .fnt
+        for path in fallback_outputs.values():
+            os.remove(path)
+        safe_print(f"✅  Appended {len(fallback_outputs)} fallback fonts as extra pages to {output_fnt}.fnt")
+    return True
+
+
+__all__ = ["partition_by_coverage", "write_missing_report", "append_fallback_pages", "use_fontgen_with_coverage"]
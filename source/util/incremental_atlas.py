@@ -0,0 +1,226 @@
+"""Append-only incremental atlases.
+
+A normal build regenerates every page of the atlas, so adding one character
+changes every shipped `.png`. `use_fontgen_incremental` keeps a manifest next to
+the output (`<output>.atlas.json`) listing the characters already generated and
+the SHA-256 of the `.fnt` and of every page. When the manifest still matches the
+files on disk and the build inputs (TTF, font size, always-included policy
+charset, fontgen config and tool), only the characters not generated before go
+to fontgen; their pages are added as `<output>_g<N>_<i>.png` and their glyphs
+appended to the `.fnt`. Earlier pages are never rewritten.
+
+Characters that disappear from the text stay in the atlas (it only grows), and
+kerning pairs between characters of different generations are not generated.
+A full rebuild happens whenever the manifest is missing or does not match (e.g.
+after a non-incremental build, a new TTF or a changed font size); build without
+incremental mode to compact the atlas.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import List
+
+from source.util.char_frequency import FrequencyTiers
+from source.util.char_policy import CharPolicy, default_char_policy
+from source.util.codepoint_set import CodepointSet
+from source.util.fnt_file import merge_fonts, read_fnt, write_fnt
+from source.util.fontgen import (
+    FontgenSettings,
+    create_fontgen_config_json,
+    current_settings,
+    find_fontgen_exe,
+    fnt_page_files,
+    fontgen_build_key,
+    resolve_output_fnt,
+    run_fontgen,
+    use_fontgen,
+    write_fontgen_config,
+)
+from source.util.fontgen_shard import read_char_chunk_file, shard_temp_folder
+from source.util.safe_print import safe_print
+
+
+ATLAS_MANIFEST_VERSION = 1
+
+
+def atlas_manifest_path(output_fnt: str) -> str:
+    return output_fnt + ".atlas.json"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def atlas_key(
+    ttf_file: str,
+    output_fnt: str,
+    font_size: int,
+    policy: CharPolicy,
+    fontgen_exe: str,
+    overrides: dict | None = None,
+) -> str:
+    """Hash of every input that must stay the same for new glyphs to match the old ones."""
+    config = create_fontgen_config_json("", ttf_file, output_fnt, font_size, policy, overrides)
+    config["charset"] = policy.fontgen_charset()
+    return fontgen_build_key(dict(config, incremental=ATLAS_MANIFEST_VERSION), fontgen_exe)
+
+
+def load_atlas_manifest(output_fnt: str, key: str) -> dict | None:
+    """Return the manifest of `output_fnt` if it matches `key` and the files on disk."""
+    path = atlas_manifest_path(output_fnt)
+    fnt_file = output_fnt + ".fnt"
+    if not (os.path.exists(path) and os.path.exists(fnt_file)):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != ATLAS_MANIFEST_VERSION or manifest.get("key") != key:
+        return None
+    if manifest.get("fnt_sha256") != _file_sha256(fnt_file):
+        return None
+
+    folder = os.path.dirname(fnt_file)
+    pages = manifest.get("pages", {})
+    if sorted(pages) != sorted(fnt_page_files(fnt_file)):
+        return None
+    for name, sha256 in pages.items():
+        page = os.path.join(folder, name)
+        if not os.path.exists(page) or _file_sha256(page) != sha256:
+            return None
+    return manifest
+
+
+def write_atlas_manifest(output_fnt: str, key: str, chars: CodepointSet, generations: List[dict]) -> None:
+    fnt_file = output_fnt + ".fnt"
+    folder = os.path.dirname(fnt_file)
+    manifest = {
+        "version": ATLAS_MANIFEST_VERSION,
+        "key": key,
+        "fnt_sha256": _file_sha256(fnt_file),
+        "pages": {name: _file_sha256(os.path.join(folder, name)) for name in fnt_page_files(fnt_file)},
+        "chars": chars.to_base64(),
+        "generations": generations,
+    }
+    with open(atlas_manifest_path(output_fnt), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def use_fontgen_incremental(
+    char_chunk_file: str,
+    ttf_file: str,
+    font_size: int = 23,
+    custom_fnt_output_folder: str | None = None,
+    custom_fnt_output_name: str | None = None,
+    use_build_cache: bool = True,
+    policy: CharPolicy | None = None,
+    shards: int = 1,
+    settings: FontgenSettings | None = None,
+    tiers: FrequencyTiers | None = None,
+) -> bool:
+    """`use_fontgen` that appends new characters to an existing atlas when it can.
+
+    Same arguments as `use_fontgen`; `shards` and `tiers` only apply to full rebuilds.
+    """
+    settings = settings or current_settings()
+    policy = policy or default_char_policy()
+    output_fnt = resolve_output_fnt(ttf_file, custom_fnt_output_folder, custom_fnt_output_name)
+    output_folder = os.path.dirname(output_fnt)
+    output_name = os.path.basename(output_fnt)
+
+    fontgen_exe = find_fontgen_exe(settings)
+    if fontgen_exe is None:
+        return False
+    key = atlas_key(ttf_file, output_fnt, font_size, policy, fontgen_exe, settings.config_overrides)
+    wanted = CodepointSet(read_char_chunk_file(char_chunk_file))
+
+    manifest = load_atlas_manifest(output_fnt, key)
+    if manifest is None:
+        if os.path.exists(atlas_manifest_path(output_fnt)):
+            safe_print(f"🚮  {output_fnt}.fnt does not match its atlas manifest, rebuilding every page.")
+        ok = use_fontgen(
+            char_chunk_file=char_chunk_file,
+            ttf_file=ttf_file,
+            font_size=font_size,
+            custom_fnt_output_folder=custom_fnt_output_folder,
+            custom_fnt_output_name=custom_fnt_output_name,
+            use_build_cache=use_build_cache,
+            policy=policy,
+            shards=shards,
+            settings=settings,
+            tiers=tiers,
+        )
+        if ok:
+            pages = fnt_page_files(output_fnt + ".fnt")
+            write_atlas_manifest(output_fnt, key, wanted, [{"chars": len(wanted), "pages": pages}])
+        return ok
+
+    generated = CodepointSet.from_base64(manifest["chars"])
+    new_chars = wanted - generated
+    if not new_chars:
+        safe_print(f"♻️  No new characters, {output_fnt}.fnt and its pages are unchanged.")
+        return True
+
+    generation = len(manifest["generations"])
+    print()
+    safe_print(f"⏳  Appending {len(new_chars)} new characters to {output_fnt}.fnt (generation {generation})")
+
+    temp_folder = settings.temp_folder or shard_temp_folder
+    os.makedirs(temp_folder, exist_ok=True)
+    work_folder = tempfile.mkdtemp(prefix="fontgen_incremental_", dir=temp_folder)
+    try:
+        chunk = os.path.join(work_folder, "new_chars.txt")
+        with open(chunk, "w", encoding="utf-8") as f:
+            f.write(new_chars.to_string())
+        work_output = os.path.join(work_folder, f"{output_name}_g{generation}")
+        # the always-included characters were packed by the first generation
+        config = create_fontgen_config_json(
+            chunk, ttf_file, work_output, font_size, CharPolicy(always_include=[]), settings.config_overrides
+        )
+        config_path = os.path.join(work_folder, "config.json")
+        write_fontgen_config(config, config_path)
+        run_fontgen(fontgen_exe, config_path, settings)
+        if not os.path.exists(work_output + ".fnt"):
+            safe_print("⚠️  Font generation failed.")
+            return False
+
+        existing = read_fnt(output_fnt + ".fnt")
+        addition = read_fnt(work_output + ".fnt")
+        new_pages = []
+        for i, page_id in enumerate(sorted(addition.pages)):
+            page = addition.pages[page_id]
+            name = f"{output_name}_g{generation}_{i}{os.path.splitext(page)[1]}"
+            shutil.move(os.path.join(work_folder, page), os.path.join(output_folder, name))
+            new_pages.append(name)
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    old_pages = [existing.pages[i] for i in sorted(existing.pages)]
+    write_fnt(merge_fonts([existing, addition], [old_pages, new_pages]), output_fnt + ".fnt")
+    write_atlas_manifest(
+        output_fnt,
+        key,
+        generated | new_chars,
+        manifest["generations"] + [{"chars": len(new_chars), "pages": new_pages}],
+    )
+    safe_print(f"✅  Added {len(new_pages)} pages to {output_fnt}.fnt, the previous {len(old_pages)} pages are unchanged.")
+    return True
+
+
+__all__ = [
+    "ATLAS_MANIFEST_VERSION",
+    "atlas_manifest_path",
+    "atlas_key",
+    "load_atlas_manifest",
+    "write_atlas_manifest",
+    "use_fontgen_incremental",
+]
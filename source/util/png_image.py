@@ -0,0 +1,392 @@
+"""Minimal pure-Python PNG reader and writer for atlas pages.
+
+Only what fontgen pages use is supported: 8-bit grayscale, grayscale + alpha,
+RGB, RGBA and palette images, non-interlaced. Pixels are kept as one
+`bytearray` of `width * height * channels` bytes, row by row (palette images are
+expanded to RGB or RGBA when read).
+
+    image = read_png("page_0.png")
+    glyph = image.crop(x, y, w, h)
+    page = PngImage.blank(1024, 1024, image.channels)
+    page.paste(glyph, x2, y2)
+    write_png("out_0.png", page)
+
+Reading undoes the PNG row filters in Python: None, Sub and Up rows are undone
+a whole row at a time (under 0.1 s per megapixel of RGBA), Average and Paeth
+rows byte by byte (about 3 s per megapixel for Paeth). `read_png(path, rows)`
+decodes only the top rows. Writing uses filter type 0 (none) and zlib only.
+
+`optimize_png_file(path)` losslessly shrinks an existing page (any bit depth
+and color type): ancillary chunks are dropped and the image data recompressed,
+and the result is only kept when it decodes to the same pixels. Pages with
+Average / Paeth rows keep their filters and are never unfiltered.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, Tuple
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type -> channels (palette images are expanded when read)
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# channels -> PNG color type written
+_COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+
+
+@dataclass
+class PngImage:
+    width: int
+    height: int
+    channels: int
+    pixels: bytearray
+
+    @classmethod
+    def blank(cls, width: int, height: int, channels: int) -> "PngImage":
+        return cls(width, height, channels, bytearray(width * height * channels))
+
+    def crop(self, x: int, y: int, width: int, height: int) -> "PngImage":
+        """Copy of the `width` x `height` rectangle at (x, y), clipped to the image."""
+        width = max(0, min(width, self.width - x))
+        height = max(0, min(height, self.height - y))
+        stride = self.width * self.channels
+        out = bytearray()
+        for row in range(y, y + height):
+            start = row * stride + x * self.channels
+            out += self.pixels[start:start + width * self.channels]
+        return PngImage(width, height, self.channels, out)
+
+    def paste(self, image: "PngImage", x: int, y: int) -> None:
+        """Copy `image` (same channel count) into this image with its top-left corner at (x, y)."""
+        if image.channels != self.channels:
+            raise ValueError(f"cannot paste a {image.channels}-channel image into a {self.channels}-channel one")
+        stride = self.width * self.channels
+        row_bytes = image.width * self.channels
+        for row in range(image.height):
+            start = (y + row) * stride + x * self.channels
+            self.pixels[start:start + row_bytes] = image.pixels[row * row_bytes:(row + 1) * row_bytes]
+
+
+def _chunks(data: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        yield tag, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+class _Rows:
+    """Byte-wise arithmetic on whole rows of `stride` bytes, held as little-endian ints.
+
+    The 0x7F / 0x80 masks keep the carry of each byte out of the next one, so a
+    row is added or subtracted (mod 256 per byte) in a few big-int operations.
+    """
+
+    def __init__(self, stride: int):
+        self.stride = stride
+        self.mask = (1 << (8 * stride)) - 1
+        self.high = int.from_bytes(b"\x80" * stride, "little")
+        self.low = self.mask ^ self.high
+
+    def add(self, x: int, y: int) -> int:
+        return ((x & self.low) + (y & self.low)) ^ ((x ^ y) & self.high)
+
+    def sub(self, x: int, y: int) -> int:
+        return ((x | self.high) - (y & self.low)) ^ ((x ^ y ^ self.high) & self.high)
+
+    def shift(self, x: int, count: int) -> int:
+        """Move every byte `count` positions to the right in the row (zeros come in on the left)."""
+        return (x << (8 * count)) & self.mask
+
+    def prefix_sum(self, x: int, bpp: int) -> int:
+        """Undo the Sub filter: each byte plus the output byte `bpp` positions before it."""
+        step = bpp
+        while step < self.stride:
+            x = self.add(x, self.shift(x, step))
+            step *= 2
+        return x
+
+    def to_bytes(self, x: int) -> bytes:
+        return x.to_bytes(self.stride, "little")
+
+
+def _from_bytes(line: bytes) -> int:
+    return int.from_bytes(line, "little")
+
+
+def _unfilter(raw: bytes, stride: int, height: int, bpp: int) -> bytearray:
+    """Undo the row filters. None, Sub and Up rows take a few big-int operations
+    each; Average and Paeth rows depend on the previous output byte and are
+    undone byte by byte (about 3 s per megapixel of RGBA for Paeth).
+    """
+    if len(raw) < (stride + 1) * height:
+        raise ValueError("truncated PNG image data")
+    out = bytearray(stride * height)
+    rows = _Rows(stride)
+    prev = bytes(stride)
+    pos = 0
+    for row in range(height):
+        kind = raw[pos]
+        line = raw[pos + 1:pos + 1 + stride]
+        pos += 1 + stride
+        if kind == 1:
+            line = rows.to_bytes(rows.prefix_sum(_from_bytes(line), bpp))
+        elif kind == 2:
+            line = rows.to_bytes(rows.add(_from_bytes(line), _from_bytes(prev)))
+        elif kind == 3:
+            line = bytearray(line)
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            line = bytearray(line)
+            for i in range(stride):
+                if i >= bpp:
+                    line[i] = (line[i] + _paeth(line[i - bpp], prev[i], prev[i - bpp])) & 0xFF
+                else:
+                    line[i] = (line[i] + prev[i]) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"invalid PNG filter type {kind}")
+        out[row * stride:(row + 1) * stride] = line
+        prev = line
+    return out
+
+
+class _Png:
+    """The chunks of a PNG file with its decompressed (still filtered) image data."""
+
+    def __init__(self, data: bytes, name: str = "PNG data"):
+        if not data.startswith(PNG_SIGNATURE):
+            raise ValueError(f"not a PNG file: {name}")
+        self.chunks = []
+        idat = []
+        for tag, body in _chunks(data):
+            if tag == b"IDAT":
+                idat.append(body)
+            if tag != b"IDAT" or len(idat) == 1:
+                # consecutive IDAT chunks are kept as one
+                self.chunks.append((tag, body))
+            if tag == b"IEND":
+                break
+        header = dict(self.chunks).get(b"IHDR")
+        if header is None:
+            raise ValueError(f"PNG without IHDR: {name}")
+        self.width, self.height, self.bit_depth, self.color_type, _, _, self.interlace = struct.unpack(">IIBBBBB", header)
+        if self.color_type not in _CHANNELS:
+            raise ValueError(f"unknown PNG color type {self.color_type}: {name}")
+        try:
+            self.raw = zlib.decompress(b"".join(idat))
+        except zlib.error as e:
+            raise ValueError(f"corrupt PNG image data in {name}: {e}") from None
+        bits = _CHANNELS[self.color_type] * self.bit_depth
+        # bytes per row and per pixel (at least one, as used by the filters)
+        self.stride = (self.width * bits + 7) // 8
+        self.bpp = max(1, bits // 8)
+
+    def filter_types(self) -> set:
+        """Row filter types used (empty for interlaced images, whose rows are not laid out by stride)."""
+        if self.interlace:
+            return set()
+        return set(self.raw[::self.stride + 1][:self.height])
+
+    def chunk(self, tag: bytes) -> bytes:
+        return dict(self.chunks).get(tag, b"")
+
+    def unfiltered(self, rows: int | None = None) -> bytes:
+        """Image bytes without the row filters, of the first `rows` rows (default: all).
+
+        Interlaced images: the filtered data as is.
+        """
+        if self.interlace:
+            return self.raw
+        height = self.height if rows is None else max(0, min(rows, self.height))
+        return bytes(_unfilter(self.raw, self.stride, height, self.bpp))
+
+
+def read_png(path: str, rows: int | None = None, max_slow_bytes: int | None = None) -> PngImage:
+    """Decode a PNG file. Raises ValueError for files this reader does not support.
+
+    With `rows`, only the first `rows` rows are decoded and the image is cut to
+    them (decoding is the slow part; the rows below are never looked at). With
+    `max_slow_bytes`, ValueError is also raised when more bytes than that are in
+    Average / Paeth rows, which are undone byte by byte.
+    """
+    with open(path, "rb") as f:
+        png = _Png(f.read(), path)
+    if png.bit_depth != 8 or png.interlace:
+        raise ValueError(f"unsupported PNG format (bit depth {png.bit_depth}, color type {png.color_type}, interlace {png.interlace}): {path}")
+
+    channels = _CHANNELS[png.color_type]
+    height = png.height if rows is None else max(0, min(rows, png.height))
+    if max_slow_bytes is not None:
+        kinds = png.raw[::png.stride + 1][:height]
+        slow_bytes = (kinds.count(3) + kinds.count(4)) * png.stride
+        if slow_bytes > max_slow_bytes:
+            raise ValueError(f"{slow_bytes // 1024} KB of Average / Paeth filtered rows, too slow to decode: {path}")
+    pixels = bytearray(png.unfiltered(height))
+    if png.color_type == 3:
+        # expand the palette; with a tRNS chunk the result has an alpha channel
+        palette = png.chunk(b"PLTE")
+        transparency = png.chunk(b"tRNS")
+        entries = len(palette) // 3
+        if pixels and max(pixels) >= entries:
+            raise ValueError(f"palette index {max(pixels)} out of range ({entries} PLTE entries): {path}")
+        if transparency:
+            colors = [palette[i * 3:i * 3 + 3] + bytes([transparency[i] if i < len(transparency) else 255]) for i in range(entries)]
+            channels = 4
+        else:
+            colors = [palette[i * 3:i * 3 + 3] for i in range(entries)]
+            channels = 3
+        pixels = bytearray(b"".join(colors[i] for i in pixels))
+    return PngImage(png.width, height, channels, pixels)
+
+
+def _chunk(tag: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+
+
+def encode_png(image: PngImage, level: int = 6) -> bytes:
+    stride = image.width * image.channels
+    raw = bytearray()
+    for row in range(image.height):
+        raw.append(0)  # filter type: none
+        raw += image.pixels[row * stride:(row + 1) * stride]
+    header = struct.pack(">IIBBBBB", image.width, image.height, 8, _COLOR_TYPES[image.channels], 0, 0, 0)
+    return PNG_SIGNATURE + _chunk(b"IHDR", header) + _chunk(b"IDAT", zlib.compress(bytes(raw), level)) + _chunk(b"IEND", b"")
+
+
+def write_png(path: str, image: PngImage, level: int = 6) -> None:
+    with open(path, "wb") as f:
+        f.write(encode_png(image, level))
+
+
+# chunks needed to decode the pixels; every other (ancillary) chunk is dropped
+_KEPT_CHUNKS = (b"IHDR", b"PLTE", b"tRNS", b"IDAT", b"IEND")
+
+# filter cost of a byte: its distance to zero as a signed value
+_FILTER_COST = bytes(min(v, 256 - v) for v in range(256))
+
+
+def _refilter(pixels: bytes, stride: int, height: int, bpp: int) -> bytes:
+    """Filter every row with the cheapest of None, Sub and Up (minimum sum of absolute differences)."""
+    raw = bytearray()
+    rows = _Rows(stride)
+    prev = 0
+    for row in range(height):
+        line = pixels[row * stride:(row + 1) * stride]
+        value = _from_bytes(line)
+        candidates = [
+            (0, line),
+            (1, rows.to_bytes(rows.sub(value, rows.shift(value, bpp)))),
+            (2, rows.to_bytes(rows.sub(value, prev))),
+        ]
+        kind, filtered = min(candidates, key=lambda c: sum(c[1].translate(_FILTER_COST)))
+        raw.append(kind)
+        raw += filtered
+        prev = value
+    return bytes(raw)
+
+
+def _refilterable(png: _Png) -> bool:
+    """True for 8/16-bit non-interlaced images using only the None, Sub and Up filters.
+
+    Images with Average or Paeth rows were filtered adaptively by their encoder;
+    their filters are kept, which also spares undoing them byte by byte.
+    """
+    return png.bit_depth >= 8 and not png.interlace and png.filter_types() <= {0, 1, 2}
+
+
+def _optimized(png: _Png, data: bytes, pixels: bytes | None) -> bytes:
+    """`optimize_png` of the parsed `data`; `pixels` are its unfiltered rows (None: keep the filters)."""
+    streams = [png.raw]
+    if pixels is not None:
+        streams.append(_refilter(pixels, png.stride, png.height, png.bpp))
+    compressed = min((zlib.compress(raw, 9) for raw in streams), key=len)
+
+    out = bytearray(PNG_SIGNATURE)
+    for tag, body in png.chunks:
+        if tag in _KEPT_CHUNKS:
+            out += _chunk(tag, compressed if tag == b"IDAT" else body)
+    return bytes(out) if len(out) < len(data) else data
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Losslessly re-encode PNG data: drop ancillary chunks (text, time, color
+    profiles), merge the IDAT chunks and recompress them at zlib level 9, with the
+    original row filters or re-chosen ones (8-bit and 16-bit non-interlaced
+    images without Average / Paeth rows), whichever is smaller. Returns `data`
+    itself when nothing is gained.
+    """
+    png = _Png(data)
+    return _optimized(png, data, png.unfiltered() if _refilterable(png) else None)
+
+
+def _same_image(png_a: _Png, pixels_a: bytes | None, png_b: _Png) -> bool:
+    """True when `png_b` has the header and palette of `png_a` and the same pixels.
+
+    `pixels_a` is the unfiltered data of `png_a`; None compares the filtered data
+    instead, which is enough when both use the same filters.
+    """
+    if any(png_a.chunk(tag) != png_b.chunk(tag) for tag in (b"IHDR", b"PLTE", b"tRNS")):
+        return False
+    if pixels_a is None:
+        return png_b.raw == png_a.raw
+    return png_b.unfiltered() == pixels_a
+
+
+def same_png_pixels(a: bytes, b: bytes) -> bool:
+    """True when two PNG files decode to the same image (same header, palette and pixels)."""
+    png_a, png_b = _Png(a), _Png(b)
+    if png_a.raw == png_b.raw:
+        return _same_image(png_a, None, png_b)
+    return _same_image(png_a, png_a.unfiltered(), png_b)
+
+
+def optimize_png_file(path: str) -> Tuple[int, int]:
+    """Optimize a PNG file in place (see `optimize_png`) and check that its pixels are unchanged.
+
+    Returns the (old, new) file size. Raises ValueError if the re-encoded image
+    differs, in which case the file is left untouched. The original is unfiltered
+    at most once, for both the re-filtering and the check; when its filters are
+    kept, only the decompressed image data is compared.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    png = _Png(data, path)
+    pixels = png.unfiltered() if _refilterable(png) else None
+    optimized = _optimized(png, data, pixels)
+    if optimized is data:
+        return len(data), len(data)
+    if not _same_image(png, pixels, _Png(optimized, path)):
+        raise ValueError(f"re-encoded PNG does not match the original: {path}")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(optimized)
+    os.replace(tmp_path, path)
+    return len(data), len(optimized)
+
+
+__all__ = [
+    "PNG_SIGNATURE",
+    "PngImage",
+    "read_png",
+    "encode_png",
+    "write_png",
+    "optimize_png",
+    "same_png_pixels",
+    "optimize_png_file",
+]
@@ -0,0 +1,184 @@
+"""Per-stage timing and resource instrumentation for a txt2fnt run.
+
+A `Profiler` collects:
+    - stage durations (`with profiler.stage("split"): ...`), summed when a stage
+      runs several times (batch builds, watch mode)
+    - per-file extraction statistics (bytes, unique characters, seconds, cache hit)
+    - one entry per fontgen subprocess (command, exit status, duration)
+    - the peak resident set size of the process and its children
+
+`txt2fnt.py --profile` prints a summary table and `--report-json` writes the same
+data as JSON. Code that runs deep inside the pipeline (e.g. `run_fontgen`) reports
+to the module-level `active` profiler through `stage` / `record_fontgen`, which
+do nothing when profiling is off. All methods are thread-safe (batch jobs and
+shards record from worker threads).
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from source.util.safe_print import safe_print
+
+
+REPORT_VERSION = 1
+
+# profiler of the current run, or None when profiling is disabled
+active: "Profiler | None" = None
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of this process or its largest finished child, in bytes."""
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_working_set()
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    factor = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * factor
+
+
+def _windows_peak_working_set() -> int | None:
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, dict] = {}
+        self.files: List[dict] = []
+        self.fontgen_runs: List[dict] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+
+    def record_file(self, path: str, size: int, chars: int, seconds: float, cached: bool = False) -> None:
+        with self._lock:
+            self.files.append({
+                "path": path,
+                "bytes": size,
+                "unique_chars": chars,
+                "seconds": seconds,
+                "chars_per_second": None if cached or not seconds else chars / seconds,
+                "bytes_per_second": None if cached or not seconds else size / seconds,
+                "cached": cached,
+            })
+
+    def record_fontgen(self, command: List[str], returncode: int | None, seconds: float, error: str = "") -> None:
+        with self._lock:
+            self.fontgen_runs.append({
+                "command": list(command),
+                "returncode": returncode,
+                "seconds": seconds,
+                "error": error,
+            })
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "version": REPORT_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "total_seconds": time.perf_counter() - self._start,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "stages": {name: dict(entry) for name, entry in self.stages.items()},
+                "files": [dict(f) for f in self.files],
+                "fontgen_runs": [dict(r) for r in self.fontgen_runs],
+            }
+
+    def write_json(self, report_file: str) -> None:
+        folder = os.path.dirname(report_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        safe_print(f"Profile report saved to {report_file}")
+
+    def print_summary(self) -> None:
+        report = self.report()
+        print()
+        print("=== Profile ===")
+        for name, entry in report["stages"].items():
+            runs = f" ({entry['count']} runs)" if entry["count"] > 1 else ""
+            print(f"{name:24s} {entry['seconds']:9.3f}s{runs}")
+
+        files = report["files"]
+        if files:
+            scanned = [f for f in files if not f["cached"]]
+            total_bytes = sum(f["bytes"] for f in scanned)
+            total_seconds = sum(f["seconds"] for f in scanned)
+            rate = f", {total_bytes / (1024 * 1024) / total_seconds:.1f} MiB/s" if total_seconds else ""
+            print(f"files: {len(scanned)} scanned ({total_bytes} bytes{rate}), {len(files) - len(scanned)} from cache")
+            for f in sorted(scanned, key=lambda f: f["seconds"], reverse=True)[:5]:
+                safe_print(f"  slowest: {f['path']} {f['seconds']:.3f}s, {f['bytes']} bytes, {f['unique_chars']} unique chars")
+
+        for run in report["fontgen_runs"]:
+            status = run["error"] or f"exit {run['returncode']}"
+            safe_print(f"fontgen: {run['command'][-1]} {run['seconds']:.3f}s ({status})")
+
+        if report["peak_rss_bytes"] is not None:
+            print(f"peak RSS: {report['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
+        print(f"total: {report['total_seconds']:.3f}s")
+
+
+def stage(name: str):
+    """Time a stage on the active profiler; a no-op context when profiling is off."""
+    if active is None:
+        return contextlib.nullcontext()
+    return active.stage(name)
+
+
+def record_fontgen(command: List[str], returncode: int | None, seconds: float, error: str = "") -> None:
+    """Report a fontgen subprocess to the active profiler, if any."""
+    if active is not None:
+        active.record_fontgen(command, returncode, seconds, error)
+
+
+__all__ = ["Profiler", "active", "peak_rss_bytes", "stage", "record_fontgen"]
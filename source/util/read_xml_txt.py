@@ -1,106 +1,360 @@
 """Utilities for reading XML and extracting plain text content.
 
 Functions:
+    iter_xml_texts(file_path, chunk_size, selection) -> Iterator[str]
+        Stream an XML file and yield all text nodes in document order, excluding
+        tags and attributes. Text is stripped of surrounding whitespace and empty
+        strings are omitted. An optional `XmlSelection` (see `xml_selectors`)
+        restricts the text to selected elements and harvests selected attributes.
     read_xml_texts(file_path) -> List[str]
-        Parse an XML file and return a list of all text nodes in document order,
-        excluding tags and attributes. Text is stripped of surrounding whitespace
-        and empty strings are omitted.
+        Same as above, collected into a list.
     read_xml_texts_from_string(xml_string) -> List[str]
         Same as above but accepts an XML string.
+
+The extraction is a single forward pass over the input: the file is read in
+chunks and fed to a small tolerant tokenizer, so no element tree is built, memory
+stays flat regardless of file size or nesting depth, and malformed sections
+(unescaped `&`, stray `<`, control characters, unterminated markup) are recovered
+from in place instead of re-reading and re-parsing the file.
 """
-from typing import List
+from typing import Dict, Iterator, List
+import codecs
 import re
-import xml.etree.ElementTree as ET
-from source.util.safe_print import safe_print
 
+from source.util.archive_inputs import open_input, open_input_text
+from source.util.xml_selectors import XmlSelection
+
+
+# number of decoded characters read per chunk when streaming XML files
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# a tag longer than this is assumed to be a stray "<" in text (malformed input)
+MAX_TAG_LENGTH = 64 * 1024
+
+# characters that are not allowed in XML 1.0 and are dropped from the output
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F]")
+_ENTITY_RE = re.compile(r"&(#[xX][0-9a-fA-F]+|#[0-9]+|[A-Za-z_][\w.-]*);")
+_PREDEFINED_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+_TAG_START_RE = re.compile(r"[A-Za-z_:À-￿/]")
+_ENCODING_DECL_RE = re.compile(rb"""^<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+_TAG_NAME_RE = re.compile(r"[^\s/>]+")
+_ATTRIBUTE_RE = re.compile(r"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+
+
+def _replace_entity(match: "re.Match[str]") -> str:
+    name = match.group(1)
+    if name[0] == "#":
+        try:
+            codepoint = int(name[2:], 16) if name[1] in "xX" else int(name[1:])
+            return chr(codepoint)
+        except (ValueError, OverflowError):
+            return match.group(0)
+    # undefined entities are kept literally (tolerant, like the old regex fallback)
+    return _PREDEFINED_ENTITIES.get(name, match.group(0))
+
+
+def _decode_entities(text: str) -> str:
+    if "&" not in text:
+        return text
+    return _ENTITY_RE.sub(_replace_entity, text)
+
+
+# a tag body: anything but "<", ">" and quotes, with quoted attribute values
+_TAG_BODY_RE = re.compile(r"""[^<>"']*(?:(?:"[^"]*"|'[^']*')[^<>"']*)*""")
+
+
+def _parse_attributes(text: str) -> Dict[str, str]:
+    attrs = {}
+    for match in _ATTRIBUTE_RE.finditer(text):
+        value = match.group(2) if match.group(2) is not None else match.group(3) if match.group(3) is not None else match.group(4)
+        attrs[match.group(1)] = _decode_entities(value)
+    return attrs
 
-def _collect_texts(elem: ET.Element, out: List[str]) -> None:
-    """Recursively collect element.text and element.tail in document order.
 
-    Both `text` and `tail` are stripped; empty strings are skipped.
+def _find_tag_end(buf: str, start: int) -> int:
+    """Return the index of the `>` closing the tag at `start`, honouring quoted
+    attribute values, -1 if the buffer ends first, or -2 if another `<` shows up
+    first (the opening `<` was not a tag)."""
+    end = _TAG_BODY_RE.match(buf, start).end()
+    if end >= len(buf):
+        return -1
+    c = buf[end]
+    if c == ">":
+        return end
+    if c == "<":
+        return -2
+    # an unterminated quote: either more data is coming or the tag is malformed
+    return -1
+
+
+def _find_declaration_end(buf: str, start: int) -> int:
+    """Return the index of the `>` closing a `<!DOCTYPE ...>` style declaration,
+    skipping an internal `[...]` subset, or -1 if the buffer ends first."""
+    depth = 0
+    quote = ""
+    for i in range(start, len(buf)):
+        c = buf[i]
+        if quote:
+            if c == quote:
+                quote = ""
+        elif c == '"' or c == "'":
+            quote = c
+        elif c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c == ">" and depth <= 0:
+            return i
+    return -1
+
+
+class _XmlTextTokenizer:
+    """Incremental, tolerant XML text tokenizer.
+
+    Feed decoded chunks with `feed()`; completed text nodes are appended to
+    `self.texts` (callers drain that list). Text split only by comments or
+    processing instructions is joined, like ElementTree does; any start or end
+    tag ends the current text node.
+
+    With a `selection`, the open elements are tracked as a stack of
+    (name, selector states, included, excluded) frames: text is only kept when
+    the innermost frame is included and not excluded, and selected attribute
+    values are emitted when their start tag is read. A mismatched end tag closes
+    every element up to the matching open one and is ignored if there is none.
     """
-    if elem.text:
-        text = elem.text.strip()
+
+    # (opening, terminator, keep content as text)
+    _SECTIONS = (
+        ("<!--", "-->", False),
+        ("<![CDATA[", "]]>", True),
+        ("<?", "?>", False),
+    )
+
+    def __init__(self, selection: XmlSelection | None = None) -> None:
+        self.texts: List[str] = []
+        self._buf = ""
+        self._parts: List[str] = []
+        # while inside a comment / CDATA / PI: (terminator, keep content)
+        self._section = None
+        self._selection = selection
+        if selection is not None:
+            # the document itself: text outside elements only counts without include selectors
+            self._stack = [("", selection.initial_states(), not selection.include, False)]
+
+    def _emit(self, text: str) -> None:
+        text = text.strip()
+        if text and _CONTROL_CHARS_RE.search(text):
+            text = _CONTROL_CHARS_RE.sub("", text).strip()
         if text:
-            out.append(text)
+            self.texts.append(text)
 
-    for child in elem:
-        _collect_texts(child, out)
+    def _flush(self) -> None:
+        parts = self._parts
+        if not parts:
+            return
+        self._parts = []
+        if self._selection is not None:
+            _, _, included, excluded = self._stack[-1]
+            if not included or excluded:
+                return
+        self._emit(parts[0] if len(parts) == 1 else "".join(parts))
 
-    if elem.tail:
-        tail = elem.tail.strip()
-        if tail:
-            out.append(tail)
+    def _tag(self, body: str) -> None:
+        stack = self._stack
+        if body.startswith("/"):
+            name = body[1:].strip()
+            for depth in range(len(stack) - 1, 0, -1):
+                if stack[depth][0] == name:
+                    del stack[depth:]
+                    break
+            return
 
+        match = _TAG_NAME_RE.match(body)
+        if match is None:
+            return
+        name = match.group()
+        self_closing = body.rstrip().endswith("/")
+        attrs = _parse_attributes(body[match.end():]) if "=" in body else {}
+        _, parent_states, parent_included, parent_excluded = stack[-1]
+        states, matched = self._selection.enter(parent_states, name, attrs)
+        included, excluded, harvest = self._selection.classify(matched)
+        included = included or parent_included
+        excluded = excluded or parent_excluded
+        if not excluded:
+            for attr in harvest:
+                if attr in attrs:
+                    self._emit(attrs[attr])
+        if not self_closing:
+            stack.append((name, states, included, excluded))
 
-def read_xml_texts_from_string(xml_string: str) -> List[str]:
-    """Parse an XML string and return all text nodes (no tags or attributes).
+    def feed(self, chunk: str, final: bool = False) -> None:
+        buf = self._buf + chunk if self._buf else chunk
+        self._buf = ""
+        i = 0
+        n = len(buf)
+        while i < n:
+            if self._section is not None:
+                terminator, keep = self._section
+                end = buf.find(terminator, i)
+                if end == -1:
+                    # keep a possible partial terminator for the next chunk
+                    cut = max(i, n - len(terminator) + 1) if not final else n
+                    if keep:
+                        self._parts.append(buf[i:cut])
+                    i = cut
+                    break
+                if keep:
+                    self._parts.append(buf[i:end])
+                i = end + len(terminator)
+                self._section = None
+                continue
 
-    Returns a list of text chunks in document order. CDATA is preserved as text.
+            lt = buf.find("<", i)
+            if lt == -1:
+                text = buf[i:]
+                amp = text.rfind("&")
+                if not final and amp != -1 and ";" not in text[amp:] and len(text) - amp < 32:
+                    # possibly a partial entity reference, wait for more data
+                    self._buf = text[amp:]
+                    text = text[:amp]
+                self._parts.append(_decode_entities(text))
+                i = n
+                break
 
-    This function is tolerant: on parse errors it will sanitize control characters
-    and fall back to a regex-based extraction of text between tags.
-    """
-    try:
-        root = ET.fromstring(xml_string)
-        out: List[str] = []
-        _collect_texts(root, out)
-        return out
-    except ET.ParseError as e:
-        # Best-effort fallback for malformed XML strings
-        # Remove problematic control characters
-        sanitized = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F]", "", xml_string)
+            if lt > i:
+                self._parts.append(_decode_entities(buf[i:lt]))
+            i = lt
+
+            if i + 1 >= n and not final:
+                break
+            if buf[i + 1:i + 2] in ("!", "?"):
+                rest = buf[i:i + 9]
+                section = None
+                for opening, terminator, keep in self._SECTIONS:
+                    if rest.startswith(opening):
+                        section = (opening, terminator, keep)
+                        break
+                    if not final and opening.startswith(rest):
+                        # cannot tell yet which markup this is
+                        section = ()
+                        break
+                if section == ():
+                    break
+                if section:
+                    opening, terminator, keep = section
+                    self._section = (terminator, keep)
+                    i += len(opening)
+                    continue
+
+            if buf.startswith("<!", i):
+                end = _find_declaration_end(buf, i + 2)
+            elif _TAG_START_RE.match(buf, i + 1):
+                end = _find_tag_end(buf, i + 1)
+            else:
+                # "<" not followed by a name: a stray less-than sign in text
+                self._parts.append("<")
+                i += 1
+                continue
+
+            if end == -1 and not final and n - i < MAX_TAG_LENGTH:
+                break
+            if end < 0:
+                # unterminated markup: recover by treating "<" as text
+                self._parts.append("<")
+                i += 1
+                continue
+
+            if buf[i + 1] != "!":
+                # a start or end tag ends the current text node; declarations
+                # such as DOCTYPE carry no text
+                self._flush()
+                if self._selection is not None:
+                    self._tag(buf[i + 1:end])
+            i = end + 1
+
+        if i < n:
+            # incomplete markup at the end of the chunk, wait for more data
+            self._buf = buf[i:]
+        if final:
+            # with final=True every branch above consumes the whole buffer
+            self._flush()
+
+    def close(self) -> None:
+        self.feed("", final=True)
+
+
+def _sniff_encoding(file_path: str) -> str:
+    """Return the encoding declared by the file's BOM or XML declaration (default UTF-8)."""
+    with open_input(file_path) as f:
+        head = f.read(1024)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    match = _ENCODING_DECL_RE.match(head)
+    if match:
+        encoding = match.group(1).decode("ascii")
         try:
-            root = ET.fromstring(sanitized)
-            out: List[str] = []
-            _collect_texts(root, out)
-            return out
-        except ET.ParseError:
-            # Final fallback: extract text between tags
-            texts = re.findall(r">([^<>]+)<", sanitized)
-            texts = [t.strip() for t in texts if t.strip()]
-            return texts
-
-
-def read_xml_texts(file_path: str) -> List[str]:
-    """Read the XML file at `file_path` and return all node text values.
+            codecs.lookup(encoding)
+            return encoding
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def iter_xml_texts_from_chunks(chunks, selection: XmlSelection | None = None) -> Iterator[str]:
+    """Yield the text nodes of an XML document given as an iterable of decoded chunks."""
+    tokenizer = _XmlTextTokenizer(selection)
+    for chunk in chunks:
+        tokenizer.feed(chunk)
+        if tokenizer.texts:
+            yield from tokenizer.texts
+            tokenizer.texts.clear()
+    tokenizer.close()
+    yield from tokenizer.texts
+
+
+def iter_xml_texts(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, selection: XmlSelection | None = None) -> Iterator[str]:
+    """Stream the XML file at `file_path` and yield all node text values.
 
     Example:
         <a>hello<b>world</b> tail</a>
-    returns ['hello', 'world', 'tail']
+    yields 'hello', 'world', 'tail'
 
-    This function will attempt to parse the XML normally, but if the input
-    is not well-formed (common in user-supplied XML), it falls back to a
-    tolerant extraction that (1) sanitizes control characters, (2) attempts
-    `ET.fromstring` on the sanitized text, and finally (3) extracts text via
-    a simple regex when parsing still fails.
+    The file is decoded using its BOM / XML declaration encoding (UTF-8 by
+    default, undecodable bytes replaced) and read `chunk_size` characters at a time.
+    With a `selection`, only the selected elements' text and attributes are yielded.
     """
-    try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        out: List[str] = []
-        _collect_texts(root, out)
-        return out
-    except ET.ParseError as e:
-        # Best-effort fallback for malformed XML: read as text and sanitize
-        safe_print(f"⚠️  XML parse error for {file_path}: {e}. Falling back to tolerant text extraction.")
-        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-            content = f.read()
-
-        # Remove disallowed control characters that break XML parsing
-        content = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F]", "", content)
-
-        # Try parsing sanitized content
-        try:
-            root = ET.fromstring(content)
-            out: List[str] = []
-            _collect_texts(root, out)
-            return out
-        except ET.ParseError:
-            # Final fallback: extract text between tags using a regex and strip
-            texts = re.findall(r">([^<>]+)<", content)
-            texts = [t.strip() for t in texts if t.strip()]
-            return texts
-
-
-__all__ = ["read_xml_texts", "read_xml_texts_from_string"]
+    def chunks():
+        with open_input_text(file_path, encoding=_sniff_encoding(file_path), errors="replace") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    return iter_xml_texts_from_chunks(chunks(), selection)
+
+
+def read_xml_texts_from_string(xml_string: str, selection: XmlSelection | None = None) -> List[str]:
+    """Parse an XML string and return all text nodes (no tags or attributes).
+
+    Returns a list of text chunks in document order. CDATA is preserved as text.
+
+    This function is tolerant: control characters are dropped and malformed
+    markup (e.g. an unescaped `&`) is kept as literal text.
+    """
+    # match the newline normalization XML parsers (and text-mode files) apply
+    xml_string = xml_string.replace("\r\n", "\n").replace("\r", "\n")
+    return list(iter_xml_texts_from_chunks([xml_string], selection))
+
+
+def read_xml_texts(file_path: str, selection: XmlSelection | None = None) -> List[str]:
+    """Read the XML file at `file_path` and return all node text values.
+
+    See `iter_xml_texts`; prefer that generator for large files.
+    """
+    return list(iter_xml_texts(file_path, selection=selection))
+
+
+__all__ = ["iter_xml_texts", "iter_xml_texts_from_chunks", "read_xml_texts", "read_xml_texts_from_string"]
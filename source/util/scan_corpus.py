@@ -0,0 +1,352 @@
+"""Helpers for scanning a folder of text inputs into a single character set.
+
+Functions:
+    discover_files(root, recursive, include, exclude) -> List[str]
+        Walk `root` with `os.scandir` and return every file a registered extractor
+        (see `extractors`) supports, filtered by include/exclude globs. Members of
+        zip / tar archives are listed as virtual paths (see `archive_inputs`).
+    list_text_files(text_folder) -> List[str]
+        Return the supported files directly inside `text_folder`, sorted by name.
+    extract_file_chars(file_path, treat_xml_as_text, chunk_size, counts, normalizer, raw, xml_selection) -> CodepointSet
+        Extract the unique characters of one input file without printing anything,
+        optionally counting every occurrence into a `Counter`, normalizing the
+        text first (see `text_normalizer`) and selecting XML elements (see
+        `xml_selectors`).
+    scan_files(file_paths, jobs, treat_xml_as_text, chunk_size, cache) -> CodepointSet
+        Extract every file (optionally on a process pool, optionally skipping files
+        found in an `ExtractCache`) and merge the per-file results. Per-file timing
+        goes to an optional `Profiler`; `frequencies` collects occurrence counts and
+        `raw_chars` the characters as they were before normalization.
+"""
+from __future__ import annotations
+
+import fnmatch
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from source.util.archive_inputs import (
+    ARCHIVE_ERRORS,
+    input_stat,
+    is_archive,
+    list_archive_members,
+    member_path,
+    warn_unreadable_archive,
+)
+from source.util.codepoint_set import CodepointSet
+from source.util.extract_cache import ExtractCache, Fingerprint, file_fingerprint
+from source.util.extract_char_set import DEFAULT_CHUNK_SIZE
+from source.util.extractors import get_extractor, supported_extensions
+from source.util.profiler import Profiler
+from source.util.safe_print import safe_print
+from source.util.text_normalizer import TextNormalizer
+from source.util.xml_selectors import XmlSelection
+
+
+def path_matches(rel_path: str, patterns: Sequence[str]) -> bool:
+    """True if the "/"-separated `rel_path` or its file name matches one of the globs ("*" also matches "/")."""
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def discover_files(
+    root: str,
+    recursive: bool = True,
+    include: Sequence[str] | None = None,
+    exclude: Sequence[str] | None = None,
+) -> List[str]:
+    """Return the supported input files under `root`, sorted by relative path.
+
+    A file is kept when a registered extractor handles its extension, it matches
+    one of the `include` globs (if any) and none of the `exclude` globs. Excluded
+    directories are not descended into. The result is sorted so every scan
+    (serial or parallel) visits files in the same order.
+
+    Zip and tar archives (and `root` itself, if it is one) are listed without
+    unpacking: their supported members are returned as `<archive>!/<member>`
+    paths, in archive order, and filtered on `<archive rel path>/<member>`.
+    """
+    extensions = tuple(supported_extensions())
+    include = list(include or [])
+    exclude = list(exclude or [])
+    if os.path.isfile(root) and is_archive(root):
+        return [path for _, path in _archive_inputs(root, "", extensions, include, exclude)]
+
+    # sort keys: (relative path, 0) for files, (archive relative path, 1 + member index) for members
+    files = []
+    pending = [(root, "")]
+    while pending:
+        folder, rel_folder = pending.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                rel_path = rel_folder + entry.name
+                if exclude and path_matches(rel_path, exclude):
+                    continue
+                if entry.is_dir():
+                    if recursive:
+                        pending.append((entry.path, rel_path + "/"))
+                elif entry.is_file() and entry.name.lower().endswith(extensions):
+                    if include and not path_matches(rel_path, include):
+                        continue
+                    files.append(((rel_path, 0), entry.path))
+                elif entry.is_file() and is_archive(entry.name):
+                    for index, path in _archive_inputs(entry.path, rel_path + "/", extensions, include, exclude):
+                        files.append(((rel_path, 1 + index), path))
+    files.sort()
+    return [path for _, path in files]
+
+
+def _archive_inputs(
+    archive: str,
+    rel_prefix: str,
+    extensions: Tuple[str, ...],
+    include: Sequence[str],
+    exclude: Sequence[str],
+) -> List[Tuple[int, str]]:
+    """(member index, virtual path) of the supported members of `archive` passing the filters."""
+    try:
+        members = list_archive_members(archive)
+    except ARCHIVE_ERRORS as e:
+        warn_unreadable_archive(archive, e)
+        return []
+    inputs = []
+    for member in members:
+        if not member.name.lower().endswith(extensions):
+            continue
+        rel_path = rel_prefix + member.name
+        if exclude:
+            # an excluded folder inside the archive excludes its members
+            parts = member.name.split("/")
+            if any(path_matches(rel_prefix + "/".join(parts[:i]), exclude) for i in range(1, len(parts) + 1)):
+                continue
+        if include and not path_matches(rel_path, include):
+            continue
+        inputs.append((member.index, member_path(archive, member.name)))
+    return inputs
+
+
+def list_text_files(text_folder: str) -> List[str]:
+    """Return the supported input files at the top level of `text_folder`."""
+    return discover_files(text_folder, recursive=False)
+
+
+def extract_file_chars(
+    file_path: str,
+    treat_xml_as_text: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    counts: Counter | None = None,
+    normalizer: TextNormalizer | None = None,
+    raw: CodepointSet | None = None,
+    xml_selection: XmlSelection | None = None,
+) -> CodepointSet:
+    """Return the unique characters of a single input file.
+
+    The file's extractor (see `extractors.get_extractor`) decides which strings
+    count; unknown extensions are read as plain text. With `counts`, every
+    occurrence is also counted into it. With a `normalizer`, the text is
+    normalized before its characters are collected (and counted); `raw` then
+    receives the characters as they were before. This stays silent, so it can
+    run inside worker processes. `xml_selection` restricts XML files to the
+    selected elements and attributes.
+    """
+    chars = CodepointSet()
+    extractor = get_extractor(file_path, treat_xml_as_text, xml_selection) or get_extractor(".txt")
+    if normalizer is not None and not normalizer.active:
+        normalizer = None
+    # extractors may yield many short strings (XML text nodes, JSON values):
+    # insert them in batches of up to `chunk_size` characters
+    batch: List[str] = []
+    batch_size = 0
+    # folded start of a combining sequence that may continue in the next batch
+    carry = ""
+    for text in extractor(file_path, chunk_size):
+        batch.append(text)
+        batch_size += len(text)
+        if batch_size >= chunk_size:
+            carry = _add_text(chars, counts, "".join(batch), normalizer, raw, carry)
+            batch = []
+            batch_size = 0
+    if batch or carry:
+        _add_text(chars, counts, "".join(batch), normalizer, raw, carry, final=True)
+    return chars
+
+
+def _add_text(
+    chars: CodepointSet,
+    counts: Counter | None,
+    text: str,
+    normalizer: TextNormalizer | None = None,
+    raw: CodepointSet | None = None,
+    carry: str = "",
+    final: bool = False,
+) -> str:
+    """Collect the characters of `text`; returns the new carry (see `TextNormalizer.split_stable`)."""
+    if normalizer is not None:
+        if raw is not None:
+            raw.update(text)
+        # fold first: a folded character may compose with the one before it
+        text = carry + normalizer.fold(text)
+        carry = ""
+        if not final:
+            text, carry = normalizer.split_stable(text)
+        text = normalizer.finish(text)
+    chars.update(text)
+    if counts is not None:
+        # Counter.update on a string counts in C
+        counts.update(text)
+    return carry
+
+
+# (file_path, treat_xml_as_text, chunk_size, count_frequencies, normalizer, xml_selection, fingerprint)
+ExtractTask = Tuple[str, bool, int, bool, TextNormalizer | None, XmlSelection | None, bool]
+
+# (characters, counts, characters before normalization, seconds, fingerprint taken before extracting)
+Extracted = Tuple[CodepointSet, Counter | None, CodepointSet | None, float, Fingerprint | None]
+
+
+def _timed_extract(task: ExtractTask) -> Extracted:
+    file_path, treat_xml_as_text, chunk_size, count_frequencies, normalizer, xml_selection, fingerprint = task
+    start = time.perf_counter()
+    # hashed here, in the worker, before extracting (see `extract_cache.file_fingerprint`)
+    stamp = file_fingerprint(file_path) if fingerprint else None
+    counts = Counter() if count_frequencies else None
+    raw = CodepointSet() if normalizer is not None else None
+    chars = extract_file_chars(file_path, treat_xml_as_text, chunk_size, counts, normalizer, raw, xml_selection)
+    return chars, counts, raw, time.perf_counter() - start, stamp
+
+
+def _extract_worker(task: ExtractTask) -> Tuple[bytes, Dict[str, int] | None, bytes | None, float, Fingerprint | None]:
+    # send the compressed bitmap back: much cheaper to pickle than the characters
+    chars, counts, raw, seconds, stamp = _timed_extract(task)
+    return chars.to_bytes(), None if counts is None else dict(counts), None if raw is None else raw.to_bytes(), seconds, stamp
+
+
+def _iter_extracted(
+    file_paths: List[str],
+    jobs: int,
+    treat_xml_as_text: bool,
+    chunk_size: int,
+    count_frequencies: bool = False,
+    normalizer: TextNormalizer | None = None,
+    xml_selection: XmlSelection | None = None,
+    fingerprint: bool = False,
+) -> Iterator[Extracted]:
+    tasks = [
+        (file_path, treat_xml_as_text, chunk_size, count_frequencies, normalizer, xml_selection, fingerprint)
+        for file_path in file_paths
+    ]
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _timed_extract(task)
+        return
+
+    # hand out several files per round-trip when there are many small ones
+    map_chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for data, counts, raw, seconds, stamp in pool.map(_extract_worker, tasks, chunksize=map_chunksize):
+            yield (
+                CodepointSet.from_bytes(data),
+                None if counts is None else Counter(counts),
+                None if raw is None else CodepointSet.from_bytes(raw),
+                seconds,
+                None if stamp is None else tuple(stamp),
+            )
+
+
+def scan_files(
+    file_paths: List[str],
+    jobs: int = 1,
+    treat_xml_as_text: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache: ExtractCache | None = None,
+    char_set: CodepointSet | None = None,
+    per_file: Dict[str, str] | None = None,
+    profiler: Profiler | None = None,
+    verbose: bool = True,
+    frequencies: Counter | None = None,
+    normalizer: TextNormalizer | None = None,
+    raw_chars: CodepointSet | None = None,
+    xml_selection: XmlSelection | None = None,
+) -> CodepointSet:
+    """Extract the characters of `file_paths` and merge them into `char_set`.
+
+    With `jobs > 1` the files are extracted on a pool of worker processes. With a
+    `cache`, files whose manifest entry is still valid are not read at all, and
+    the freshly extracted ones are recorded (call `cache.save()` afterwards).
+
+    Results are merged in the order of `file_paths`, so the final set is the same
+    whatever the number of jobs or the cache state. Characters are carried as
+    `CodepointSet` bitmaps (`char_set` may also be a plain set). If `per_file` is given it is
+    filled with each file's characters as a sorted string. With a `profiler`,
+    every file's size, unique character count and extraction time is recorded;
+    `verbose=False` drops the per-file progress line. If `frequencies` is given,
+    the occurrences of every character are added to it (cached files without
+    stored counts are rescanned). With an active `normalizer` every file's text
+    is normalized before its characters are collected, and `raw_chars` (if
+    given) receives the characters as they were before normalization; the
+    `cache` must then have been opened with the normalizer options. The same
+    goes for `xml_selection`, which restricts XML files to the selected
+    elements and attributes.
+    """
+    if char_set is None:
+        char_set = CodepointSet()
+    if normalizer is not None and not normalizer.active:
+        normalizer = None
+
+    pending = []
+    for file_path in file_paths:
+        cached = cached_counts = None
+        if cache is not None:
+            if frequencies is None:
+                cached = cache.lookup(file_path)
+            else:
+                cached_counts = cache.lookup_counts(file_path)
+                if cached_counts is not None:
+                    cached = CodepointSet(cached_counts)
+        cached_raw = None
+        if cached is not None and normalizer is not None:
+            cached_raw = cache.lookup_raw(file_path)
+            if cached_raw is None:
+                cached = None
+        if cached is None:
+            pending.append(file_path)
+        else:
+            char_set.update(cached)
+            if raw_chars is not None:
+                raw_chars.update(cached_raw if cached_raw is not None else cached)
+            if cached_counts is not None:
+                frequencies.update(cached_counts)
+            if per_file is not None:
+                per_file[file_path] = cached.to_string()
+            if profiler is not None:
+                profiler.record_file(file_path, input_stat(file_path)[0], len(cached), 0.0, cached=True)
+
+    if cache is not None and len(pending) < len(file_paths):
+        print(f"Extraction cache: {len(file_paths) - len(pending)} unchanged files skipped, {len(pending)} to scan")
+    if jobs > 1 and len(pending) > 1:
+        print(f"Scanning {len(pending)} files with {jobs} worker processes")
+
+    extracted = _iter_extracted(
+        pending, jobs, treat_xml_as_text, chunk_size, frequencies is not None, normalizer, xml_selection, cache is not None
+    )
+    for file_path, (chars, counts, raw, seconds, stamp) in zip(pending, extracted):
+        char_set.update(chars)
+        if counts is not None:
+            frequencies.update(counts)
+        if raw_chars is not None:
+            raw_chars.update(raw if raw is not None else chars)
+        if cache is not None:
+            cache.store(file_path, chars, counts, raw, stamp)
+        if per_file is not None:
+            per_file[file_path] = chars.to_string()
+        if profiler is not None:
+            profiler.record_file(file_path, input_stat(file_path)[0], len(chars), seconds)
+        if verbose:
+            safe_print(f"File: {file_path}", f"{len(chars)} unique characters")
+
+    return char_set
+
+
+__all__ = ["path_matches", "discover_files", "list_text_files", "extract_file_chars", "scan_files"]
@@ -0,0 +1,227 @@
+"""Unicode normalization of the extracted text.
+
+Raw decoded text can hold several spellings of what is drawn as one glyph: a
+decomposed "e" + U+0301 next to the precomposed "é", compatibility characters,
+fullwidth Latin next to ASCII, and invisible characters (zero-width joiners,
+BOMs, variation selectors, direction marks, control codes) that a font never
+draws on their own. Each of them would otherwise become a separate atlas glyph.
+
+A `TextNormalizer` is applied to every extracted string before its characters
+are collected (see `scan_corpus.extract_file_chars`), in this order:
+
+    fold_width      fullwidth / halfwidth forms (U+FF00-U+FFEF, U+3000) to their
+                    ordinary counterparts
+    form            "NFC" or "NFKC" normalization (None keeps the text as is)
+    strip_format    drop format characters (Cf: ZWJ, ZWNJ, BOM, direction marks,
+                    soft hyphen, ...) and variation selectors
+    strip_control   drop control characters (Cc)
+
+Only enable what the game does at runtime too: an atlas built from NFC text
+lacks the combining marks needed to draw the same text left decomposed.
+
+`normalization_report(raw, normalized, normalizer)` compares the character
+sets before and after and tells how many glyphs each step eliminated.
+"""
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from source.util.safe_print import safe_print
+
+
+NORMALIZATION_FORMS = ("NFC", "NFKC")
+
+# planes holding format characters: BMP, SMP and the tag / variation selector plane
+_FORMAT_SCAN_RANGES = ((0, 0x20000), (0xE0000, 0xE1000))
+
+# the longest run of non-starters kept back for the next batch; a longer run is
+# not a real combining sequence, so it is normalized without waiting
+_MAX_CARRY = 64
+
+
+def _is_variation_selector(cp: int) -> bool:
+    return 0xFE00 <= cp <= 0xFE0F or 0xE0100 <= cp <= 0xE01EF or 0x180B <= cp <= 0x180F
+
+
+def _is_width_form(char: str) -> bool:
+    return unicodedata.decomposition(char).startswith(("<wide>", "<narrow>"))
+
+
+@lru_cache(maxsize=None)
+def _translate_table(strip_format: bool, strip_control: bool) -> Dict[int, None]:
+    table: Dict[int, None] = {}
+    for start, end in _FORMAT_SCAN_RANGES:
+        for cp in range(start, end):
+            category = unicodedata.category(chr(cp))
+            if strip_format and (category == "Cf" or _is_variation_selector(cp)):
+                table[cp] = None
+            elif strip_control and category == "Cc":
+                table[cp] = None
+    return table
+
+
+@lru_cache(maxsize=None)
+def _width_table() -> Dict[int, str]:
+    table = {}
+    for cp in [0x3000, *range(0xFF00, 0xFFF0)]:
+        char = chr(cp)
+        if _is_width_form(char):
+            table[cp] = unicodedata.normalize("NFKC", char)
+    return table
+
+
+@dataclass(frozen=True)
+class TextNormalizer:
+    form: str | None = None
+    strip_format: bool = False
+    strip_control: bool = False
+    fold_width: bool = False
+
+    def __post_init__(self):
+        if self.form is not None and self.form not in NORMALIZATION_FORMS:
+            raise ValueError(f"unknown normalization form '{self.form}', expected one of {', '.join(NORMALIZATION_FORMS)}")
+
+    @property
+    def active(self) -> bool:
+        return bool(self.form or self.strip_format or self.strip_control or self.fold_width)
+
+    def options(self) -> dict:
+        """Settings as a dict, for cache keys and reports."""
+        return asdict(self)
+
+    def __call__(self, text: str) -> str:
+        return self.finish(self.fold(text))
+
+    def fold(self, text: str) -> str:
+        """The width folding step alone (per character, so it can run on any piece of text)."""
+        return text.translate(_width_table()) if self.fold_width else text
+
+    def finish(self, text: str) -> str:
+        """The remaining steps, on text that already went through `fold`."""
+        if self.form:
+            text = unicodedata.normalize(self.form, text)
+        if self.strip_format or self.strip_control:
+            text = text.translate(_translate_table(self.strip_format, self.strip_control))
+        return text
+
+    def split_stable(self, text: str) -> Tuple[str, str]:
+        """Split folded text (see `fold`) before the start of its trailing run of
+        characters that may still compose with what comes next.
+
+        That tail (combining marks, Hangul vowel / final jamo and the other
+        characters that compose with the character before them, plus the starter
+        they follow) may combine with the text of the next piece, so streaming
+        callers prepend it to that piece instead of normalizing it now. Without a
+        normalization form nothing is held back.
+        """
+        if not self.form:
+            return text, ""
+        for i in range(len(text) - 1, max(-1, len(text) - _MAX_CARRY - 1), -1):
+            if _is_boundary(text[i], self.form):
+                return text[:i], text[i:]
+        return text, ""
+
+
+@lru_cache(maxsize=None)
+def _second_in_composition() -> frozenset:
+    """Characters that compose with the character before them (second half of a
+    canonical pair, or a Hangul vowel / final jamo)."""
+    seconds = set(map(chr, range(0x1161, 0x1176))) | set(map(chr, range(0x11A8, 0x11C3)))
+    for cp in range(0x20000):
+        parts = unicodedata.decomposition(chr(cp)).split()
+        if len(parts) == 2 and not parts[0].startswith("<"):
+            seconds.add(chr(int(parts[1], 16)))
+    return frozenset(seconds)
+
+
+@lru_cache(maxsize=4096)
+def _is_boundary(char: str, form: str) -> bool:
+    """True when normalization never combines `char` with the text before it."""
+    decomposed = unicodedata.normalize("NFKD" if form == "NFKC" else "NFD", char)
+    first = decomposed[:1] or char
+    return unicodedata.combining(char) == 0 and unicodedata.combining(first) == 0 and first not in _second_in_composition()
+
+
+@dataclass
+class NormalizationReport:
+    raw_count: int
+    normalized_count: int
+    # eliminated characters by reason: "control", "format", "width", "normalization"
+    removed: Dict[str, List[str]] = field(default_factory=dict)
+    # characters that only appear after normalization (precomposed or folded forms)
+    added: List[str] = field(default_factory=list)
+
+    @property
+    def eliminated(self) -> int:
+        return self.raw_count - self.normalized_count
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["eliminated"] = self.eliminated
+        return data
+
+
+def removal_reason(char: str, normalizer: TextNormalizer) -> str:
+    """Which step of `normalizer` most likely dropped `char`."""
+    category = unicodedata.category(char)
+    if normalizer.strip_control and category == "Cc":
+        return "control"
+    if normalizer.strip_format and (category == "Cf" or _is_variation_selector(ord(char))):
+        return "format"
+    if normalizer.fold_width and _is_width_form(char):
+        return "width"
+    return "normalization"
+
+
+def normalization_report(
+    raw: Iterable[str],
+    normalized: Iterable[str],
+    normalizer: TextNormalizer,
+    ignore: Iterable[str] = (),
+) -> NormalizationReport:
+    """Compare the characters before and after normalization.
+
+    Characters in `ignore` (e.g. the ones the character policy skips anyway) are
+    left out, so only changes to the generated glyphs are reported.
+    """
+    ignore = set(ignore)
+    raw_set = set(raw) - ignore
+    normalized_set = set(normalized) - ignore
+    removed: Dict[str, List[str]] = {}
+    for char in sorted(raw_set - normalized_set):
+        removed.setdefault(removal_reason(char, normalizer), []).append(char)
+    return NormalizationReport(len(raw_set), len(normalized_set), removed, sorted(normalized_set - raw_set))
+
+
+def print_normalization_report(report: NormalizationReport) -> None:
+    reasons = ", ".join(f"{len(chars)} {reason}" for reason, chars in sorted(report.removed.items()))
+    safe_print(
+        f"🧹  Normalization: {report.raw_count} -> {report.normalized_count} unique characters "
+        f"({report.eliminated} glyphs eliminated{': ' + reasons if reasons else ''}"
+        f"{f', {len(report.added)} added' if report.added else ''})"
+    )
+
+
+def write_normalization_report(report: NormalizationReport, output_file: str) -> None:
+    """Write `U+XXXX<TAB>name<TAB>reason` lines for every eliminated or added character."""
+    with open(output_file, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# codepoint\tname\tchange\n")
+        rows = [(char, reason) for reason, chars in report.removed.items() for char in chars]
+        rows += [(char, "added") for char in report.added]
+        for char, change in sorted(rows):
+            f.write(f"U+{ord(char):04X}\t{unicodedata.name(char, '?')}\t{change}\n")
+    safe_print(f"Normalization changes: saved to {output_file}")
+
+
+__all__ = [
+    "NORMALIZATION_FORMS",
+    "TextNormalizer",
+    "NormalizationReport",
+    "removal_reason",
+    "normalization_report",
+    "print_normalization_report",
+    "write_normalization_report",
+]
@@ -0,0 +1,146 @@
+"""Pure-Python reader for the `cmap` table of TrueType / OpenType fonts.
+
+Functions:
+    read_cmap_coverage(font_file, font_index=0) -> set[int]
+        Return every codepoint the font maps to a real glyph (glyph id != 0).
+
+The font file is memory-mapped and only the table directory and the `cmap`
+subtables are touched, so even large CJK fonts (or .ttc collections, via
+`font_index`) are read without loading the whole file. All Unicode subtables
+(platform 0, and platform 3 encodings 1 and 10) are merged; formats 4, 6, 12 and
+13 are supported, which covers the fonts produced by every mainstream tool.
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+from typing import Set
+
+
+class FontFormatError(ValueError):
+    """Raised when the file is not a TrueType / OpenType font or has no usable cmap."""
+
+
+def _u16(data, offset: int) -> int:
+    return struct.unpack_from(">H", data, offset)[0]
+
+
+def _u32(data, offset: int) -> int:
+    return struct.unpack_from(">I", data, offset)[0]
+
+
+def _find_table(data, font_offset: int, tag: bytes) -> int:
+    num_tables = _u16(data, font_offset + 4)
+    for i in range(num_tables):
+        record = font_offset + 12 + 16 * i
+        if data[record:record + 4] == tag:
+            return _u32(data, record + 8)
+    raise FontFormatError(f"font has no '{tag.decode('ascii')}' table")
+
+
+def _format4(data, offset: int, out: Set[int]) -> None:
+    seg_count = _u16(data, offset + 6) // 2
+    end_codes = offset + 14
+    start_codes = end_codes + 2 * seg_count + 2
+    id_deltas = start_codes + 2 * seg_count
+    id_range_offsets = id_deltas + 2 * seg_count
+    for i in range(seg_count):
+        end = _u16(data, end_codes + 2 * i)
+        start = _u16(data, start_codes + 2 * i)
+        delta = _u16(data, id_deltas + 2 * i)
+        range_offset_pos = id_range_offsets + 2 * i
+        range_offset = _u16(data, range_offset_pos)
+        if start == 0xFFFF:
+            continue
+        if range_offset == 0:
+            for cp in range(start, end + 1):
+                if (cp + delta) & 0xFFFF:
+                    out.add(cp)
+        else:
+            glyphs = struct.unpack_from(f">{end - start + 1}H", data, range_offset_pos + range_offset)
+            for cp, glyph in zip(range(start, end + 1), glyphs):
+                if glyph and (glyph + delta) & 0xFFFF:
+                    out.add(cp)
+
+
+def _format6(data, offset: int, out: Set[int]) -> None:
+    first = _u16(data, offset + 6)
+    count = _u16(data, offset + 8)
+    glyphs = struct.unpack_from(f">{count}H", data, offset + 10)
+    out.update(first + i for i, glyph in enumerate(glyphs) if glyph)
+
+
+def _format12_13(data, offset: int, out: Set[int], constant_glyph: bool) -> None:
+    num_groups = _u32(data, offset + 12)
+    for i in range(num_groups):
+        start, end, glyph = struct.unpack_from(">III", data, offset + 16 + 12 * i)
+        end = min(end, 0x10FFFF)
+        if constant_glyph:
+            if glyph:
+                out.update(range(start, end + 1))
+        else:
+            # only the first codepoint can land on glyph 0 (.notdef)
+            out.update(range(start if glyph else start + 1, end + 1))
+
+
+def _read_coverage(data, font_index: int) -> Set[int]:
+    font_offset = 0
+    if data[:4] == b"ttcf":
+        num_fonts = _u32(data, 8)
+        if not 0 <= font_index < num_fonts:
+            raise FontFormatError(f"font index {font_index} out of range (collection has {num_fonts} fonts)")
+        font_offset = _u32(data, 12 + 4 * font_index)
+
+    if data[font_offset:font_offset + 4] not in (b"\x00\x01\x00\x00", b"OTTO", b"true"):
+        raise FontFormatError("not a TrueType / OpenType font")
+
+    cmap = _find_table(data, font_offset, b"cmap")
+    coverage: Set[int] = set()
+    seen = set()
+    found_unicode = False
+    for i in range(_u16(data, cmap + 2)):
+        platform, encoding, sub_offset = struct.unpack_from(">HHI", data, cmap + 4 + 8 * i)
+        if not (platform == 0 or (platform == 3 and encoding in (1, 10))):
+            continue
+        found_unicode = True
+        offset = cmap + sub_offset
+        if offset in seen:
+            continue
+        seen.add(offset)
+
+        fmt = _u16(data, offset)
+        if fmt == 4:
+            _format4(data, offset, coverage)
+        elif fmt == 6:
+            _format6(data, offset, coverage)
+        elif fmt == 12:
+            _format12_13(data, offset, coverage, constant_glyph=False)
+        elif fmt == 13:
+            _format12_13(data, offset, coverage, constant_glyph=True)
+        # format 14 (variation sequences) and legacy formats carry no extra coverage
+
+    if not found_unicode:
+        raise FontFormatError("font has no Unicode cmap subtable")
+    return coverage
+
+
+def read_cmap_coverage(font_file: str, font_index: int = 0) -> Set[int]:
+    """Return the set of codepoints `font_file` has glyphs for.
+
+    Raises FontFormatError for files that are not fonts or lack a Unicode cmap.
+    """
+    with open(font_file, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            raise FontFormatError(f"empty font file: {font_file}")
+        try:
+            return _read_coverage(data, font_index)
+        except struct.error as e:
+            raise FontFormatError(f"truncated font file {font_file}: {e}")
+        finally:
+            data.close()
+
+
+__all__ = ["FontFormatError", "read_cmap_coverage"]
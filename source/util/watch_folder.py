@@ -0,0 +1,194 @@
+"""Watch a text folder for changes and keep a running character set.
+
+`FolderWatcher.wait_for_changes()` blocks until input files were added,
+modified or removed, waits for a burst of saves to settle (debounce) and returns
+the changed paths. Changes are always confirmed by comparing (size, mtime)
+snapshots; on Linux an inotify descriptor is used to wake up immediately instead
+of polling, elsewhere (or if inotify is unavailable) the folder is polled.
+
+`CharRefCount` keeps, for every character, the number of files containing it, so
+replacing the characters of one file updates the running set in time
+proportional to that file only.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from source.util.archive_inputs import ARCHIVE_ERRORS, input_stat, split_member_path
+
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+# inotify(7) event masks
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+
+class _Inotify:
+    """Minimal ctypes inotify wrapper, used only as a wake-up signal."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched: Set[str] = set()
+
+    def watch(self, folders: Iterable[str]) -> None:
+        for folder in folders:
+            if folder in self._watched:
+                continue
+            if self._libc.inotify_add_watch(self.fd, os.fsencode(folder), _WATCH_MASK) >= 0:
+                self._watched.add(folder)
+
+    def wait(self, timeout: float) -> bool:
+        """Return True if events arrived within `timeout` seconds (events are drained)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Report changes to the files returned by `list_files()`.
+
+    Usage:
+        watcher = FolderWatcher(folder, lambda: list_text_files(folder))
+        while True:
+            changed = watcher.wait_for_changes()
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        list_files: Callable[[], List[str]],
+        poll_interval: float = 1.0,
+        debounce: float = 0.5,
+        use_inotify: bool = True,
+    ):
+        self.folder = folder
+        self.list_files = list_files
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._snapshot = self.snapshot()
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._watch_folders()
+            except (OSError, AttributeError):
+                # no inotify (old libc, restricted sandbox...): fall back to polling
+                self._inotify = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def snapshot(self) -> Snapshot:
+        snap = {}
+        for path in self.list_files():
+            try:
+                snap[path] = input_stat(path)
+            except ARCHIVE_ERRORS:
+                # removed, or an archive caught mid-write
+                continue
+        return snap
+
+    def _watch_folders(self) -> None:
+        # archive members: watch the folder holding the archive
+        folders = {self.folder} | {os.path.dirname(split_member_path(p)[0]) for p in self._snapshot}
+        self._inotify.watch(folders)
+
+    def _wait(self, timeout: float) -> None:
+        if self._inotify is not None:
+            self._inotify.wait(timeout)
+        else:
+            time.sleep(timeout)
+
+    def poll_changes(self) -> Set[str]:
+        """Return the paths added, modified or removed since the last call."""
+        current = self.snapshot()
+        changed = {p for p in current if self._snapshot.get(p) != current[p]}
+        changed |= set(self._snapshot) - set(current)
+        self._snapshot = current
+        if self._inotify is not None and changed:
+            self._watch_folders()
+        return changed
+
+    def wait_for_changes(self, timeout: float | None = None) -> Set[str]:
+        """Block until files changed and stayed quiet for `debounce` seconds.
+
+        Returns the changed paths, or an empty set once `timeout` (if given) expires.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll_changes()
+            if changed:
+                # debounce: keep collecting until no new change shows up
+                while True:
+                    time.sleep(self.debounce)
+                    more = self.poll_changes()
+                    if not more:
+                        return changed
+                    changed |= more
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+            self._wait(wait)
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class CharRefCount:
+    """Running character set built from per-file character strings."""
+
+    def __init__(self) -> None:
+        self._files: Dict[str, str] = {}
+        self._counts: Counter = Counter()
+
+    def set_file(self, path: str, chars: str) -> None:
+        self.remove_file(path)
+        self._files[path] = chars
+        self._counts.update(chars)
+
+    def remove_file(self, path: str) -> None:
+        old = self._files.pop(path, None)
+        if old:
+            self._counts.subtract(old)
+            for char in old:
+                if self._counts[char] <= 0:
+                    del self._counts[char]
+
+    def char_set(self) -> Set[str]:
+        return set(self._counts)
+
+
+__all__ = ["FolderWatcher", "CharRefCount"]
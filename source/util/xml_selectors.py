@@ -0,0 +1,180 @@
+"""XPath-subset selectors for XML text extraction.
+
+By default every text node of an XML file counts. An `XmlSelection` narrows
+that down while the file is streamed (see `read_xml_txt.iter_xml_texts`):
+
+    include     only text inside an element matching one of these selectors
+                (at any depth below it) is kept; no include selectors = all text
+    exclude     text inside an element matching one of these is dropped, even
+                when it is also inside an included element
+    attributes  values of these attributes are harvested as text too, e.g.
+                `//button/@label`; excluded elements are skipped
+
+Supported syntax, a subset of XPath 1.0 location paths:
+
+    //string              `string` elements at any depth
+    /strings/string       absolute path from the document element
+    menu//item            `item` anywhere below `menu` (relative = `//menu//item`)
+    *                     any element name
+    [@lang]               predicate: the attribute is present
+    [@lang='zh']          predicate: attribute value equals ("!=" for not equal)
+    //item/@title         (attributes only) the `title` attribute of `item`
+    //@alt                (attributes only) the `alt` attribute of any element
+
+Names are compared literally, including any namespace prefix. Selectors are
+matched incrementally against the stack of open elements, so memory and time
+stay linear in the document size whatever the nesting depth.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Tuple
+
+
+_NAME = r"[^\s/\[\]@=!'\"*()<>]+"
+_STEP_RE = re.compile(rf"\s*(//|/)?\s*({_NAME}|\*)\s*((?:\[[^\]]*\]\s*)*)")
+_PREDICATE_RE = re.compile(rf"""\[\s*@({_NAME})\s*(?:(!?=)\s*(?:"([^"]*)"|'([^']*)'))?\s*\]\s*""")
+_ATTRIBUTE_RE = re.compile(rf"^(.*?)(?:/?/)?@({_NAME})\s*$", re.DOTALL)
+
+# (attribute, operator or None, value)
+Predicate = Tuple[str, "str | None", str]
+
+
+@dataclass(frozen=True)
+class Step:
+    # "/" (child of the previous step, or the document element) or "//" (any descendant)
+    axis: str
+    name: str
+    predicates: Tuple[Predicate, ...] = ()
+
+    def matches(self, name: str, attrs: Dict[str, str]) -> bool:
+        if self.name != "*" and self.name != name:
+            return False
+        for attr, op, value in self.predicates:
+            actual = attrs.get(attr)
+            if op is None:
+                if actual is None:
+                    return False
+            elif (actual == value) != (op == "="):
+                return False
+        return True
+
+
+def parse_selector(selector: str) -> Tuple[Step, ...]:
+    """Compile an element selector into its steps. Raises ValueError for unsupported syntax."""
+    text = selector.strip()
+    steps = []
+    pos = 0
+    while pos < len(text):
+        match = _STEP_RE.match(text, pos)
+        if match is None or match.end() == pos or (steps and not match.group(1)):
+            raise ValueError(f"unsupported XML selector '{selector}' (at position {pos})")
+        predicates = []
+        body = match.group(3)
+        end = 0
+        for predicate in _PREDICATE_RE.finditer(body):
+            if predicate.start() != end:
+                break
+            value = predicate.group(3) if predicate.group(3) is not None else predicate.group(4) or ""
+            predicates.append((predicate.group(1), predicate.group(2), value))
+            end = predicate.end()
+        if end != len(body):
+            raise ValueError(f"unsupported predicate in XML selector '{selector}': {body.strip()}")
+        # a relative path starts anywhere in the document
+        steps.append(Step(match.group(1) or "//", match.group(2), tuple(predicates)))
+        pos = match.end()
+    if not steps:
+        raise ValueError("empty XML selector")
+    return tuple(steps)
+
+
+def parse_attribute_selector(selector: str) -> Tuple[Tuple[Step, ...], str]:
+    """Compile `path/@name` into (element steps, attribute name)."""
+    match = _ATTRIBUTE_RE.match(selector.strip())
+    if match is None:
+        raise ValueError(f"attribute selector '{selector}' must end in /@name")
+    element = match.group(1).strip() or "//*"
+    return parse_selector(element), match.group(2)
+
+
+# NFA state: (selector index, index of the next step to match)
+_State = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class XmlSelection:
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    attributes: Tuple[str, ...] = ()
+    # compiled selectors: include + exclude + attribute element paths
+    _selectors: Tuple[Tuple[Step, ...], ...] = field(init=False, repr=False, compare=False)
+    _attribute_names: Tuple[str, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for name in ("include", "exclude", "attributes"):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        attributes = [parse_attribute_selector(s) for s in self.attributes]
+        selectors = [parse_selector(s) for s in self.include + self.exclude] + [steps for steps, _ in attributes]
+        object.__setattr__(self, "_selectors", tuple(selectors))
+        object.__setattr__(self, "_attribute_names", tuple(name for _, name in attributes))
+
+    @property
+    def active(self) -> bool:
+        return bool(self.include or self.exclude or self.attributes)
+
+    def options(self) -> dict:
+        """Selectors as a dict, for cache keys."""
+        return {"include": list(self.include), "exclude": list(self.exclude), "attributes": list(self.attributes)}
+
+    def initial_states(self) -> FrozenSet[_State]:
+        return frozenset((i, 0) for i in range(len(self._selectors)))
+
+    def enter(self, states: FrozenSet[_State], name: str, attrs: Dict[str, str]) -> Tuple[FrozenSet[_State], List[int]]:
+        """Match an opened element against the states of its parent.
+
+        Returns (states for the element's children, indexes of the selectors the
+        element completes).
+        """
+        next_states = set()
+        matched = []
+        for index, position in states:
+            steps = self._selectors[index]
+            step = steps[position]
+            if step.axis == "//":
+                # a descendant step may still match deeper down
+                next_states.add((index, position))
+            if step.matches(name, attrs):
+                if position + 1 == len(steps):
+                    matched.append(index)
+                else:
+                    next_states.add((index, position + 1))
+        return frozenset(next_states), matched
+
+    def classify(self, matched: Iterable[int]) -> Tuple[bool, bool, List[str]]:
+        """Split completed selector indexes into (included, excluded, attribute names to harvest)."""
+        n_include = len(self.include)
+        n_exclude = len(self.exclude)
+        included = excluded = False
+        attributes = []
+        for index in matched:
+            if index < n_include:
+                included = True
+            elif index < n_include + n_exclude:
+                excluded = True
+            else:
+                attributes.append(self._attribute_names[index - n_include - n_exclude])
+        return included, excluded, attributes
+
+
+def xml_selection(
+    include: Sequence[str] | None = None,
+    exclude: Sequence[str] | None = None,
+    attributes: Sequence[str] | None = None,
+) -> XmlSelection | None:
+    """Build a selection from optional selector lists; None when nothing is selected."""
+    selection = XmlSelection(tuple(include or ()), tuple(exclude or ()), tuple(attributes or ()))
+    return selection if selection.active else None
+
+
+__all__ = ["Step", "parse_selector", "parse_attribute_selector", "XmlSelection", "xml_selection"]
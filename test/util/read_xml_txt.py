@@ -7,7 +7,7 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from source.util.read_xml_txt import read_xml_texts_from_string
+from source.util.read_xml_txt import iter_xml_texts_from_chunks, read_xml_texts, read_xml_texts_from_string
 
 
 class TestReadXmlLeftTxt(unittest.TestCase):
@@ -65,6 +65,38 @@ class TestReadXmlLeftTxt(unittest.TestCase):
         texts = read_xml_texts_from_string(xml_content)
         # Fallback should still extract the visible text chunks in order
         self.assertEqual(texts, ["hello & world", "more & things"])
+        self.assertEqual(read_xml_texts(path), ["hello & world", "more & things"])
+
+    def test_entities_comments_and_declarations(self):
+        xml = (
+            '<?xml version="1.0"?><!DOCTYPE r [<!ELEMENT r ANY>]>'
+            '<r a="x>y">one &amp; two &#26753;<!-- note --> more<b/>tail<?pi x?></r>'
+        )
+        self.assertEqual(read_xml_texts_from_string(xml), ["one & two 梁 more", "tail"])
+
+    def test_chunk_boundaries_do_not_change_result(self):
+        xml = '<r>a &lt; b<![CDATA[<c>]]><!-- x --><d k="v">梁</d>tail & more</r>'
+        expected = read_xml_texts_from_string(xml)
+        for size in (1, 2, 3, 5, 8):
+            chunks = [xml[i:i + size] for i in range(0, len(xml), size)]
+            self.assertEqual(list(iter_xml_texts_from_chunks(chunks)), expected)
+
+    def test_deeply_nested(self):
+        depth = 50000
+        xml = "<a>" * depth + "deep" + "</a>" * depth
+        self.assertEqual(read_xml_texts_from_string(xml), ["deep"])
+
+    def test_stray_markup_recovered_in_place(self):
+        xml = "<r>a < b <c>x</c> 1<2 \x01z <unterminated</r>"
+        self.assertEqual(read_xml_texts_from_string(xml), ["a < b", "x", "1<2 z <unterminated"])
+
+    def test_declared_encoding(self):
+        import tempfile, os
+        p = tempfile.TemporaryDirectory()
+        path = os.path.join(p.name, "big5.xml")
+        with open(path, "wb") as f:
+            f.write('<?xml version="1.0" encoding="big5"?><root>夜晚</root>'.encode("big5"))
+        self.assertEqual(read_xml_texts(path), ["夜晚"])
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from contextlib import redirect_stdout
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.archive_inputs import input_exists, input_stat, open_input_text, relative_input_path, split_member_path
+from source.util.extract_cache import ExtractCache
+from source.util.scan_corpus import discover_files, scan_files
+
+MEMBERS = {
+    "locale/zh/strings.xml": "<r><s>中文</s><s>字</s></r>",
+    "locale/zh/notes.txt": "英文",
+    "build/debug.txt": "垃圾",
+    "data.json": '{"key": "值"}',
+    "image.png": "not text",
+}
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text.encode("utf-8"))
+
+
+def write_tar(path, members):
+    with tarfile.open(path, "w:gz") as tf:
+        for name, text in members.items():
+            data = text.encode("utf-8")
+            info = tarfile.TarInfo("./" + name)
+            info.size = len(data)
+            info.mtime = 1700000000
+            tf.addfile(info, io.BytesIO(data))
+
+
+class TestArchiveInputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.text = os.path.join(self.tmp.name, "text")
+        os.makedirs(self.text)
+        with open(os.path.join(self.text, "top.txt"), "w", encoding="utf-8") as f:
+            f.write("頂")
+        write_zip(os.path.join(self.text, "drop.zip"), MEMBERS)
+        write_tar(os.path.join(self.text, "drop.tar.gz"), MEMBERS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_paths(self):
+        self.assertEqual(split_member_path("a/b.tar.gz!/c!/d.txt"), ("a/b.tar.gz", "c!/d.txt"))
+        self.assertEqual(split_member_path("a/wow!/d.txt"), ("a/wow!/d.txt", None))
+        member = os.path.join(self.text, "drop.zip") + "!/locale/zh/notes.txt"
+        self.assertEqual(relative_input_path(member, self.text), "drop.zip/locale/zh/notes.txt")
+        self.assertEqual(relative_input_path(member, os.path.join(self.text, "drop.zip")), "locale/zh/notes.txt")
+        self.assertEqual(input_stat(member)[0], len("英文".encode("utf-8")))
+        with open_input_text(member) as f:
+            self.assertEqual(f.read(), "英文")
+        self.assertFalse(input_exists(member + ".missing"))
+
+    def test_discover_in_archive_order_with_filters(self):
+        files = discover_files(self.text, exclude=["build"])
+        rel = [relative_input_path(f, self.text) for f in files]
+        self.assertEqual(rel, [
+            "drop.tar.gz/locale/zh/strings.xml",
+            "drop.tar.gz/locale/zh/notes.txt",
+            "drop.tar.gz/data.json",
+            "drop.zip/locale/zh/strings.xml",
+            "drop.zip/locale/zh/notes.txt",
+            "drop.zip/data.json",
+            "top.txt",
+        ])
+        archive = os.path.join(self.text, "drop.tar.gz")
+        self.assertEqual(
+            [relative_input_path(f, archive) for f in discover_files(archive, include=["locale/*"])],
+            ["locale/zh/strings.xml", "locale/zh/notes.txt"],
+        )
+
+    def test_scan_matches_unpacked_files_and_uses_cache(self):
+        files = discover_files(self.text)
+        expected = "".join(sorted("中文字英垃圾值頂"))
+        for jobs in (1, 2):
+            self.assertEqual(scan_files(files, jobs, verbose=False).to_string(), expected)
+
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        cache = ExtractCache(manifest, {})
+        scan_files(files, cache=cache, verbose=False)
+        cache.save()
+        cache = ExtractCache(manifest, {})
+        scan_files(files, cache=cache, verbose=False)
+        self.assertEqual(cache.hits, len(files))
+
+        # a new archive with one changed member: only that member is rescanned
+        write_zip(os.path.join(self.text, "drop.zip"), dict(MEMBERS, **{"data.json": '{"key": "新"}'}))
+        cache = ExtractCache(manifest, {})
+        chars = scan_files(files, cache=cache, verbose=False)
+        self.assertEqual(cache.misses, 1)
+        self.assertIn("新", chars.to_string())
+
+    def test_unreadable_archive_is_skipped(self):
+        with open(os.path.join(self.text, "broken.zip"), "wb") as f:
+            f.write(b"not a zip")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            files = discover_files(self.text)
+        self.assertIn("broken.zip", out.getvalue())
+        self.assertEqual(len(files), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
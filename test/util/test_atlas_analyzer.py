@@ -0,0 +1,81 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.atlas_analyzer import SizeBudget, analyze_atlas, auto_size, read_png_header, size_candidates
+from source.util.char_policy import CharPolicy
+from source.util.fontgen import FontgenSettings, use_fontgen
+
+FAKE_FONTGEN = os.path.join(ROOT, "benchmark", "fake_fontgen.py")
+
+
+class TestAtlasAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.chunk = os.path.join(self.root, "chunk.txt")
+        with open(self.chunk, "w", encoding="utf-8") as f:
+            f.write("".join(chr(0x4E00 + i) for i in range(300)))
+        self.ttf = os.path.join(self.root, "Font.ttf")
+        with open(self.ttf, "wb") as f:
+            f.write(b"")
+        self.trials = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _generate(self, font_size, overrides):
+        self.trials += 1
+        folder = os.path.join(self.root, f"out{self.trials}")
+        settings = FontgenSettings(command=[sys.executable, FAKE_FONTGEN], quiet=True,
+                                   temp_folder=os.path.join(self.root, "temp"), config_overrides=overrides)
+        ok = use_fontgen(self.chunk, self.ttf, font_size=font_size, custom_fnt_output_folder=folder, use_build_cache=False,
+                         policy=CharPolicy(always_include=[]), settings=settings)
+        return os.path.join(folder, "Font.fnt") if ok else None
+
+    def test_png_header(self):
+        path = os.path.join(self.root, "image.png")
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 640, 480, 8, 2, 0, 0, 0) + b"crc!")
+        png = read_png_header(path)
+        self.assertEqual((png.width, png.height, png.channels, png.texture_bytes), (640, 480, 3, 640 * 480 * 3))
+        with open(path, "wb") as f:
+            f.write(b"GIF89a" + bytes(40))
+        with self.assertRaises(ValueError):
+            read_png_header(path)
+
+    def test_analyze_atlas(self):
+        # 23 + dfSize 6 = 29 px cells, 1 px spacing: 17 x 17 = 289 glyphs per 512 px page
+        report = analyze_atlas(self._generate(23, {"packer": {"size": 512}}))
+        self.assertEqual(report.glyphs, 300)
+        self.assertEqual(report.page_count, 2)
+        self.assertEqual([p.glyphs for p in report.pages], [289, 11])
+        self.assertEqual(report.texture_bytes, 2 * 512 * 512 * 4)
+        self.assertAlmostEqual(report.pages[0].fill_ratio, 289 * 29 * 29 / (512 * 512))
+        self.assertAlmostEqual(report.fill_ratio, 300 * 29 * 29 / (2 * 512 * 512))
+        self.assertEqual(report.to_dict()["page_count"], 2)
+
+    def test_auto_size_finds_largest_fitting_font_size(self):
+        candidates = size_candidates([512], [1, 0])
+        self.assertEqual(candidates[1], {"packer": {"size": 512}, "spacing": {"x": 0, "y": 0}})
+
+        best, trials = auto_size(self._generate, SizeBudget(max_pages=1), 40, 8, candidates)
+        # one 512 px page fits 300 glyphs when 18 x 18 cells fit: size + dfSize 6 + spacing <= 28
+        self.assertEqual(best.font_size, 22)
+        self.assertEqual(best.overrides["spacing"], {"x": 0, "y": 0})
+        self.assertEqual(best.report.page_count, 1)
+        self.assertTrue(all(t.fits == (t.report.page_count <= 1) for t in trials))
+
+        best, _ = auto_size(self._generate, SizeBudget(max_texture_bytes=1024), 30, 20)
+        self.assertIsNone(best)
+
+
+if __name__ == "__main__":
+    unittest.main()
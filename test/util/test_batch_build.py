@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.batch_build import glob_batch_jobs, load_batch_file, run_batch
+
+
+class TestBatchBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ("A.ttf", "B.ttf", "notes.txt"):
+            open(os.path.join(self.tmp.name, name), "wb").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_glob_jobs(self):
+        jobs = glob_batch_jobs(self.tmp.name, "*.ttf", [16, 32])
+        self.assertEqual([(os.path.basename(j.ttf_file), j.font_size, j.output_name) for j in jobs], [
+            ("A.ttf", 16, "A_16"), ("A.ttf", 32, "A_32"), ("B.ttf", 16, "B_16"), ("B.ttf", 32, "B_32"),
+        ])
+
+    def test_load_job_file(self):
+        path = os.path.join(self.tmp.name, "jobs.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"ttf": "A", "font_size": 20, "output_name": "a_small"}, {"ttf": "B.ttf"}], f)
+        jobs = load_batch_file(path, self.tmp.name, default_font_size=23)
+        self.assertEqual([(j.font_size, j.output_name) for j in jobs], [(20, "a_small"), (23, "B_23")])
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"jobs": [{"ttf": "missing"}]}, f)
+        with self.assertRaises(ValueError):
+            load_batch_file(path, self.tmp.name)
+
+    def test_duplicate_output_names_are_rejected(self):
+        path = os.path.join(self.tmp.name, "jobs.json")
+        # an explicit name equal to another job's default <ttf>_<size>
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"ttf": "A", "font_size": 20, "output_name": "B_23"}, {"ttf": "B.ttf"}], f)
+        with self.assertRaises(ValueError) as raised:
+            load_batch_file(path, self.tmp.name, default_font_size=23)
+        self.assertIn("B_23", str(raised.exception))
+        with self.assertRaises(ValueError):
+            glob_batch_jobs(self.tmp.name, "*.ttf", [16, 16])
+
+    def test_run_batch_bounded_and_isolated(self):
+        jobs = glob_batch_jobs(self.tmp.name, "*.ttf", [1, 2, 3])
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def build_one(job):
+            with lock:
+                running.append(job)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(job)
+            if job.output_name == "B_2":
+                raise RuntimeError("boom")
+            return True
+
+        results = run_batch(jobs, build_one, workers=2)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual([r.job for r in results], jobs)
+        self.assertEqual([r.ok for r in results], [True, True, True, True, False, True])
+        self.assertIn("boom", results[4].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
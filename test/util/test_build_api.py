@@ -0,0 +1,132 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util import fontgen, profiler
+from source.util.build_api import build
+from source.util.fnt_file import read_fnt
+
+FAKE_FONTGEN = os.path.join(ROOT, "benchmark", "fake_fontgen.py")
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.cwd = os.getcwd()
+        # builds must not write anything relative to the cwd
+        self.cwd_tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.cwd_tmp.name)
+
+        self.ttf = os.path.join(self.root, "Font.ttf")
+        with open(self.ttf, "wb") as f:
+            f.write(b"")
+        self.temp = os.path.join(self.root, "temp")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.cwd_tmp.cleanup()
+        self.tmp.cleanup()
+
+    def _texts(self, name, text):
+        folder = os.path.join(self.root, name)
+        os.makedirs(os.path.join(folder, "sub"))
+        with open(os.path.join(folder, "sub", "a.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        return folder
+
+    def _build(self, name, text, **kwargs):
+        kwargs.setdefault("output_name", name)
+        kwargs.setdefault("fontgen", [sys.executable, FAKE_FONTGEN])
+        return build(
+            self._texts(name, text),
+            self.ttf,
+            os.path.join(self.root, "out"),
+            coverage_filter=False,
+            temp_folder=self.temp,
+            **kwargs,
+        )
+
+    def test_build_result(self):
+        result = self._build("one", "梁靜茹 abc\n")
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(result.fnt_file, os.path.join(self.root, "out", "one.fnt"))
+        self.assertEqual(len(result.input_files), 1)
+        # ASCII and whitespace are handled by the policy, not the chunk file
+        self.assertEqual(result.accepted_count, 3)
+        self.assertTrue(all(os.path.exists(p) for p in result.page_files))
+        self.assertEqual(set(result.stages), {"discovery", "extraction", "split", "save", "fontgen"})
+        self.assertEqual([r["returncode"] for r in result.fontgen_runs], [0])
+        self.assertIn(ord("靜"), read_fnt(result.fnt_file).char_ids())
+
+        self.assertEqual(os.listdir(self.temp), [])
+        self.assertEqual(os.listdir(self.cwd_tmp.name), [])
+
+    def test_concurrent_builds_do_not_interfere(self):
+        texts = {f"lang{i}": chr(0x4E00 + i) * 3 + "xyz" for i in range(6)}
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = dict(zip(texts, pool.map(lambda item: self._build(*item), texts.items())))
+
+        for name, result in results.items():
+            self.assertTrue(result.ok, result.error)
+            ids = read_fnt(result.fnt_file).char_ids()
+            own = ord(texts[name][0])
+            self.assertIn(own, ids)
+            others = {ord(t[0]) for t in texts.values()} - {own}
+            self.assertFalse(others & set(ids), name)
+        self.assertEqual(os.listdir(self.cwd_tmp.name), [])
+        # the CLI configuration is left alone
+        self.assertIsNone(fontgen.fontgen_command)
+        self.assertIsNone(profiler.active)
+
+    def test_shared_build_cache(self):
+        cache = os.path.join(self.root, "cache")
+        first = self._build("a", "abc", build_cache_folder=cache)
+        second = self._build("b", "abc", build_cache_folder=cache, output_name="a2")
+        self.assertTrue(first.ok and second.ok)
+        self.assertEqual(len(first.fontgen_runs), 1)
+        self.assertEqual(len(os.listdir(cache)), 2)  # different output names, different keys
+
+    def test_fontgen_failure_is_reported(self):
+        result = self._build("bad", "abc", keep_work_folder=True, fontgen=[sys.executable, "-c", "import sys; sys.exit(3)"])
+        self.assertFalse(result.ok)
+        self.assertIn("exit code 3", result.error)
+        self.assertTrue(os.path.isdir(result.work_folder))
+
+    def test_invalid_arguments_raise(self):
+        with self.assertRaises(ValueError):
+            build(os.path.join(self.root, "missing"), self.ttf, self.root)
+        with self.assertRaises(ValueError):
+            build(self._texts("t", "abc"), os.path.join(self.root, "missing.ttf"), self.root)
+        empty = os.path.join(self.root, "empty")
+        os.makedirs(empty)
+        with self.assertRaises(ValueError):
+            build(empty, self.ttf, self.root)
+
+    def test_fontgen_is_never_looked_up_in_the_cwd(self):
+        texts = self._texts("t", "abc")
+        env = {k: v for k, v in os.environ.items() if k != "TXT2FNT_FONTGEN"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            with self.assertRaises(ValueError):
+                build(texts, self.ttf, self.root, temp_folder=self.temp)
+            with self.assertRaises(ValueError):
+                build(texts, self.ttf, self.root, temp_folder=self.temp, fontgen_folder=os.path.join(self.root, "tools"))
+        self.assertEqual(os.listdir(self.cwd_tmp.name), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "tools")))
+
+        with mock.patch.dict(os.environ, {"TXT2FNT_FONTGEN": FAKE_FONTGEN}):
+            result = build(texts, self.ttf, os.path.join(self.root, "out"), coverage_filter=False, temp_folder=self.temp)
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(os.listdir(self.cwd_tmp.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
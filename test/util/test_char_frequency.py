@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.char_frequency import FrequencyTiers, order_by_frequency, parse_thresholds, write_frequency_table
+from source.util.char_policy import CharPolicy
+from source.util.extract_cache import ExtractCache
+from source.util.fnt_file import read_fnt
+from source.util.fontgen import FontgenSettings, use_fontgen
+from source.util.scan_corpus import scan_files
+
+FAKE_FONTGEN = os.path.join(ROOT, "benchmark", "fake_fontgen.py")
+
+
+class TestFrequencyTiers(unittest.TestCase):
+    def test_parse_thresholds(self):
+        self.assertEqual(parse_thresholds("0.9,0.99"), [0.9, 0.99])
+        self.assertEqual(parse_thresholds("50, 90"), [0.5, 0.9])
+        for bad in ("", "0.9,0.5", "0", "1.0,abc"):
+            with self.assertRaises(ValueError):
+                parse_thresholds(bad)
+
+    def test_order_by_frequency(self):
+        counts = Counter("cccbba")
+        self.assertEqual(order_by_frequency("abcd", counts), ["c", "b", "a", "d"])
+
+    def test_split_by_cumulative_share(self):
+        counts = Counter({"的": 60, "是": 30, "一": 6, "龘": 3, "鬱": 1})
+        tiers = FrequencyTiers(counts, [0.9, 0.99])
+        self.assertEqual(tiers.split("龘鬱是一的"), ["的是", "一龘", "鬱"])
+        # shares are relative to the characters given
+        self.assertEqual(tiers.split("一龘鬱"), ["一龘", "鬱"])
+        self.assertEqual(FrequencyTiers(Counter(), [0.5]).split("ba"), ["ab"])
+        self.assertEqual(tiers.split(""), [])
+
+    def test_write_frequency_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "freq.tsv")
+            write_frequency_table(Counter("aab"), ["b", "a"], path)
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        self.assertEqual(lines[1], "1\tU+0061\ta\t2\t0.666667")
+        self.assertEqual(lines[2], "2\tU+0062\tb\t1\t1.000000")
+
+
+class TestFrequencyScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i, text in enumerate(["天天天地", "天地人", '{"k": "人人人"}']):
+            path = os.path.join(self.tmp.name, f"f{i}.{'json' if i == 2 else 'txt'}")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_counts_match_serial_parallel_and_cache(self):
+        expected = Counter({"天": 4, "人": 4, "地": 2})
+        for jobs in (1, 2):
+            counts = Counter()
+            chars = scan_files(self.files, jobs, verbose=False, frequencies=counts)
+            self.assertEqual(counts, expected)
+            self.assertEqual(chars.to_string(), "人地天")
+
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        cache = ExtractCache(manifest, {})
+        scan_files(self.files, cache=cache, verbose=False)
+        cache.save()
+        # entries written without counts are rescanned when frequencies are needed
+        cache = ExtractCache(manifest, {})
+        counts = Counter()
+        scan_files(self.files, cache=cache, verbose=False, frequencies=counts)
+        self.assertEqual((cache.hits, counts), (0, expected))
+        cache.save()
+
+        cache = ExtractCache(manifest, {})
+        counts = Counter()
+        scan_files(self.files, cache=cache, verbose=False, frequencies=counts)
+        self.assertEqual((cache.hits, counts), (3, expected))
+
+
+class TestTieredFontgen(unittest.TestCase):
+    def test_hot_tier_is_page_zero(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunk = os.path.join(tmp, "chunk.txt")
+            with open(chunk, "w", encoding="utf-8") as f:
+                f.write("龘的是")
+            ttf = os.path.join(tmp, "Font.ttf")
+            with open(ttf, "wb") as f:
+                f.write(b"")
+            settings = FontgenSettings(command=[sys.executable, FAKE_FONTGEN], quiet=True, temp_folder=os.path.join(tmp, "temp"))
+            tiers = FrequencyTiers(Counter({"的": 90, "是": 9, "龘": 1}), [0.9])
+
+            ok = use_fontgen(chunk, ttf, custom_fnt_output_folder=os.path.join(tmp, "out"), use_build_cache=False,
+                             policy=CharPolicy(always_include=["0"]), settings=settings, tiers=tiers)
+            self.assertTrue(ok)
+            font = read_fnt(os.path.join(tmp, "out", "Font.fnt"))
+            pages = {chr(int(c["id"])): c["page"] for c in font.chars}
+            self.assertEqual(pages, {"的": "0", "0": "0", "是": "1", "龘": "1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.char_policy import ACCEPT, ALWAYS_INCLUDE, SKIP, CharPolicy, load_char_policy
+from source.util.extract_char_set import split_char_set
+from source.util.fontgen import create_fontgen_config_json
+
+
+class TestCharPolicy(unittest.TestCase):
+    def test_split_matches_previous_regex_for_ascii(self):
+        # the regex split_char_set used before the table existed
+        regex_ignore = r"[©\t\nA-Za-z0-9 `~!@#$%^&*\(\)-_=+\[\{\]\}\\|;:'\",<.>/?｀～！＠＃＄％＾＆＊（）－＿＝＋［］｛｝＼｜；：＇＂，＜．＞／？｢｣《》｟｠“”･·。｡､、…—]+"
+        chars = {chr(cp) for cp in range(0x20, 0x7F)} | set("梁靜《》…©")
+        accepted, ignored = split_char_set(chars)
+        self.assertEqual(accepted, ["梁", "靜"])
+        self.assertEqual(ignored, sorted(c for c in chars if re.match(regex_ignore, c)))
+
+    def test_skip_and_always_include(self):
+        accepted, ignored = split_char_set({"\t", "\n", "Ａ", "夜"})
+        self.assertEqual(accepted, ["夜"])
+        self.assertEqual(ignored, ["Ａ"])
+
+    def test_fontgen_charset_uses_same_policy(self):
+        policy = CharPolicy(skip="\n", always_include=["abc"], always_include_ranges=[(0x3041, 0x3043)])
+        config = create_fontgen_config_json("chunk.txt", "font.ttf", "out", policy=policy)
+        self.assertEqual(config["charset"], ["chunk.txt", "abc", "ぁあぃ"])
+        self.assertEqual(policy.classify("あ"), ALWAYS_INCLUDE)
+        self.assertEqual(policy.classify("\n"), SKIP)
+        self.assertEqual(policy.classify("d"), ACCEPT)
+
+    def test_load_policy_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "policy.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"always_include": ["0123456789"], "always_include_ranges": [["U+30A1", "0x30A2"]]}, f)
+            policy = load_char_policy(path)
+
+        accepted, ignored = policy.split({"1", "a", "ァ", "ア", "\t"})
+        self.assertEqual(accepted, ["a"])
+        self.assertEqual(ignored, ["1", "ァ", "ア"])
+
+
+if __name__ == "__main__":
+    unittest.main()
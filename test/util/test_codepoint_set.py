@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.codepoint_set import CodepointSet
+
+
+class TestCodepointSet(unittest.TestCase):
+    def test_update_iterates_in_codepoint_order(self):
+        chars = CodepointSet()
+        chars.update("梁靜茹 abc梁😀\n")
+        self.assertEqual(chars.to_string(), "\n abc梁茹靜😀")
+        self.assertEqual(len(chars), 9)
+        self.assertIn("梁", chars)
+        self.assertIn(ord("a"), chars)
+        self.assertNotIn("z", chars)
+        self.assertNotIn("ab", chars)
+        self.assertEqual(chars, set("梁靜茹 abc😀\n"))
+
+    def test_set_algebra(self):
+        a = CodepointSet("abc梁")
+        b = CodepointSet("cd😀")
+        self.assertEqual((a | b).to_string(), "abcd梁😀")
+        self.assertEqual((a - b).to_string(), "ab梁")
+        self.assertEqual((a & b).to_string(), "c")
+
+        a |= b
+        self.assertEqual(a.to_string(), "abcd梁😀")
+        a -= CodepointSet("😀a")
+        self.assertEqual(a.to_string(), "bcd梁")
+        self.assertFalse(CodepointSet("a") - CodepointSet("a"))
+
+    def test_out_of_range_codepoints_are_reported(self):
+        chars = CodepointSet()
+        with self.assertRaisesRegex(ValueError, "-0x2"):
+            chars.update_codepoints([0x41, -2])
+        with self.assertRaisesRegex(ValueError, "0x110000"):
+            chars.update_codepoints([0x110000, 0x41])
+        self.assertFalse(chars)
+
+    def test_serialization_round_trip(self):
+        chars = CodepointSet(chr(cp) for cp in range(0x4E00, 0x9FFF, 3))
+        data = chars.to_bytes()
+        self.assertLess(len(data), len(chars))
+        self.assertEqual(CodepointSet.from_bytes(data), chars)
+        self.assertEqual(CodepointSet.from_base64(chars.to_base64()), chars)
+        self.assertEqual(CodepointSet.from_bytes(CodepointSet().to_bytes()).to_string(), "")
+        with self.assertRaises(ValueError):
+            CodepointSet.from_bytes(b"nope")
+
+
+if __name__ == "__main__":
+    unittest.main()
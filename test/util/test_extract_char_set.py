@@ -7,7 +7,7 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from source.util.extract_char_set import update_xml_file, update_text_file
+from source.util.extract_char_set import iter_text_chunks, update_xml_file, update_text_file
 
 
 class TestExtractCharSet(unittest.TestCase):
@@ -37,6 +37,24 @@ class TestExtractCharSet(unittest.TestCase):
         self.assertIn("梁", result)
         self.assertIn("a", result)
 
+    def test_update_text_file_streams_across_multibyte_boundaries(self):
+        import tempfile, os
+        p = tempfile.TemporaryDirectory()
+        path = os.path.join(p.name, "single_line.txt")
+        content = "梁a靜b謐" * 50
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+        for chunk_size in (1, 2, 3, 7, 1024):
+            chunks = list(iter_text_chunks(path, chunk_size))
+            self.assertEqual("".join(chunks), content)
+            self.assertTrue(all(len(c) <= chunk_size for c in chunks))
+            self.assertEqual(update_text_file(path, set(), chunk_size), set(content))
+
+    def test_iter_text_chunks_rejects_non_positive_size(self):
+        with self.assertRaises(ValueError):
+            list(iter_text_chunks("doesnotmatter.txt", 0))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.extractors import extract_csv, extract_json, extract_po, extract_xliff, get_extractor
+
+
+class TestExtractors(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_json_yields_values_not_keys(self):
+        path = self._write("a.json", '﻿{"title_key": "標題", "list": ["一", {"k": "二\\n"}], "n": 3, "鍵": "值"}')
+        for chunk_size in (1, 3, 1024):
+            self.assertEqual(list(extract_json(path, chunk_size)), ["標題", "一", "二\n", "值"])
+
+    def test_csv_skips_header_and_key_columns(self):
+        path = self._write("a.csv", 'id,en,zh\nmenu.start,Start,開始\nmenu.quit,"Quit, now",離開\n')
+        self.assertEqual(list(extract_csv(path)), ["Start", "開始", "Quit, now", "離開"])
+
+    def test_po_uses_msgstr_and_falls_back_to_msgid(self):
+        path = self._write("a.po", "\n".join([
+            'msgid ""',
+            'msgstr "Content-Type: text/plain; charset=UTF-8\\n"',
+            "",
+            "#: main.c:1",
+            'msgctxt "menu"',
+            'msgid "Start"',
+            'msgstr "開"',
+            '"始"',
+            "",
+            'msgid "Untranslated"',
+            'msgstr ""',
+            "",
+            'msgid "apple"',
+            'msgid_plural "apples"',
+            'msgstr[0] "蘋果"',
+            'msgstr[1] "蘋果們"',
+        ]))
+        self.assertEqual(list(extract_po(path)), ["開始", "Untranslated", "蘋果", "蘋果們"])
+
+    def test_xliff_prefers_targets_and_skips_code(self):
+        path = self._write("a.xlf", """<?xml version="1.0"?>
+<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">
+  <file source-language="en" target-language="zh">
+    <body>
+      <trans-unit id="a">
+        <source>Hello <ph id="1">{name}</ph></source>
+        <target>你好 <ph id="1">{name}</ph>！</target>
+        <note>greeting shown on start</note>
+      </trans-unit>
+      <trans-unit id="b"><source>Only source</source></trans-unit>
+    </body>
+  </file>
+</xliff>""")
+        texts = list(extract_xliff(path, 16))
+        self.assertEqual(texts, ["你好 ！", "Only source"])
+
+    def test_get_extractor(self):
+        self.assertIsNotNone(get_extractor("dir/strings.JSON"))
+        self.assertIsNone(get_extractor("notes.md"))
+        self.assertIsNot(get_extractor("a.xml", treat_xml_as_text=True), get_extractor("a.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
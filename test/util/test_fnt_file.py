@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.fnt_file import BMFont, font_values, merge_fonts, parse_binary, to_binary, unrepresentable
+from source.util.fontgen_shard import split_into_shards
+
+
+def make_fnt(chars, pages=1, scale=256):
+    lines = [
+        'info face="Test Font" size=23 bold=0 italic=0 charset="" unicode=1 padding=0,0,0,0 spacing=1,1',
+        f"common lineHeight=27 base=21 scaleW={scale} scaleH={scale} pages={pages} packed=0",
+    ]
+    lines += [f'page id={i} file="shard_{i}.png"' for i in range(pages)]
+    lines.append(f"chars count={len(chars)}")
+    for i, c in enumerate(chars):
+        lines.append(f"char id={ord(c)} x={i * 20} y=0 width=20 height=21 xoffset=1 yoffset=2 xadvance=23 page={i % pages} chnl=15")
+    return "\n".join(lines) + "\n"
+
+
+class TestFntFile(unittest.TestCase):
+    def test_round_trip(self):
+        text = make_fnt("梁靜夜", pages=2)
+        font = BMFont.parse(text)
+        self.assertEqual(font.info["face"], '"Test Font"')
+        self.assertEqual(font.pages, {0: "shard_0.png", 1: "shard_1.png"})
+        self.assertEqual(font.char_ids(), [ord(c) for c in "梁靜夜"])
+        self.assertEqual(font.to_text(), text)
+
+    def test_merge_remaps_pages(self):
+        a = BMFont.parse(make_fnt("梁靜", pages=2, scale=256))
+        b = BMFont.parse(make_fnt("靜夜", pages=1, scale=512))
+        b.kernings.append({"first": str(ord("靜")), "second": str(ord("夜")), "amount": "-1"})
+
+        merged = merge_fonts([a, b], [["out_0.png", "out_1.png"], ["out_2.png"]])
+        self.assertEqual(merged.pages, {0: "out_0.png", 1: "out_1.png", 2: "out_2.png"})
+        self.assertEqual(merged.char_ids(), [ord("梁"), ord("靜"), ord("夜")])
+        self.assertEqual([c["page"] for c in merged.chars], ["0", "1", "2"])
+        self.assertEqual(merged.common["scaleW"], "512")
+        self.assertEqual(merged.common["lineHeight"], "27")
+        self.assertEqual(len(merged.kernings), 1)
+
+        text = merged.to_text()
+        self.assertIn("common lineHeight=27 base=21 scaleW=512 scaleH=512 pages=3 packed=0", text)
+        self.assertIn("chars count=3", text)
+        self.assertIn("kernings count=1", text)
+
+    def test_binary_round_trip(self):
+        font = BMFont.parse(make_fnt("梁靜夜", pages=2))
+        font.kernings.append({"first": str(ord("梁")), "second": str(ord("靜")), "amount": "-2"})
+        data = to_binary(font)
+        self.assertTrue(data.startswith(b"BMF\x03"))
+        # header, 5 blocks: info (14 + name), common (15), pages, chars (20 each), kerning (10 each)
+        self.assertEqual(len(data), 4 + 5 * 5 + 14 + len("Test Font") + 1 + 15 + 2 * len("shard_0.png\0") + 3 * 20 + 10)
+
+        decoded = parse_binary(data)
+        self.assertEqual(font_values(decoded), font_values(font))
+        self.assertEqual(decoded.pages, font.pages)
+        self.assertEqual(decoded.chars[0]["xoffset"], "1")
+        self.assertEqual(decoded.info["unicode"], "1")
+        self.assertEqual(to_binary(decoded), data)
+
+    def test_binary_format_limits(self):
+        font = BMFont.parse(make_fnt("梁") + "distanceField fieldType=msdf distanceRange=6\n")
+        self.assertEqual(unrepresentable(font), ["line 'distanceField'"])
+        font.chars[0]["x"] = "70000"
+        with self.assertRaises(ValueError):
+            to_binary(font)
+        with self.assertRaises(ValueError):
+            parse_binary(b"info face=")
+
+    def test_split_into_shards(self):
+        self.assertEqual(split_into_shards("abcdefg", 3), ["abc", "de", "fg"])
+        self.assertEqual(split_into_shards("ab", 5), ["a", "b"])
+        self.assertEqual(split_into_shards("", 4), [""])
+
+
+if __name__ == "__main__":
+    unittest.main()
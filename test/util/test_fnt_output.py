@@ -0,0 +1,108 @@
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.fnt_file import font_values, read_fnt, read_fnt_binary
+from source.util.fnt_output import binary_fnt_path, check_font_outputs, export_font, json_index_path
+from source.util import png_image
+from source.util.png_image import PngImage, encode_png, optimize_png, optimize_png_file, read_png, same_png_pixels
+
+
+FNT = """info face="Test Font" size=23 bold=0 italic=0 charset="" unicode=1 stretchH=100 smooth=1 aa=1 padding=0,0,0,0 spacing=1,1
+common lineHeight=27 base=21 scaleW=64 scaleH=64 pages=1 packed=0
+page id=0 file="atlas_0.png"
+chars count=2
+char id=26753 x=0 y=0 width=20 height=21 xoffset=1 yoffset=-2 xadvance=23 page=0 chnl=15
+char id=38748 x=21 y=0 width=20 height=21 xoffset=0 yoffset=2 xadvance=23 page=0 chnl=15
+kernings count=1
+kerning first=26753 second=38748 amount=-1
+"""
+
+
+def _with_text_chunk(png: bytes) -> bytes:
+    body = b"Software\x00an image editor"
+    chunk = struct.pack(">I", len(body)) + b"tEXt" + body + struct.pack(">I", zlib.crc32(b"tEXt" + body) & 0xFFFFFFFF)
+    # right after IHDR (8 byte signature + 25 byte IHDR chunk)
+    return png[:33] + chunk + png[33:]
+
+
+class TestFntOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_fnt = os.path.join(self.tmp.name, "atlas")
+        with open(self.output_fnt + ".fnt", "w", encoding="utf-8") as f:
+            f.write(FNT)
+        # a gradient page, stored uncompressed-ish (level 0) with a metadata chunk
+        pixels = bytearray()
+        for y in range(64):
+            for x in range(64):
+                pixels += bytes((x * 4, y * 4, (x ^ y) & 0xFF, 255))
+        self.page = PngImage(64, 64, 4, pixels)
+        self.page_file = os.path.join(self.tmp.name, "atlas_0.png")
+        with open(self.page_file, "wb") as f:
+            f.write(_with_text_chunk(encode_png(self.page, level=0)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_export_writes_equivalent_descriptors(self):
+        report = export_font(self.output_fnt, binary_fnt=True, json_index=True)
+        self.assertEqual(report.binary_file, binary_fnt_path(self.output_fnt))
+        self.assertEqual(report.warnings, [])
+        text = font_values(read_fnt(self.output_fnt + ".fnt"))
+        self.assertEqual(font_values(read_fnt_binary(report.binary_file)), text)
+        with open(json_index_path(self.output_fnt), encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(index["chars"][0], [26753, 0, 0, 20, 21, 1, -2, 23, 0, 15])
+        self.assertEqual(index["kernings"], [[26753, 38748, -1]])
+        self.assertEqual(check_font_outputs(self.output_fnt), [])
+
+    def test_checker_reports_differences(self):
+        export_font(self.output_fnt, binary_fnt=True, json_index=True)
+        with open(self.output_fnt + ".fnt", "w", encoding="utf-8") as f:
+            f.write(FNT.replace("xadvance=23 page=0 chnl=15\nkernings", "xadvance=24 page=0 chnl=15\nkernings"))
+        problems = check_font_outputs(self.output_fnt)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("chars[1]", problems[0])
+
+    def test_png_optimization_is_lossless(self):
+        before = os.path.getsize(self.page_file)
+        report = export_font(self.output_fnt, optimize_png=True)
+        self.assertEqual(report.pages_optimized, 1)
+        self.assertEqual(report.png_bytes_before, before)
+        self.assertLess(report.png_bytes_after, before)
+        self.assertEqual(read_png(self.page_file), self.page)
+        with open(self.page_file, "rb") as f:
+            data = f.read()
+        self.assertNotIn(b"tEXt", data)
+        # already optimal: returned unchanged
+        self.assertIs(optimize_png(data), data)
+
+    def test_png_optimization_decodes_each_image_once(self):
+        with mock.patch.object(png_image, "_unfilter", wraps=png_image._unfilter) as unfilter:
+            before, after = optimize_png_file(self.page_file)
+        self.assertLess(after, before)
+        # the original (re-filtering and check) and the re-encoded output
+        self.assertEqual(unfilter.call_count, 2)
+        self.assertEqual(read_png(self.page_file), self.page)
+
+    def test_same_png_pixels(self):
+        a = encode_png(self.page)
+        changed = PngImage(64, 64, 4, bytearray(self.page.pixels))
+        changed.pixels[5] ^= 1
+        self.assertTrue(same_png_pixels(a, encode_png(self.page, level=9)))
+        self.assertFalse(same_png_pixels(a, encode_png(changed)))
+
+
+if __name__ == "__main__":
+    unittest.main()
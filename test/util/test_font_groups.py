@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.font_groups import (
+    group_by_manifest,
+    group_by_top_folder,
+    group_chars,
+    group_output_names,
+    load_group_manifest,
+    safe_group_name,
+    split_core,
+)
+
+
+class TestFontGroups(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.join("texts")
+        self.files = [os.path.join(self.root, *p.split("/")) for p in ("intro.txt", "menu/ui.po", "story/ch1/a.txt", "story/ch2/b.txt")]
+
+    def test_group_by_top_folder(self):
+        groups = group_by_top_folder(self.files, self.root)
+        self.assertEqual(list(groups), ["menu", "root", "story"])
+        self.assertEqual(groups["story"], self.files[2:])
+        self.assertEqual(groups["root"], self.files[:1])
+
+    def test_group_by_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_file = os.path.join(tmp, "groups.json")
+            with open(manifest_file, "w", encoding="utf-8") as f:
+                json.dump({"ch1": ["story/ch1/*", "intro.txt"], "ui": "*.po"}, f)
+            manifest = load_group_manifest(manifest_file)
+
+            with open(manifest_file, "w", encoding="utf-8") as f:
+                json.dump({"bad": 3}, f)
+            with self.assertRaises(ValueError):
+                load_group_manifest(manifest_file)
+
+        groups = group_by_manifest(self.files, self.root, manifest)
+        self.assertEqual(groups, {"ch1": [self.files[0], self.files[2]], "ui": [self.files[1]]})
+
+    def test_core_split(self):
+        per_file = {self.files[0]: "天地人", self.files[1]: "天地", self.files[2]: "天玄"}
+        chars = group_chars({"a": self.files[:1], "b": self.files[1:2], "c": self.files[2:]}, per_file)
+        self.assertEqual(chars["a"].to_string(), "人地天")
+
+        core, rest = split_core({name: list(c) for name, c in chars.items()}, 2)
+        self.assertEqual(core, ["地", "天"])
+        self.assertEqual(rest, {"a": ["人"], "b": [], "c": ["玄"]})
+
+        core, rest = split_core({name: list(c) for name, c in chars.items()}, 3)
+        self.assertEqual(core, ["天"])
+        self.assertEqual(rest["b"], ["地"])
+
+    def test_safe_group_name(self):
+        self.assertEqual(safe_group_name("chapter 1/intro"), "chapter_1_intro")
+        self.assertEqual(safe_group_name("關卡"), "關卡")
+        self.assertEqual(safe_group_name("../"), "group")
+
+
+class TestGroupMode(unittest.TestCase):
+    """txt2fnt.py --groups end to end, with the fake fontgen."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = self.tmp.name
+        os.makedirs(os.path.join(self.cwd, "_tools_", "ttf"))
+        with open(os.path.join(self.cwd, "_tools_", "ttf", "F.ttf"), "wb") as f:
+            f.write(b"ttf")
+        self._write("menu/ui.txt", "梁靜")
+        self._write("ch1/a.txt", "梁茹")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, rel_path, text):
+        path = os.path.join(self.cwd, "workspace", "text", *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _run(self):
+        command = [
+            sys.executable, os.path.join(ROOT, "txt2fnt.py"), "-ttf", "F", "--groups", "folders", "--core-font",
+            "--no-coverage-filter", "--no-build-cache", "-q", "--fontgen", os.path.join(ROOT, "benchmark", "fake_fontgen.py"),
+        ]
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        return subprocess.run(command, cwd=self.cwd, capture_output=True, text=True, encoding="utf-8", env=env)
+
+    def _chars(self, output_name):
+        with open(os.path.join(self.cwd, "workspace", "fnt", output_name + ".fnt"), encoding="utf-8") as f:
+            return {int(line.split("id=")[1].split()[0]) for line in f if line.startswith("char ")}
+
+    def test_core_and_group_fonts(self):
+        result = self._run()
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn(ord("梁"), self._chars("F_core"))
+        self.assertEqual(self._chars("F_menu"), {ord("靜")})
+        self.assertEqual(self._chars("F_ch1"), {ord("茹")})
+        with open(os.path.join(self.cwd, "workspace", "fnt", "F_groups.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(index["core"]["fnt"], "F_core.fnt")
+        self.assertEqual(index["groups"]["menu"]["files"], ["menu/ui.txt"])
+
+    def test_colliding_output_names_are_rejected(self):
+        self._write("core/c.txt", "天")
+        result = self._run()
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("F_core", result.stdout)
+        self.assertFalse(os.path.exists(os.path.join(self.cwd, "workspace", "fnt", "F_core.fnt")))
+
+    def test_group_output_names(self):
+        self.assertEqual(group_output_names("F", ["ch 1", "menu"], True), {None: "F_core", "ch 1": "F_ch_1", "menu": "F_menu"})
+        with self.assertRaises(ValueError):
+            group_output_names("F", ["ch 1", "ch_1"], False)
+        with self.assertRaises(ValueError):
+            group_output_names("F", ["core"], True)
+        self.assertEqual(group_output_names("F", ["core"], False), {"core": "F_core"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util import fontgen
+from source.util.fnt_file import read_fnt
+from source.util.fontgen import (
+    create_fontgen_config_json,
+    fontgen_build_key,
+    restore_fontgen_output,
+    store_fontgen_output,
+)
+
+
+class TestFontgenBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.ttf = self._write("font.ttf", b"fake ttf bytes")
+        self.chunk = self._write("chunk.txt", "梁靜".encode("utf-8"))
+        self.exe = self._write("fontgen.exe", b"fake fontgen")
+        self.cache = os.path.join(self.root, "cache")
+        os.makedirs(os.path.join(self.root, "out"))
+        self.output_fnt = os.path.join(self.root, "out", "font")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _key(self, **kwargs):
+        config = create_fontgen_config_json(self.chunk, self.ttf, self.output_fnt, **kwargs)
+        return fontgen_build_key(config, self.exe)
+
+    def test_key_tracks_inputs(self):
+        key = self._key()
+        self.assertEqual(key, self._key())
+        self.assertNotEqual(key, self._key(font_size=32))
+
+        self._write("chunk.txt", "梁".encode("utf-8"))
+        chunk_key = self._key()
+        self.assertNotEqual(key, chunk_key)
+
+        self._write("font.ttf", b"other ttf bytes")
+        self.assertNotEqual(chunk_key, self._key())
+
+    def test_store_and_restore_round_trip(self):
+        key = self._key()
+        self.assertFalse(restore_fontgen_output(key, self.output_fnt, self.cache))
+
+        with open(self.output_fnt + ".fnt", "w", encoding="utf-8") as f:
+            f.write('info face="font" size=23\npage id=0 file="font.png"\n')
+        with open(self.output_fnt + ".png", "wb") as f:
+            f.write(b"png bytes")
+        self.assertTrue(store_fontgen_output(key, self.output_fnt, self.cache))
+
+        os.remove(self.output_fnt + ".fnt")
+        os.remove(self.output_fnt + ".png")
+        self.assertTrue(restore_fontgen_output(key, self.output_fnt, self.cache))
+        with open(self.output_fnt + ".png", "rb") as f:
+            self.assertEqual(f.read(), b"png bytes")
+
+
+class TestFakeFontgen(unittest.TestCase):
+    """Run `use_fontgen` end to end against benchmark/fake_fontgen.py."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        fontgen.fontgen_command = [sys.executable, os.path.join(ROOT, "benchmark", "fake_fontgen.py")]
+
+    def tearDown(self):
+        fontgen.fontgen_command = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_use_fontgen_with_fake_tool(self):
+        with open("chunk.txt", "w", encoding="utf-8") as f:
+            f.write("梁靜茹\nabc")
+        with open("Font.ttf", "wb") as f:
+            f.write(b"")
+
+        ok = fontgen.use_fontgen("chunk.txt", "Font.ttf", custom_fnt_output_folder="out", use_build_cache=False)
+        self.assertTrue(ok)
+
+        font = read_fnt(os.path.join("out", "Font.fnt"))
+        self.assertIn(ord("靜"), font.char_ids())
+        self.assertIn(ord("a"), font.char_ids())
+        with open(os.path.join("out", font.pages[0]), "rb") as f:
+            self.assertEqual(f.read(8), b"\x89PNG\r\n\x1a\n")
+        self.assertEqual([n for n in os.listdir(".") if n.startswith("temp_fontgen_config_")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
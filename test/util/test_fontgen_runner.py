@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.fontgen_runner import (
+    FONTGEN_ENV_VAR,
+    resolve_fontgen_command,
+    run_fontgen_async,
+    run_fontgen_many_sync,
+    run_fontgen_sync,
+)
+
+# stand-in tool: prints the config path on stdout, one line on stderr, then
+# sleeps for the number of seconds written in the config file
+TOOL = (
+    "import sys, time\n"
+    "print('reading', sys.argv[-1], flush=True)\n"
+    "print('warning', file=sys.stderr, flush=True)\n"
+    "time.sleep(float(open(sys.argv[-1]).read()))\n"
+    "print('done', flush=True)\n"
+)
+
+
+class TestFontgenRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.command = [sys.executable, "-c", TOOL]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config(self, name, sleep):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(str(sleep))
+        return path
+
+    def test_streams_lines_and_reports_exit_status(self):
+        seen = []
+        result = run_fontgen_sync(self.command, self._config("a.json", 0), on_line=lambda s, l: seen.append((s, l)))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout[-1], "done")
+        self.assertIn(("stderr", "warning"), seen)
+        self.assertTrue(result.command[-1].endswith("a.json"))
+
+    def test_timeout_kills_the_process(self):
+        start = time.perf_counter()
+        result = run_fontgen_sync(self.command, self._config("slow.json", 30), timeout=0.5)
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertNotIn("done", result.stdout)
+
+    def test_cancellation_kills_the_process(self):
+        config = self._config("slow.json", 30)
+
+        async def cancel_soon():
+            task = asyncio.ensure_future(run_fontgen_async(self.command, config))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        start = time.perf_counter()
+        asyncio.run(cancel_soon())
+        self.assertLess(time.perf_counter() - start, 10)
+
+    def test_runs_concurrently_in_order(self):
+        configs = [self._config(f"{i}.json", 0.5) for i in range(4)]
+        start = time.perf_counter()
+        results = run_fontgen_many_sync(self.command, configs)
+        self.assertLess(time.perf_counter() - start, 1.9)
+        self.assertEqual([r.command[-1] for r in results], [os.path.abspath(c) for c in configs])
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_missing_binary_is_an_error_result(self):
+        result = run_fontgen_sync([os.path.join(self.tmp.name, "no-such-fontgen")], self._config("a.json", 0))
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.returncode)
+        self.assertTrue(result.error)
+
+    def test_resolve_command(self):
+        script = os.path.join(self.tmp.name, "fake_fontgen.py")
+        open(script, "w").close()
+        self.assertEqual(resolve_fontgen_command(self.tmp.name, script), [sys.executable, script])
+        self.assertEqual(resolve_fontgen_command(self.tmp.name, ["tool", "--flag"]), ["tool", "--flag"])
+
+        os.environ[FONTGEN_ENV_VAR] = "wine C:/fontgen.exe"
+        try:
+            self.assertEqual(resolve_fontgen_command(self.tmp.name), ["wine", "C:/fontgen.exe"])
+        finally:
+            del os.environ[FONTGEN_ENV_VAR]
+
+
+if __name__ == "__main__":
+    unittest.main()
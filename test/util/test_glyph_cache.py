@@ -0,0 +1,255 @@
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.char_policy import CharPolicy
+from source.util.fnt_file import read_fnt
+from source.util.fontgen import FontgenSettings, use_fontgen
+from source.util import glyph_cache
+from source.util.glyph_cache import _miss_page_size, shelf_pack
+from source.util import png_image
+from source.util.png_image import PNG_SIGNATURE, PngImage, optimize_png_file, read_png, write_png
+
+FAKE_FONTGEN = os.path.join(ROOT, "benchmark", "fake_fontgen.py")
+
+
+def _filtered_png(image, kinds):
+    """Encode `image` using the given PNG filter type for each row (cycled)."""
+    def paeth(a, b, c):
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+
+    bpp = image.channels
+    stride = image.width * bpp
+    raw = bytearray()
+    prev = bytes(stride)
+    for row in range(image.height):
+        line = image.pixels[row * stride:(row + 1) * stride]
+        kind = kinds[row % len(kinds)]
+        out = bytearray()
+        for i, value in enumerate(line):
+            left = line[i - bpp] if i >= bpp else 0
+            up_left = prev[i - bpp] if i >= bpp else 0
+            predictor = [0, left, prev[i], (left + prev[i]) >> 1, paeth(left, prev[i], up_left)][kind]
+            out.append((value - predictor) & 0xFF)
+        raw += bytes([kind]) + out
+        prev = line
+
+    def chunk(tag, body):
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", image.width, image.height, 8, 6, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(bytes(raw))) + chunk(b"IEND", b"")
+
+
+class TestPngImage(unittest.TestCase):
+    def test_every_row_filter_is_undone(self):
+        rng = random.Random(7)
+        image = PngImage(9, 10, 4, bytearray(rng.randrange(256) for _ in range(9 * 10 * 4)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "filtered.png")
+            with open(path, "wb") as f:
+                f.write(_filtered_png(image, [0, 1, 2, 3, 4]))
+            self.assertEqual(read_png(path), image)
+
+            write_png(path, image)
+            self.assertEqual(read_png(path), image)
+
+    def test_optimization_keeps_the_pixels_of_every_filter(self):
+        rng = random.Random(11)
+        image = PngImage(33, 12, 4, bytearray(rng.randrange(4) * 60 for _ in range(33 * 12 * 4)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.png")
+            for kinds in ([0], [1, 2], [0, 1, 2, 3, 4]):
+                with open(path, "wb") as f:
+                    f.write(_filtered_png(image, kinds))
+                with mock.patch.object(png_image, "_unfilter", wraps=png_image._unfilter) as unfilter:
+                    optimize_png_file(path)
+                # adaptively filtered pages keep their filters and are never unfiltered
+                self.assertEqual(unfilter.call_count == 0, 3 in kinds)
+                self.assertEqual(read_png(path), image)
+
+    def test_only_the_top_rows_are_decoded(self):
+        image = PngImage(5, 6, 4, bytearray(range(5 * 6 * 4)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "filtered.png")
+            with open(path, "wb") as f:
+                f.write(_filtered_png(image, [4, 2, 3]))
+            self.assertEqual(read_png(path, rows=4), image.crop(0, 0, 5, 4))
+            self.assertEqual(read_png(path, rows=10), image)
+            # 3 of the top 4 rows are Paeth / Average filtered
+            self.assertEqual(read_png(path, rows=4, max_slow_bytes=3 * 20), image.crop(0, 0, 5, 4))
+            with self.assertRaises(ValueError):
+                read_png(path, rows=4, max_slow_bytes=3 * 20 - 1)
+
+    def test_bad_palette_index_raises_value_error(self):
+        def chunk(tag, body):
+            return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body) & 0xFFFFFFFF)
+
+        header = struct.pack(">IIBBBBB", 2, 1, 8, 3, 0, 0, 0)
+        palette = bytes((255, 0, 0, 0, 255, 0))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "palette.png")
+            # a valid row, an index past the 2 entries, a row cut short
+            for row, expected in ((b"\x00\x00\x01", bytes((255, 0, 0, 0, 255, 0))), (b"\x00\x01\x02", None), (b"\x00\x01", None)):
+                with open(path, "wb") as f:
+                    f.write(PNG_SIGNATURE + chunk(b"IHDR", header) + chunk(b"PLTE", palette)
+                            + chunk(b"IDAT", zlib.compress(row)) + chunk(b"IEND", b""))
+                if expected is None:
+                    with self.assertRaises(ValueError):
+                        read_png(path)
+                else:
+                    self.assertEqual(bytes(read_png(path).pixels), expected)
+
+    def test_crop_and_paste(self):
+        image = PngImage(4, 3, 1, bytearray(range(12)))
+        glyph = image.crop(1, 1, 2, 5)
+        self.assertEqual((glyph.width, glyph.height, bytes(glyph.pixels)), (2, 2, bytes([5, 6, 9, 10])))
+        page = PngImage.blank(3, 3, 1)
+        page.paste(glyph, 1, 0)
+        self.assertEqual(bytes(page.pixels), bytes([0, 5, 6, 0, 9, 10, 0, 0, 0]))
+
+
+class TestShelfPack(unittest.TestCase):
+    def test_rectangles_do_not_overlap(self):
+        rng = random.Random(3)
+        sizes = [(rng.randint(1, 20), rng.randint(1, 20)) for _ in range(200)] + [(0, 0)]
+        placements = shelf_pack(sizes, 64, 1, 1)
+        self.assertEqual(placements[-1], (0, 0, 0))
+        boxes = [(p, x, y, x + w, y + h) for (p, x, y), (w, h) in zip(placements, sizes) if w]
+        for page, x0, y0, x1, y1 in boxes:
+            self.assertLessEqual(x1, 64)
+            self.assertLessEqual(y1, 64)
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1:]:
+                overlap = a[0] == b[0] and a[1] < b[3] and b[1] < a[3] and a[2] < b[4] and b[2] < a[4]
+                self.assertFalse(overlap, f"{a} overlaps {b}")
+        self.assertGreater(max(p for p, _, _ in placements), 0)
+
+    def test_too_large_rectangle_is_rejected(self):
+        with self.assertRaises(ValueError):
+            shelf_pack([(65, 10)], 64)
+
+
+class TestGlyphCacheBuilds(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.out = os.path.join(self.root, "out")
+        self.cache = os.path.join(self.root, "glyphs")
+        self.ttf = os.path.join(self.root, "Font.ttf")
+        with open(self.ttf, "wb") as f:
+            f.write(b"ttf")
+        self.settings = FontgenSettings(
+            command=[sys.executable, FAKE_FONTGEN],
+            quiet=True,
+            temp_folder=os.path.join(self.root, "temp"),
+            glyph_cache_folder=self.cache,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, chars, font_size=23, use_build_cache=False):
+        chunk = os.path.join(self.root, "chunk.txt")
+        with open(chunk, "w", encoding="utf-8") as f:
+            f.write(chars)
+        ok = use_fontgen(
+            chunk,
+            self.ttf,
+            font_size=font_size,
+            custom_fnt_output_folder=self.out,
+            custom_fnt_output_name="atlas",
+            use_build_cache=use_build_cache,
+            policy=CharPolicy(always_include=["0"]),
+            settings=self.settings,
+        )
+        self.assertTrue(ok)
+        return read_fnt(os.path.join(self.out, "atlas.fnt"))
+
+    def _runs(self):
+        runs = []
+        for key in sorted(os.listdir(self.cache)):
+            for name in sorted(os.listdir(os.path.join(self.cache, key))):
+                if name.endswith(".json"):
+                    with open(os.path.join(self.cache, key, name), encoding="utf-8") as f:
+                        runs.append(sorted(int(cp) for cp in json.load(f)["glyphs"]))
+        return runs
+
+    def test_only_new_characters_are_rendered(self):
+        self._build("梁靜")
+        font = self._build("梁靜茹")
+        self.assertEqual(self._runs(), [sorted(map(ord, "0梁靜")), [ord("茹")]])
+        self.assertEqual(sorted(font.char_ids()), sorted(map(ord, "0梁靜茹")))
+        self.assertEqual(font.pages, {0: "atlas_0.png"})
+        # the miss-only run was made on a small page, the output keeps fontgen's size
+        self.assertEqual(font.common["scaleW"], "1024")
+
+        # every glyph keeps the bitmap fake fontgen drew for its codepoint
+        page = read_png(os.path.join(self.out, "atlas_0.png"))
+        for char in font.chars:
+            cp = int(char["id"])
+            x, y = int(char["x"]), int(char["y"])
+            offset = (y * page.width + x) * page.channels
+            self.assertEqual(bytes(page.pixels[offset:offset + 4]), bytes(((cp >> 8) & 0xFF, cp & 0xFF, (cp >> 16) & 0xFF, 255)))
+            self.assertEqual(char["xadvance"], "23")
+
+        # nothing new: fontgen is not run at all
+        self._build("茹梁")
+        self.assertEqual(len(self._runs()), 2)
+
+    def test_build_cache_keeps_glyph_cache_builds_apart(self):
+        self.settings.cache_folder = os.path.join(self.root, "builds")
+        self._build("梁靜", use_build_cache=True)
+        self.settings.glyph_cache_folder = None
+        self._build("梁靜", use_build_cache=True)
+        self.assertEqual(len(os.listdir(self.settings.cache_folder)), 2)
+        # each mode restores its own entry
+        self.settings.glyph_cache_folder = self.cache
+        self._build("梁靜", use_build_cache=True)
+        self.assertEqual(len(os.listdir(self.settings.cache_folder)), 2)
+        self.assertEqual(len(self._runs()), 1)
+
+    def test_slow_pages_fall_back_to_a_regular_build(self):
+        with mock.patch.object(glyph_cache, "MAX_SLOW_PAGE_BYTES", -1):
+            font = self._build("梁靜")
+        self.assertEqual(sorted(font.char_ids()), sorted(map(ord, "0梁靜")))
+        self.assertFalse(os.path.exists(self.cache))
+
+    def test_miss_page_size(self):
+        config = {"fontSize": 23, "dfSize": 6, "spacing": {"x": 1, "y": 1}}
+        self.assertEqual(_miss_page_size(config, 1, 1024), 64)
+        self.assertEqual(_miss_page_size(config, 5, 1024), 128)
+        self.assertEqual(_miss_page_size(config, 5000, 1024), 1024)
+        self.assertEqual(_miss_page_size(dict(config, fontSize=100), 1, 128), 128)
+
+    def test_font_size_is_part_of_the_key(self):
+        self._build("梁")
+        font = self._build("梁", font_size=30)
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+        self.assertEqual(font.chars[0]["xadvance"], "30")
+
+    def test_page_size_change_only_repacks(self):
+        self._build("梁靜茹天堂")
+        # 2 x 2 glyphs of 29 x 29 per 64 x 64 page
+        self.settings.config_overrides = {"packer": {"size": 64}, "spacing": {"x": 0, "y": 0}}
+        font = self._build("梁靜茹天堂")
+        self.assertEqual(len(self._runs()), 1)
+        self.assertEqual(font.common["scaleW"], "64")
+        self.assertEqual(len(font.pages), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
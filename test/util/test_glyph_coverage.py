@@ -0,0 +1,97 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.fnt_file import BMFont
+from source.util.glyph_coverage import append_fallback_pages, partition_by_coverage
+from source.util.ttf_cmap import FontFormatError, read_cmap_coverage
+
+
+def format4_subtable():
+    # segments: A-C via idDelta, a-b via glyphIdArray ("b" maps to .notdef), end marker
+    seg_count = 3
+    end_codes = [0x43, 0x62, 0xFFFF]
+    start_codes = [0x41, 0x61, 0xFFFF]
+    deltas = [(10 - 0x41) & 0xFFFF, 0, 1]
+    range_offsets = [0, 4, 0]
+    glyph_ids = [5, 0]
+    body = struct.pack(f">{seg_count}H", *end_codes) + struct.pack(">H", 0)
+    body += struct.pack(f">{seg_count}H", *start_codes)
+    body += struct.pack(f">{seg_count}H", *deltas)
+    body += struct.pack(f">{seg_count}H", *range_offsets)
+    body += struct.pack(f">{len(glyph_ids)}H", *glyph_ids)
+    header = struct.pack(">7H", 4, 14 + len(body), 0, seg_count * 2, 0, 0, 0)
+    return header + body
+
+
+def format12_subtable():
+    groups = [(0x6881, 0x6882, 20), (0x20000, 0x20001, 30)]
+    body = b"".join(struct.pack(">III", *g) for g in groups)
+    return struct.pack(">HHIII", 12, 0, 16 + len(body), 0, len(groups)) + body
+
+
+def build_font(subtables):
+    records = b""
+    data = b""
+    offset = 4 + 8 * len(subtables)
+    for (platform, encoding), table in subtables:
+        records += struct.pack(">HHI", platform, encoding, offset + len(data))
+        data += table
+    cmap = struct.pack(">HH", 0, len(subtables)) + records + data
+    header = struct.pack(">IHHHH", 0x00010000, 1, 16, 0, 0)
+    record = b"cmap" + struct.pack(">III", 0, 12 + 16, len(cmap))
+    return header + record + cmap
+
+
+class TestGlyphCoverage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_read_cmap_formats_4_and_12(self):
+        path = self._write("font.ttf", build_font([((3, 1), format4_subtable()), ((3, 10), format12_subtable())]))
+        self.assertEqual(read_cmap_coverage(path), {0x41, 0x42, 0x43, 0x61, 0x6881, 0x6882, 0x20000, 0x20001})
+
+    def test_rejects_non_fonts(self):
+        with self.assertRaises(FontFormatError):
+            read_cmap_coverage(self._write("empty.ttf", b""))
+        with self.assertRaises(FontFormatError):
+            read_cmap_coverage(self._write("text.ttf", b"not a font at all, just text"))
+
+    def test_partition_routes_to_first_covering_font(self):
+        assigned, missing = partition_by_coverage(list("Aa梁夜"), [{ord("A")}, {ord("a"), ord("梁")}, {ord("梁")}])
+        self.assertEqual(assigned, [["A"], ["a", "梁"], []])
+        self.assertEqual(missing, ["夜"])
+
+    def test_append_fallback_pages_aligns_baseline(self):
+        primary = BMFont.parse(
+            "info face=\"Main\" size=23\ncommon lineHeight=27 base=21 scaleW=256 scaleH=256 pages=1\n"
+            "page id=0 file=\"main.png\"\nchar id=65 x=0 y=0 width=10 height=10 xoffset=0 yoffset=5 xadvance=12 page=0 chnl=15\n"
+        )
+        fallback = BMFont.parse(
+            "info face=\"Fallback\" size=23\ncommon lineHeight=30 base=24 scaleW=256 scaleH=256 pages=1\n"
+            "page id=0 file=\"main_fallback1.png\"\nchar id=26753 x=0 y=0 width=20 height=20 xoffset=0 yoffset=4 xadvance=23 page=0 chnl=15\n"
+        )
+        merged = append_fallback_pages(primary, fallback)
+        self.assertEqual(merged.pages, {0: "main.png", 1: "main_fallback1.png"})
+        self.assertEqual(merged.info["face"], '"Main"')
+        self.assertEqual([(c["id"], c["page"], c["yoffset"]) for c in merged.chars], [("65", "0", "5"), ("26753", "1", "1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.char_policy import CharPolicy
+from source.util.fnt_file import read_fnt
+from source.util.fontgen import FontgenSettings
+from source.util.incremental_atlas import atlas_manifest_path, use_fontgen_incremental
+
+FAKE_FONTGEN = os.path.join(ROOT, "benchmark", "fake_fontgen.py")
+
+
+class TestIncrementalAtlas(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.out = os.path.join(self.root, "out")
+        self.ttf = os.path.join(self.root, "Font.ttf")
+        with open(self.ttf, "wb") as f:
+            f.write(b"ttf")
+        self.settings = FontgenSettings(
+            command=[sys.executable, FAKE_FONTGEN],
+            quiet=True,
+            temp_folder=os.path.join(self.root, "temp"),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, chars, font_size=23):
+        chunk = os.path.join(self.root, "chunk.txt")
+        with open(chunk, "w", encoding="utf-8") as f:
+            f.write(chars)
+        return use_fontgen_incremental(
+            chunk,
+            self.ttf,
+            font_size=font_size,
+            custom_fnt_output_folder=self.out,
+            custom_fnt_output_name="atlas",
+            use_build_cache=False,
+            policy=CharPolicy(always_include=["0123"]),
+            settings=self.settings,
+        )
+
+    def _read(self, name):
+        with open(os.path.join(self.out, name), "rb") as f:
+            return f.read()
+
+    def test_new_characters_go_to_new_pages(self):
+        self.assertTrue(self._build("梁靜茹"))
+        first_png = self._read("atlas.png")
+        self.assertEqual(read_fnt(os.path.join(self.out, "atlas.fnt")).pages, {0: "atlas.png"})
+
+        self.assertTrue(self._build("梁靜茹天堂"))
+        self.assertEqual(self._read("atlas.png"), first_png)
+        font = read_fnt(os.path.join(self.out, "atlas.fnt"))
+        self.assertEqual(font.pages, {0: "atlas.png", 1: "atlas_g1_0.png"})
+        pages = {int(c["id"]): c["page"] for c in font.chars}
+        self.assertEqual(pages[ord("梁")], "0")
+        self.assertEqual(pages[ord("0")], "0")
+        self.assertEqual(pages[ord("天")], "1")
+        self.assertEqual(pages[ord("堂")], "1")
+        # the always-included characters are not generated again
+        self.assertEqual(sorted(pages.values()).count("1"), 2)
+
+        with open(atlas_manifest_path(os.path.join(self.out, "atlas")), encoding="utf-8") as f:
+            self.assertEqual([g["chars"] for g in json.load(f)["generations"]], [3, 2])
+
+    def test_unchanged_and_removed_characters_keep_every_file(self):
+        self._build("梁靜茹")
+        self._build("梁靜茹天")
+        before = {name: self._read(name) for name in os.listdir(self.out)}
+
+        self.assertTrue(self._build("梁天"))
+        self.assertEqual({name: self._read(name) for name in os.listdir(self.out)}, before)
+
+    def test_mismatch_rebuilds_everything(self):
+        self._build("梁靜茹")
+        self._build("梁靜茹天")
+
+        # a different font size cannot share glyphs with the old pages
+        self.assertTrue(self._build("梁靜茹天", font_size=32))
+        font = read_fnt(os.path.join(self.out, "atlas.fnt"))
+        self.assertEqual(font.pages, {0: "atlas.png"})
+        self.assertFalse(os.path.exists(os.path.join(self.out, "atlas_g1_0.png")))
+
+        # so does a page edited by hand
+        with open(os.path.join(self.out, "atlas.png"), "ab") as f:
+            f.write(b"edited")
+        self.assertTrue(self._build("梁靜茹天堂", font_size=32))
+        self.assertEqual(read_fnt(os.path.join(self.out, "atlas.fnt")).pages, {0: "atlas.png"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util import profiler
+from source.util.profiler import Profiler
+from source.util.scan_corpus import scan_files
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stages_accumulate_and_report_json(self):
+        prof = Profiler()
+        with prof.stage("split"):
+            pass
+        with prof.stage("split"):
+            pass
+        prof.record_fontgen(["fontgen.exe", "config.json"], 0, 1.5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            report_file = os.path.join(tmp, "report", "profile.json")
+            prof.write_json(report_file)
+            with open(report_file, "r", encoding="utf-8") as f:
+                report = json.load(f)
+
+        self.assertEqual(report["stages"]["split"]["count"], 2)
+        self.assertEqual(report["fontgen_runs"][0]["returncode"], 0)
+        self.assertIn("peak_rss_bytes", report)
+
+    def test_module_helpers_are_noops_without_active_profiler(self):
+        self.assertIsNone(profiler.active)
+        with profiler.stage("anything"):
+            pass
+        profiler.record_fontgen(["fontgen.exe"], 1, 0.1)
+
+    def test_scan_files_records_per_file_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("梁靜茹梁")
+            prof = Profiler()
+            scan_files([path], profiler=prof, verbose=False)
+
+        self.assertEqual(len(prof.files), 1)
+        entry = prof.files[0]
+        self.assertEqual(entry["bytes"], 12)
+        self.assertEqual(entry["unique_chars"], 3)
+        self.assertFalse(entry["cached"])
+
+
+if __name__ == "__main__":
+    unittest.main()
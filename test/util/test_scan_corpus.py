@@ -0,0 +1,139 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.extract_char_set import update_text_file, update_xml_file
+from source.util.extract_cache import ExtractCache
+from source.util import scan_corpus
+from source.util.scan_corpus import discover_files, list_text_files, scan_files
+
+
+class TestScanCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        files = {
+            "b.txt": "abc梁def",
+            "a.xml": "<root>hello<child>靜謐</child> tail</root>",
+            "c.txt": "夜晚，微風",
+            "ignored.md": "不應該出現",
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.tmp.name, name), "w", encoding="utf-8") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_list_text_files_sorted_and_filtered(self):
+        names = [os.path.basename(p) for p in list_text_files(self.tmp.name)]
+        self.assertEqual(names, ["a.xml", "b.txt", "c.txt"])
+
+    def test_discover_files_recursive_with_globs(self):
+        for rel in ("locale/zh/ui.json", "locale/zh/old/legacy.po", "locale/en/ui.json", "build/out.txt"):
+            path = os.path.join(self.tmp.name, *rel.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("{}")
+
+        def rel_paths(**kwargs):
+            paths = discover_files(self.tmp.name, **kwargs)
+            return [os.path.relpath(p, self.tmp.name).replace(os.sep, "/") for p in paths]
+
+        self.assertEqual(
+            rel_paths(),
+            ["a.xml", "b.txt", "build/out.txt", "c.txt", "locale/en/ui.json", "locale/zh/old/legacy.po", "locale/zh/ui.json"],
+        )
+        self.assertEqual(rel_paths(include=["locale/zh/*"], exclude=["old"]), ["locale/zh/ui.json"])
+        self.assertEqual(rel_paths(exclude=["build", "locale", "*.xml"]), ["b.txt", "c.txt"])
+        self.assertEqual(rel_paths(recursive=False), ["a.xml", "b.txt", "c.txt"])
+
+    def test_parallel_matches_serial(self):
+        file_paths = list_text_files(self.tmp.name)
+        serial = set()
+        for path in file_paths:
+            if path.endswith(".xml"):
+                serial = update_xml_file(path, serial)
+            else:
+                serial = update_text_file(path, serial)
+
+        parallel = scan_files(file_paths, jobs=2)
+        self.assertEqual(parallel, serial)
+        self.assertNotIn("應", parallel)
+
+    def test_cache_skips_unchanged_files(self):
+        file_paths = list_text_files(self.tmp.name)
+        manifest = os.path.join(self.tmp.name, "cache", "manifest.json")
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        first = scan_files(file_paths, cache=cache)
+        cache.save()
+        self.assertEqual(cache.misses, 3)
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        self.assertEqual(scan_files(file_paths, cache=cache), first)
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+        # same size, different content: detected through the content hash
+        with open(os.path.join(self.tmp.name, "b.txt"), "w", encoding="utf-8") as f:
+            f.write("xyz梁uvw")
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        result = scan_files(file_paths, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertIn("x", result)
+
+    def test_file_edited_during_extraction_is_rescanned(self):
+        file_paths = list_text_files(self.tmp.name)
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        b_txt = os.path.join(self.tmp.name, "b.txt")
+        extract = scan_corpus.extract_file_chars
+
+        def extract_then_edit(file_path, *args):
+            chars = extract(file_path, *args)
+            if file_path == b_txt:
+                # same size, written after its characters were read
+                with open(b_txt, "w", encoding="utf-8") as f:
+                    f.write("xyz梁uvw")
+            return chars
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        with mock.patch.object(scan_corpus, "extract_file_chars", extract_then_edit):
+            self.assertNotIn("x", scan_files(file_paths, cache=cache))
+        cache.save()
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        self.assertIn("x", scan_files(file_paths, cache=cache))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_parallel_scan_fills_the_cache(self):
+        file_paths = list_text_files(self.tmp.name)
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        first = scan_files(file_paths, jobs=2, cache=cache)
+        cache.save()
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        self.assertEqual(scan_files(file_paths, cache=cache), first)
+        self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+    def test_cache_invalidated_when_options_change(self):
+        file_paths = list_text_files(self.tmp.name)
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        cache = ExtractCache(manifest, {"treat_xml_as_text": False})
+        scan_files(file_paths, cache=cache)
+        cache.save()
+
+        cache = ExtractCache(manifest, {"treat_xml_as_text": True})
+        result = scan_files(file_paths, treat_xml_as_text=True, cache=cache)
+        self.assertEqual(cache.hits, 0)
+        self.assertIn("<", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
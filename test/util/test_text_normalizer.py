@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.codepoint_set import CodepointSet
+from source.util.extract_cache import ExtractCache, extract_options
+from source.util.scan_corpus import extract_file_chars, scan_files
+from source.util.text_normalizer import TextNormalizer, normalization_report
+
+DECOMPOSED = "Cafe\u0301 \u1100\u1161"
+
+
+class TestTextNormalizer(unittest.TestCase):
+    def test_steps(self):
+        self.assertEqual(TextNormalizer("NFC")(DECOMPOSED), "Caf\u00e9 \uac00")
+        self.assertEqual(TextNormalizer("NFKC")("㈱ ﬁ"), "(株) fi")
+        self.assertEqual(TextNormalizer(strip_format=True)("a\u200db\ufeff\u2764\ufe0f\u00ad"), "ab\u2764")
+        self.assertEqual(TextNormalizer(strip_control=True)("a\x01\x7fb\t"), "ab")
+        # halfwidth voiced mark folds to a combining mark that NFC then composes
+        self.assertEqual(TextNormalizer("NFC", fold_width=True)("Ａ１　ｶﾞ"), "A1 ガ")
+        self.assertEqual(TextNormalizer(fold_width=True)("ｶﾞ"), "ガ")
+        self.assertFalse(TextNormalizer().active)
+        with self.assertRaises(ValueError):
+            TextNormalizer("NFD")
+
+    def test_report(self):
+        normalizer = TextNormalizer("NFC", strip_format=True, fold_width=True)
+        raw = "e\u0301\u200d\uff21\n"
+        report = normalization_report(raw, normalizer(raw), normalizer, ignore="\n")
+        self.assertEqual(report.removed, {"format": ["\u200d"], "normalization": ["e", "\u0301"], "width": ["\uff21"]})
+        self.assertEqual(report.added, ["A", "\u00e9"])
+        self.assertEqual((report.raw_count, report.normalized_count, report.eliminated), (4, 2, 2))
+
+
+class TestNormalizedScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files = []
+        for i, text in enumerate([DECOMPOSED * 50, '{"k": "x\\u200dy"}']):
+            path = os.path.join(self.tmp.name, f"f{i}.{'json' if i else 'txt'}")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sequences_split_across_chunks_are_composed(self):
+        normalizer = TextNormalizer("NFC")
+        for chunk_size in (1, 3, 7, 1024):
+            raw = CodepointSet()
+            chars = extract_file_chars(self.files[0], chunk_size=chunk_size, normalizer=normalizer, raw=raw)
+            self.assertEqual(chars.to_string(), " Café가", chunk_size)
+            self.assertEqual(len(raw), 8)
+
+        # a decomposed L + V + T syllable and a halfwidth kana with its voiced mark
+        cases = [
+            (TextNormalizer("NFC"), "x\u1100\u1161\u11a8", "x\uac01"),
+            (TextNormalizer("NFC", fold_width=True), "\uff76\uff9e", "\u30ac"),
+        ]
+        path = os.path.join(self.tmp.name, "split.txt")
+        for normalizer, text, expected in cases:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            for chunk_size in (1, 2, 3, 1024):
+                chars = extract_file_chars(path, chunk_size=chunk_size, normalizer=normalizer)
+                self.assertEqual(chars.to_string(), expected, (text, chunk_size))
+
+    def test_serial_parallel_and_cache(self):
+        normalizer = TextNormalizer("NFC", strip_format=True)
+        expected = "Cafxyé가"
+        for jobs in (1, 2):
+            raw = CodepointSet()
+            chars = scan_files(self.files, jobs, verbose=False, normalizer=normalizer, raw_chars=raw)
+            self.assertEqual(chars.to_string().strip(), expected)
+            self.assertIn("\u200d", raw.to_string())
+
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        for hits in (0, 2):
+            cache = ExtractCache(manifest, extract_options(False, normalizer))
+            raw = CodepointSet()
+            chars = scan_files(self.files, cache=cache, verbose=False, normalizer=normalizer, raw_chars=raw)
+            cache.save()
+            self.assertEqual((cache.hits, chars.to_string().strip(), len(raw)), (hits, expected, 11))
+
+        # without normalization the options differ, so the manifest is discarded
+        cache = ExtractCache(manifest, extract_options(False))
+        self.assertIn("\u200d", scan_files(self.files, cache=cache, verbose=False).to_string())
+        self.assertEqual(cache.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.scan_corpus import list_text_files
+from source.util.watch_folder import CharRefCount, FolderWatcher
+
+
+class TestFolderWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "a.txt")
+        self._write(self.path, "梁")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _check_detects_changes(self, use_inotify):
+        watcher = FolderWatcher(self.tmp.name, lambda: list_text_files(self.tmp.name),
+                                poll_interval=0.05, debounce=0.05, use_inotify=use_inotify)
+        try:
+            self.assertEqual(watcher.wait_for_changes(timeout=0.1), set())
+
+            new_path = os.path.join(self.tmp.name, "b.txt")
+            timer = threading.Timer(0.1, lambda: (self._write(self.path, "梁靜"), self._write(new_path, "夜")))
+            timer.start()
+            self.assertEqual(watcher.wait_for_changes(timeout=5), {self.path, new_path})
+            timer.join()
+
+            os.remove(new_path)
+            self.assertEqual(watcher.wait_for_changes(timeout=5), {new_path})
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        self._check_detects_changes(use_inotify=False)
+
+    def test_inotify_or_fallback(self):
+        self._check_detects_changes(use_inotify=True)
+
+
+class TestCharRefCount(unittest.TestCase):
+    def test_set_and_remove_files(self):
+        running = CharRefCount()
+        running.set_file("a", "ab梁")
+        running.set_file("b", "b夜")
+        self.assertEqual(running.char_set(), set("ab梁夜"))
+
+        running.set_file("a", "a")
+        self.assertEqual(running.char_set(), set("ab夜"))
+        running.remove_file("b")
+        self.assertEqual(running.char_set(), {"a"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import unittest
+# Ensure repository root is on sys.path so `source` package can be imported when
+# tests are executed directly.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from source.util.extract_cache import ExtractCache, extract_options
+from source.util.read_xml_txt import iter_xml_texts_from_chunks, read_xml_texts_from_string
+from source.util.scan_corpus import scan_files
+from source.util.xml_selectors import Step, XmlSelection, parse_attribute_selector, parse_selector, xml_selection
+
+XML = (
+    '<?xml version="1.0"?><strings>'
+    '<string id="a" lang="zh">中文<debug>dbg</debug>尾</string>'
+    "<string lang='en'>Eng</string>"
+    '<button label="按钮 &amp; x" id="b1"/><!-- note -->'
+    '<menu><item title="标题">項目</item><group><item title="深">深層</item></group></menu>'
+    'out</strings>'
+)
+
+
+class TestSelectorParsing(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_selector("/a//b[@x][@y!='1']/*"),
+            (Step("/", "a"), Step("//", "b", (("x", None, ""), ("y", "!=", "1"))), Step("/", "*")),
+        )
+        self.assertEqual(parse_selector("menu/item"), (Step("//", "menu"), Step("/", "item")))
+        self.assertEqual(parse_attribute_selector("//@alt"), ((Step("//", "*"),), "alt"))
+        self.assertEqual(parse_attribute_selector("item[@a='b']/@title")[1], "title")
+        for bad in ("", "//a[", "a b", "//a[lang]", "//a[@x=y]"):
+            with self.assertRaises(ValueError):
+                parse_selector(bad)
+        with self.assertRaises(ValueError):
+            parse_attribute_selector("//item")
+        self.assertIsNone(xml_selection())
+
+
+class TestSelectedXmlTexts(unittest.TestCase):
+    def texts(self, **selectors):
+        return read_xml_texts_from_string(XML, XmlSelection(**selectors))
+
+    def test_include_exclude(self):
+        self.assertEqual(self.texts(include=["//string[@lang='zh']"], exclude=["//debug"]), ["中文", "尾"])
+        self.assertEqual(self.texts(exclude=["menu", "string[@lang!='en']"]), ["Eng", "out"])
+        self.assertEqual(self.texts(include=["/strings/menu/item"]), ["項目"])
+        self.assertEqual(self.texts(include=["menu//item"]), ["項目", "深層"])
+
+    def test_attributes(self):
+        self.assertEqual(
+            self.texts(include=["//item"], attributes=["//button/@label", "item/@title"]),
+            ["按钮 & x", "标题", "項目", "深", "深層"],
+        )
+        self.assertEqual(self.texts(include=["//button"], exclude=["group"], attributes=["//@title"]), ["标题"])
+
+    def test_chunk_boundaries_and_mismatched_tags(self):
+        selection = XmlSelection(include=["//item"], attributes=["//@label"])
+        expected = read_xml_texts_from_string(XML, selection)
+        for size in (1, 2, 5, 13):
+            chunks = [XML[i:i + size] for i in range(0, len(XML), size)]
+            self.assertEqual(list(iter_xml_texts_from_chunks(chunks, selection)), expected)
+
+        # a stray end tag is ignored, a missing one is closed by its parent's end tag
+        xml = "<r><item>a<b>b</x></item>c<item>d</r>e"
+        self.assertEqual(read_xml_texts_from_string(xml, XmlSelection(include=["item"])), ["a", "b", "d"])
+
+    def test_deeply_nested(self):
+        depth = 20000
+        xml = "<a>" * depth + "<b>deep</b>" + "</a>" * depth
+        self.assertEqual(read_xml_texts_from_string(xml, XmlSelection(include=["/a//a/b"])), ["deep"])
+
+
+class TestSelectedScan(unittest.TestCase):
+    def test_scan_and_cache_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "strings.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(XML)
+            manifest = os.path.join(tmp, "manifest.json")
+            selection = XmlSelection(include=["//item"])
+            for jobs in (1, 2):
+                cache = ExtractCache(manifest, extract_options(False, xml_selection=selection))
+                chars = scan_files([path, path], jobs, cache=cache, verbose=False, xml_selection=selection)
+                cache.save()
+                self.assertEqual(chars.to_string(), "".join(sorted("項目深層")))
+            self.assertEqual(cache.hits, 2)
+
+            cache = ExtractCache(manifest, extract_options(False))
+            self.assertIn("文", scan_files([path], cache=cache, verbose=False).to_string())
+            self.assertEqual(cache.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
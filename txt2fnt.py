@@ -1,21 +1,60 @@
 import os
 import argparse
 import sys
-from source.util.extract_char_set import save_char_set, split_char_set, update_text_file, update_xml_file
+import multiprocessing
+import shutil
+import tempfile
+from collections import Counter
+from dataclasses import replace
+from source.util import profiler
+from source.util.archive_inputs import ARCHIVE_ERRORS, input_exists, relative_input_path
+from source.util.atlas_analyzer import SizeBudget, analyze_atlas, auto_size, print_atlas_report, size_candidates
+from source.util.batch_build import resolve_ttf_file
+from source.util.char_frequency import FrequencyTiers, order_by_frequency, parse_thresholds, write_frequency_table
+from source.util.char_policy import default_char_policy, load_char_policy
+from source.util.codepoint_set import CodepointSet
+from source.util.extract_cache import ExtractCache, extract_options
+from source.util.extract_char_set import DEFAULT_CHUNK_SIZE, save_char_set, split_char_set
+from source.util.extractors import supported_extensions
+from source.util.safe_print import safe_print
+from source.util.scan_corpus import discover_files, scan_files
+from source.util.text_normalizer import (
+    NORMALIZATION_FORMS,
+    TextNormalizer,
+    normalization_report,
+    print_normalization_report,
+    write_normalization_report,
+)
+from source.util.xml_selectors import xml_selection
 
 ttf_folder = os.path.join("_tools_", "ttf")
 
 workspace_folder = "workspace"
 char2chunkFolder = os.path.join(workspace_folder, "char2chunk")
+extract_cache_file = os.path.join(workspace_folder, "cache", "extract_manifest.json")
 text_folder = os.path.join(workspace_folder, "text")
 
+def _int_list(value):
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated integers, got '{value}'")
+
+
+def _thresholds(value):
+    try:
+        return parse_thresholds(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate font files from text and TTF inputs")
     parser.add_argument("-ttf", dest="ttf", help=f"Specify TTF filename (in {ttf_folder} with/without extension name) to use for font generation")
     parser.add_argument("-o", "--output-name", dest="output_name", help="Custom output name for the .fnt file (no extension)")
     parser.add_argument("-fs", "--font-size", dest="font_size", type=int, default=23, help="Specify font size (default 23)")
     # custom text folder
-    parser.add_argument("-tf", "--text-folder", dest="text_folder", default=text_folder, help=f"Specify text folder (default: {text_folder})")
+    parser.add_argument("-tf", "--text-folder", dest="text_folder", default=text_folder, help=f"Specify text folder, or a zip / tar archive, to scan (default: {text_folder}); archives inside it are scanned without unpacking")
 
     # custom fnt output folder
     parser.add_argument("-ff", "--fnt-folder", dest="fnt_folder", default=None, help="Specify custom output folder for generated .fnt and .png files (default: workspace/fnt)")
@@ -23,48 +62,105 @@ def parse_args():
     # treat xml as a simple text file (disable xml parsing)
     parser.add_argument("-txat", "--treat-xml-as-text", dest="treat_xml_as_text", action="store_true", help="Treat XML files as plain text files (disable XML parsing)")
 
-    return parser.parse_args()
+    # input discovery
+    parser.add_argument("--include", dest="include", action="append", default=None, help="Only scan files whose path (relative to the text folder) or name matches this glob; repeatable")
+    parser.add_argument("--exclude", dest="exclude", action="append", default=None, help="Skip files and folders whose relative path or name matches this glob; repeatable")
+    parser.add_argument("--no-recursive", dest="no_recursive", action="store_true", help="Only scan the top level of the text folder")
 
+    # streaming chunk size for text files
+    parser.add_argument("-cs", "--chunk-size", dest="chunk_size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"Number of characters read per chunk when streaming text files (default {DEFAULT_CHUNK_SIZE})")
 
-def main():
-    args = parse_args()
+    # parallel extraction
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=1, help="Number of worker processes used to extract characters (default 1, 0 = one per CPU core)")
 
-    global text_folder
-    text_folder = args.text_folder
+    # persistent per-file extraction cache
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help=f"Rescan every text file instead of reusing the extraction cache ({extract_cache_file})")
 
-    pwd = os.getcwd()
-    # log present working directory
-    print("Present Working Directory:", pwd)
+    # content-addressed fontgen build cache
+    parser.add_argument("--no-build-cache", dest="no_build_cache", action="store_true", help="Always run fontgen instead of reusing a previous build with identical inputs")
 
-    # create workspace/text folder if not exists
-    if not os.path.exists(text_folder):
-        os.makedirs(text_folder)
-        # ask user to add text files in the folder and exit
-        print(f"Text folder created at {text_folder}. Please add .txt or .xml files and run again.")
-        sys.exit(1)
+    # output stage
+    parser.add_argument("--binary-fnt", dest="binary_fnt", action="store_true", help="Also write the descriptor in the BMFont binary format (<output>.bin.fnt), verified against the text .fnt")
+    parser.add_argument("--json-index", dest="json_index", action="store_true", help="Also write a compact JSON index of the descriptor (<output>.fnt.json), verified against the text .fnt")
+    parser.add_argument("--optimize-png", dest="optimize_png", action="store_true", help="Losslessly recompress the atlas pages in place and strip their metadata chunks (pixels are checked to be unchanged)")
 
-    textFolderFilesRaw = os.listdir(text_folder)
+    # per-glyph render cache
+    parser.add_argument("--glyph-cache", dest="glyph_cache", action="store_true", help="Keep every glyph fontgen renders (workspace/cache/glyphs) and only send characters missing from it to fontgen; the atlas is repacked from cached and new glyphs")
 
-    # if no text files found, exit
-    if len(textFolderFilesRaw) == 0:
-        print(f"No text files found in the specified folder. ({text_folder}) Please add .txt or .xml files and run again.")
-        sys.exit(1)
+    # append-only atlas updates
+    parser.add_argument("--incremental", dest="incremental", action="store_true", help="Only generate characters that are new since the last --incremental build, as extra pages appended to the existing .fnt (earlier pages stay byte-identical)")
 
-    char_set = set()
-    for file_name in textFolderFilesRaw:
-        file_path = os.path.join(text_folder, file_name)
-        ext = os.path.splitext(file_name)[1].lower()
-        if ext == '.txt':
-            char_set = update_text_file(file_path, char_set)
-        elif ext == '.xml':
-            # treat_xml_as_text
-            if args.treat_xml_as_text:
-                char_set = update_text_file(file_path, char_set)
-            else:
-                char_set = update_xml_file(file_path, char_set)
+    # frequency-ranked glyph tiers
+    parser.add_argument("--frequency-tiers", dest="frequency_tiers", type=_thresholds, default=None, help="Count character frequencies and generate the glyphs in tiers by cumulative share of occurrences, hottest first (e.g. \"0.9,0.99\": page 0 holds the characters covering 90%% of the text)")
 
-    accepted_chars, excluded_chars = split_char_set(char_set)
+    # sharded parallel atlas generation
+    parser.add_argument("--shards", dest="shards", type=int, default=1, help="Split the characters into N shards generated by concurrent fontgen processes and merged into one multi-page .fnt (default 1)")
 
+    # batch (matrix) builds sharing one extraction
+    parser.add_argument("--batch", dest="batch", default=None, help="JSON job file listing ttf / font_size / output_name entries to build from one extraction")
+    parser.add_argument("--batch-glob", dest="batch_glob", default=None, help=f"Build every TTF in {ttf_folder} matching this pattern (e.g. \"*.ttf\") at each --batch-sizes size")
+    parser.add_argument("--batch-sizes", dest="batch_sizes", type=_int_list, default=None, help="Comma separated font sizes for --batch-glob (default: --font-size)")
+    parser.add_argument("--batch-workers", dest="batch_workers", type=int, default=0, help="Maximum number of concurrent fontgen jobs in batch mode (default: one per CPU core)")
+
+    # TTF coverage filter and fallback fonts
+    parser.add_argument("--no-coverage-filter", dest="no_coverage_filter", action="store_true", help="Send every accepted character to fontgen, even those the TTF has no glyph for")
+    parser.add_argument("--fallback-ttf", dest="fallback_ttf", action="append", default=None, help=f"Fallback TTF (in {ttf_folder}) for characters the main TTF does not cover; repeat for an ordered chain. Generated as extra pages of the main .fnt")
+
+    # watch mode
+    parser.add_argument("-w", "--watch", dest="watch", action="store_true", help="Keep running and regenerate the font whenever edits to the text folder add or remove accepted characters")
+    parser.add_argument("--watch-debounce", dest="watch_debounce", type=float, default=0.5, help="Seconds the text folder must stay quiet before a change is processed (default 0.5)")
+    parser.add_argument("--watch-interval", dest="watch_interval", type=float, default=1.0, help="Polling interval in seconds when inotify is not available (default 1.0)")
+
+    # character classification policy (skip / always-include lists)
+    parser.add_argument("--char-policy", dest="char_policy", default=None, help="JSON file overriding which characters are skipped and which are always included in the font")
+
+    # XML element / attribute selectors
+    parser.add_argument("--xml-include", dest="xml_include", action="append", default=None, help="Only extract XML text inside elements matching this XPath-subset selector (e.g. \"//string[@lang='zh']\"); repeat for several")
+    parser.add_argument("--xml-exclude", dest="xml_exclude", action="append", default=None, help="Do not extract XML text inside elements matching this selector (e.g. \"//debug\"); repeat for several")
+    parser.add_argument("--xml-attribute", dest="xml_attribute", action="append", default=None, help="Also extract the values of the attributes matching this selector (e.g. \"//button/@label\"); repeat for several")
+
+    # Unicode normalization of the extracted text
+    parser.add_argument("--normalize", dest="normalize", choices=NORMALIZATION_FORMS, default=None, help="Normalize the extracted text to NFC or NFKC before collecting its characters, so decomposed and compatibility variants do not become extra glyphs")
+    parser.add_argument("--strip-format", dest="strip_format", action="store_true", help="Drop invisible format characters (zero-width joiners, BOMs, direction marks, soft hyphens) and variation selectors")
+    parser.add_argument("--strip-control", dest="strip_control", action="store_true", help="Drop control characters")
+    parser.add_argument("--fold-width", dest="fold_width", action="store_true", help="Fold fullwidth and halfwidth forms (e.g. Ａ, ｶ) to their ordinary characters (A, カ)")
+
+    # per-group subset fonts
+    parser.add_argument("--groups", dest="groups", default=None, help="Build one subset font per group of input files: \"folders\" (one group per top-level folder of the text folder) or a JSON file mapping group names to globs")
+    parser.add_argument("--core-font", dest="core_font", action="store_true", help="With --groups, move the characters shared by several groups (and the always-included ones) to a separate <output>_core font")
+    parser.add_argument("--core-min-groups", dest="core_min_groups", type=int, default=2, help="Number of groups a character must appear in to go to the core font (default 2)")
+
+    # atlas analysis and automatic sizing
+    parser.add_argument("--analyze", dest="analyze", action="store_true", help="After generation, report page count and size, glyph fill ratio and estimated texture memory of the atlas")
+    parser.add_argument("--auto-size", dest="auto_size", action="store_true", help="Search the largest font size (down to --min-font-size, trying each --page-sizes / --spacings value) whose atlas fits --max-pages and/or --max-texture-mb")
+    parser.add_argument("--max-pages", dest="max_pages", type=int, default=None, help="Page count budget for --auto-size")
+    parser.add_argument("--max-texture-mb", dest="max_texture_mb", type=float, default=None, help="Texture memory budget for --auto-size, in MiB (uncompressed pages)")
+    parser.add_argument("--min-font-size", dest="min_font_size", type=int, default=8, help="Smallest font size --auto-size may pick (default 8)")
+    parser.add_argument("--page-sizes", dest="page_sizes", type=_int_list, default=None, help="Comma separated atlas page sizes for --auto-size to try (fontgen packer size, default: fontgen's own)")
+    parser.add_argument("--spacings", dest="spacings", type=_int_list, default=None, help="Comma separated glyph spacings for --auto-size to try (default: 1)")
+
+    # fontgen process
+    parser.add_argument("--fontgen", dest="fontgen", default=None, help="Path (or command line) of the fontgen tool to run instead of the one found in _tools_/fontgen (also read from the TXT2FNT_FONTGEN environment variable)")
+    parser.add_argument("--fontgen-timeout", dest="fontgen_timeout", type=float, default=None, help="Kill a fontgen process that runs longer than this many seconds (default: no limit)")
+
+    # instrumentation
+    parser.add_argument("--profile", dest="profile", action="store_true", help="Print per-stage timings, per-file extraction rates, fontgen exit status and peak memory at the end")
+    parser.add_argument("--report-json", dest="report_json", default=None, help="Write the --profile data to this JSON file")
+    parser.add_argument("-q", "--quiet", dest="quiet", action="store_true", help="Do not print per-file progress or fontgen output (errors are still shown)")
+
+    return parser.parse_args()
+
+
+def make_normalizer(args):
+    normalizer = TextNormalizer(args.normalize, args.strip_format, args.strip_control, args.fold_width)
+    return normalizer if normalizer.active else None
+
+
+def make_xml_selection(args):
+    return xml_selection(args.xml_include, args.xml_exclude, args.xml_attribute)
+
+
+def save_chunk_files(accepted_chars, excluded_chars, frequencies=None):
     acceptedCount = len(accepted_chars)
     excludedCount = len(excluded_chars)
 
@@ -85,6 +181,465 @@ def main():
 
     save_char_set(accepted_chars, outFileAccepted)
     save_char_set(excluded_chars, outFileIgnored)
+    if frequencies is not None:
+        write_frequency_table(frequencies, accepted_chars, os.path.join(char2chunkFolder, f"char_frequency_{acceptedCount}.tsv"))
+
+    return outFileAccepted
+
+
+def generate_font(args, accepted_chars, char_chunk_file, ttf_file, output_name, font_size, policy, fallback_ttf_files, tiers=None,
+                  config_overrides=None, fnt_folder=None, export=True):
+    from source.util import fontgen
+    from source.util.fontgen import resolve_output_fnt, use_fontgen
+
+    if args.incremental:
+        from source.util.incremental_atlas import use_fontgen_incremental as use_fontgen
+
+    fontgen_kwargs = dict(
+        font_size=font_size,
+        use_build_cache=not args.no_build_cache,
+        policy=policy,
+        shards=args.shards,
+        tiers=tiers,
+    )
+    if config_overrides:
+        fontgen_kwargs["settings"] = replace(fontgen.current_settings(), config_overrides=config_overrides)
+    fnt_folder = fnt_folder or args.fnt_folder
+    output_fnt = resolve_output_fnt(ttf_file, fnt_folder, output_name)
+    if args.no_coverage_filter:
+        ok = use_fontgen(
+            char_chunk_file=char_chunk_file,
+            ttf_file=ttf_file,
+            custom_fnt_output_folder=fnt_folder,
+            custom_fnt_output_name=output_name,
+            **fontgen_kwargs,
+        )
+    else:
+        from source.util.glyph_coverage import use_fontgen_with_coverage
+
+        ok = use_fontgen_with_coverage(
+            accepted_chars,
+            ttf_file,
+            fallback_ttf_files,
+            char2chunkFolder,
+            output_fnt,
+            use_fontgen,
+            **fontgen_kwargs,
+        )
+    if ok and export:
+        ok = export_outputs(args, output_fnt)
+    return ok
+
+
+def export_outputs(args, output_fnt):
+    """Write the --binary-fnt / --json-index outputs and optimize the pages (--optimize-png)."""
+    if not (args.binary_fnt or args.json_index or args.optimize_png):
+        return True
+    from source.util.fnt_output import export_font, print_output_report
+
+    try:
+        report = export_font(output_fnt, binary_fnt=args.binary_fnt, json_index=args.json_index, optimize_png=args.optimize_png)
+    except (OSError, ValueError) as e:
+        safe_print(f"⚠️  Output stage failed for {output_fnt}.fnt: {e}")
+        return False
+    print_output_report(report)
+    return True
+
+
+def run_batch_mode(args, accepted_chars, char_chunk_file, policy, fallback_ttf_files, tiers=None):
+    from source.util.batch_build import glob_batch_jobs, load_batch_file, print_batch_report, run_batch
+
+    try:
+        if args.batch:
+            jobs = load_batch_file(args.batch, ttf_folder, args.font_size)
+        else:
+            jobs = glob_batch_jobs(ttf_folder, args.batch_glob, args.batch_sizes or [args.font_size])
+    except (OSError, ValueError) as e:
+        print(f"Could not load batch jobs: {e}")
+        sys.exit(1)
+
+    if len(jobs) == 0:
+        print("No batch jobs to run.")
+        sys.exit(1)
+
+    workers = args.batch_workers if args.batch_workers > 0 else min(len(jobs), os.cpu_count() or 1)
+    print()
+    print()
+    print(f"=== Starting Batch Font Generation ({len(jobs)} jobs, {workers} workers) ===")
+    print("Using Character Chunk File:", char_chunk_file)
+
+    def build_one(job):
+        return generate_font(args, accepted_chars, char_chunk_file, job.ttf_file, job.output_name, job.font_size, policy, fallback_ttf_files, tiers)
+
+    with profiler.stage("fontgen"):
+        results = run_batch(jobs, build_one, workers)
+    print_batch_report(results)
+    if args.analyze:
+        from source.util.fontgen import resolve_output_fnt
+
+        for r in results:
+            if r.ok:
+                print_atlas_report(analyze_atlas(resolve_output_fnt(r.job.ttf_file, args.fnt_folder, r.job.output_name) + ".fnt"))
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+def run_group_mode(args, per_file_chars, policy, ttf_file, fallback_ttf_files, tiers):
+    from source.util.batch_build import BatchJob, print_batch_report, run_batch
+    from source.util.char_policy import CharPolicy
+    from source.util.font_groups import (
+        FOLDER_GROUPS,
+        group_by_manifest,
+        group_by_top_folder,
+        group_chars,
+        group_output_names,
+        load_group_manifest,
+        split_core,
+        write_group_index,
+    )
+    from source.util.fontgen import resolve_output_fnt
+
+    files = list(per_file_chars)
+    try:
+        if args.groups == FOLDER_GROUPS:
+            groups = group_by_top_folder(files, text_folder)
+        else:
+            groups = group_by_manifest(files, text_folder, load_group_manifest(args.groups))
+    except (OSError, ValueError) as e:
+        print(f"Could not load groups from '{args.groups}': {e}")
+        sys.exit(1)
+    for name in [name for name, group_files in groups.items() if not group_files]:
+        print(f"Group '{name}' has no input files, skipped.")
+        del groups[name]
+    if not groups:
+        print("No input file belongs to a group.")
+        sys.exit(1)
+
+    base_name = args.output_name or os.path.splitext(os.path.basename(ttf_file))[0]
+    try:
+        output_names = group_output_names(base_name, list(groups), args.core_font)
+    except ValueError as e:
+        print(f"Invalid groups: {e}")
+        sys.exit(1)
+
+    accepted = {name: split_char_set(chars, policy)[0] for name, chars in group_chars(groups, per_file_chars).items()}
+    group_policy = policy
+    # (output name, characters, policy) of every font to build
+    fonts = []
+    if args.core_font:
+        core_chars, accepted = split_core(accepted, args.core_min_groups)
+        # the always-included characters only need to be in the core font
+        group_policy = CharPolicy(always_include=[])
+        fonts.append((output_names[None], core_chars, policy))
+    for name, chars in accepted.items():
+        if chars:
+            fonts.append((output_names[name], chars, group_policy))
+        else:
+            print(f"Group '{name}' only uses core characters, no group font needed.")
+
+    print()
+    print()
+    print(f"=== Starting Group Font Generation ({len(fonts)} fonts) ===")
+    chunk_files = {}
+    for output_name, chars, _ in fonts:
+        chunk_files[output_name] = os.path.join(char2chunkFolder, f"group_{output_name}_{len(chars)}.txt")
+        save_char_set(chars, chunk_files[output_name])
+    by_name = {output_name: (chars, font_policy) for output_name, chars, font_policy in fonts}
+
+    def build_one(job):
+        chars, font_policy = by_name[job.output_name]
+        return generate_font(args, chars, chunk_files[job.output_name], job.ttf_file, job.output_name, job.font_size, font_policy,
+                             fallback_ttf_files, tiers)
+
+    jobs = [BatchJob(ttf_file, args.font_size, output_name) for output_name, _, _ in fonts]
+    workers = args.batch_workers if args.batch_workers > 0 else min(len(jobs), os.cpu_count() or 1)
+    with profiler.stage("fontgen"):
+        results = run_batch(jobs, build_one, workers)
+    print_batch_report(results)
+    ok = {r.job.output_name for r in results if r.ok}
+
+    def font_entry(output_name):
+        return {"fnt": output_name + ".fnt" if output_name in ok else None, "chars": len(by_name[output_name][0])}
+
+    output_folder = os.path.dirname(resolve_output_fnt(ttf_file, args.fnt_folder, base_name))
+    core = font_entry(output_names[None]) if args.core_font else None
+    index = {}
+    for name, group_files in groups.items():
+        output_name = output_names[name]
+        font = font_entry(output_name) if output_name in by_name else {"fnt": None, "chars": 0}
+        index[name] = dict(font, files=[relative_input_path(f, text_folder) for f in group_files])
+    write_group_index(os.path.join(output_folder, f"{base_name}_groups.json"), core, index)
+
+    if args.analyze:
+        for output_name in sorted(ok):
+            print_atlas_report(analyze_atlas(resolve_output_fnt(ttf_file, args.fnt_folder, output_name) + ".fnt"))
+    if len(ok) < len(results):
+        sys.exit(1)
+
+
+def run_auto_size(args, accepted_chars, char_chunk_file, ttf_file, output_name, policy, fallback_ttf_files, tiers):
+    """Return (font size, fontgen config overrides) chosen by --auto-size, or exit if nothing fits."""
+    from source.util.fontgen import resolve_output_fnt
+
+    budget = SizeBudget(
+        max_pages=args.max_pages,
+        max_texture_bytes=None if args.max_texture_mb is None else int(args.max_texture_mb * 1024 * 1024),
+    )
+    print()
+    print()
+    print(f"=== Auto-sizing (font size {args.min_font_size}-{args.font_size}) ===")
+
+    trial_root = os.path.join(workspace_folder, "temp")
+    os.makedirs(trial_root, exist_ok=True)
+    trial_folder = tempfile.mkdtemp(prefix="auto_size_", dir=trial_root)
+
+    def generate(font_size, overrides):
+        folder = os.path.join(trial_folder, str(len(os.listdir(trial_folder))))
+        ok = generate_font(args, accepted_chars, char_chunk_file, ttf_file, output_name, font_size, policy, fallback_ttf_files, tiers,
+                           config_overrides=overrides, fnt_folder=folder, export=False)
+        return resolve_output_fnt(ttf_file, folder, output_name) + ".fnt" if ok else None
+
+    try:
+        best, trials = auto_size(generate, budget, args.font_size, args.min_font_size, size_candidates(args.page_sizes, args.spacings))
+    finally:
+        shutil.rmtree(trial_folder, ignore_errors=True)
+
+    if best is None:
+        print(f"No atlas within the budget down to font size {args.min_font_size} ({len(trials)} trials).")
+        sys.exit(1)
+    safe_print(f"📐  auto-size picked font size {best.font_size} {best.overrides or ''} after {len(trials)} trials")
+    return best.font_size, best.overrides
+
+
+def run_watch_mode(args, policy, per_file_chars, accepted_chars, regenerate):
+    from source.util.scan_corpus import extract_file_chars
+    from source.util.watch_folder import CharRefCount, FolderWatcher
+
+    running = CharRefCount()
+    for file_path, chars in per_file_chars.items():
+        running.set_file(file_path, chars)
+
+    watcher = FolderWatcher(
+        text_folder,
+        lambda: find_input_files(args),
+        poll_interval=args.watch_interval,
+        debounce=args.watch_debounce,
+    )
+    print()
+    print()
+    print(f"=== Watching {text_folder} for changes ({'inotify' if watcher.uses_inotify else 'polling'}). Press Ctrl+C to stop. ===")
+    try:
+        while True:
+            changed = watcher.wait_for_changes()
+            for file_path in sorted(changed):
+                if not input_exists(file_path):
+                    print(f"Removed: {file_path}")
+                    running.remove_file(file_path)
+                    continue
+                try:
+                    chars = extract_file_chars(
+                        file_path,
+                        args.treat_xml_as_text,
+                        args.chunk_size,
+                        normalizer=make_normalizer(args),
+                        xml_selection=make_xml_selection(args),
+                    ).to_string()
+                except ARCHIVE_ERRORS + (UnicodeDecodeError,) as e:
+                    # usually a file (or archive) caught mid-save; the next change event retries it
+                    print(f"Could not read {file_path}: {e}")
+                    continue
+                print(f"Changed: {file_path}")
+                running.set_file(file_path, chars)
+
+            new_accepted, new_excluded = split_char_set(running.char_set(), policy)
+            if new_accepted == accepted_chars:
+                print("No change in accepted characters, font generation skipped.")
+                continue
+
+            added = len(set(new_accepted) - set(accepted_chars))
+            removed = len(set(accepted_chars) - set(new_accepted))
+            print(f"Accepted characters changed (+{added} / -{removed}), regenerating font.")
+            accepted_chars = new_accepted
+            regenerate(new_accepted, new_excluded)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()
+
+
+def find_input_files(args):
+    return discover_files(text_folder, recursive=not args.no_recursive, include=args.include, exclude=args.exclude)
+
+
+def finish_profiling(args):
+    if profiler.active is None:
+        return
+    if args.profile:
+        profiler.active.print_summary()
+    if args.report_json:
+        profiler.active.write_json(args.report_json)
+
+
+def main():
+    args = parse_args()
+    if args.jobs < 0:
+        print(f"Invalid number of jobs: {args.jobs}. Use 0 for one per CPU core.")
+        sys.exit(1)
+    if args.watch and (args.batch or args.batch_glob):
+        print("--watch cannot be combined with batch mode.")
+        sys.exit(1)
+    if args.batch and args.batch_glob:
+        print("Use either --batch or --batch-glob, not both.")
+        sys.exit(1)
+    if args.frequency_tiers and args.shards > 1:
+        print("--frequency-tiers already splits the characters, do not combine it with --shards.")
+        sys.exit(1)
+    if args.frequency_tiers and args.watch:
+        print("--frequency-tiers cannot be combined with --watch (frequencies are not tracked while watching).")
+        sys.exit(1)
+    if args.groups and (args.batch or args.batch_glob or args.watch or args.auto_size):
+        print("--groups cannot be combined with batch, watch or auto-size mode.")
+        sys.exit(1)
+    if args.core_font and not args.groups:
+        print("--core-font needs --groups.")
+        sys.exit(1)
+    if args.core_min_groups < 2:
+        print(f"Invalid --core-min-groups {args.core_min_groups}: it must be at least 2.")
+        sys.exit(1)
+    if args.auto_size:
+        if args.max_pages is None and args.max_texture_mb is None:
+            print("--auto-size needs a budget: --max-pages and/or --max-texture-mb.")
+            sys.exit(1)
+        if args.batch or args.batch_glob or args.watch or args.incremental:
+            print("--auto-size only works for a single build (not with batch, watch or incremental mode).")
+            sys.exit(1)
+        if not 0 < args.min_font_size <= args.font_size:
+            print(f"Invalid --min-font-size {args.min_font_size}: it must be between 1 and the font size ({args.font_size}).")
+            sys.exit(1)
+    if args.optimize_png and args.incremental:
+        print("--optimize-png cannot be combined with --incremental (rewritten pages would invalidate the atlas manifest).")
+        sys.exit(1)
+    if args.glyph_cache and (args.incremental or args.shards > 1 or args.frequency_tiers):
+        print("--glyph-cache cannot be combined with --incremental, --shards or --frequency-tiers.")
+        sys.exit(1)
+    if args.incremental and args.fallback_ttf:
+        print("--incremental cannot be combined with --fallback-ttf (fallback pages are merged into the .fnt on every build).")
+        sys.exit(1)
+    if args.fallback_ttf and args.no_coverage_filter:
+        print("--fallback-ttf needs the coverage filter, do not combine it with --no-coverage-filter.")
+        sys.exit(1)
+    if args.shards <= 0:
+        print(f"Invalid number of shards: {args.shards}. It must be a positive number.")
+        sys.exit(1)
+    if args.fontgen_timeout is not None and args.fontgen_timeout <= 0:
+        print(f"Invalid fontgen timeout: {args.fontgen_timeout}. It must be a positive number of seconds.")
+        sys.exit(1)
+    if args.chunk_size <= 0:
+        print(f"Invalid chunk size: {args.chunk_size}. It must be a positive number.")
+        sys.exit(1)
+
+    try:
+        selection = make_xml_selection(args)
+    except ValueError as e:
+        print(f"Invalid XML selector: {e}")
+        sys.exit(1)
+    if selection is not None and args.treat_xml_as_text:
+        print("--xml-include / --xml-exclude / --xml-attribute cannot be combined with --treat-xml-as-text.")
+        sys.exit(1)
+
+    policy = default_char_policy()
+    if args.char_policy:
+        try:
+            policy = load_char_policy(args.char_policy)
+        except (OSError, ValueError) as e:
+            print(f"Could not load character policy '{args.char_policy}': {e}")
+            sys.exit(1)
+
+    if args.profile or args.report_json:
+        profiler.active = profiler.Profiler()
+    from source.util import fontgen
+    fontgen.quiet = args.quiet
+    fontgen.fontgen_timeout = args.fontgen_timeout
+    if args.fontgen:
+        fontgen.fontgen_command = args.fontgen
+    if args.glyph_cache:
+        from source.util.glyph_cache import DEFAULT_GLYPH_CACHE_FOLDER
+        fontgen.glyph_cache_folder = DEFAULT_GLYPH_CACHE_FOLDER
+
+    try:
+        run(args, policy)
+    finally:
+        finish_profiling(args)
+
+
+def run(args, policy):
+    global text_folder
+    text_folder = args.text_folder
+
+    pwd = os.getcwd()
+    # log present working directory
+    print("Present Working Directory:", pwd)
+
+    # create workspace/text folder if not exists
+    if not os.path.exists(text_folder):
+        os.makedirs(text_folder)
+        # ask user to add text files in the folder and exit
+        print(f"Text folder created at {text_folder}. Please add text files ({', '.join(supported_extensions())}) and run again.")
+        sys.exit(1)
+
+    with profiler.stage("discovery"):
+        textFolderFiles = find_input_files(args)
+
+    # if no text files found, exit
+    if len(textFolderFiles) == 0:
+        print(f"No text files found in the specified folder. ({text_folder}) Please add text files ({', '.join(supported_extensions())}) and run again.")
+        sys.exit(1)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    normalizer = make_normalizer(args)
+    selection = make_xml_selection(args)
+    cache = None
+    if not args.no_cache:
+        # options that change what is extracted from a file invalidate the cache
+        cache = ExtractCache(extract_cache_file, extract_options(args.treat_xml_as_text, normalizer, selection))
+
+    per_file_chars = {}
+    frequencies = Counter() if args.frequency_tiers else None
+    raw_chars = CodepointSet() if normalizer is not None else None
+    with profiler.stage("extraction"):
+        char_set = scan_files(
+            textFolderFiles,
+            jobs,
+            args.treat_xml_as_text,
+            args.chunk_size,
+            cache,
+            per_file=per_file_chars,
+            frequencies=frequencies,
+            normalizer=normalizer,
+            raw_chars=raw_chars,
+            xml_selection=selection,
+            profiler=profiler.active,
+            verbose=not args.quiet,
+        )
+
+        if cache is not None:
+            cache.prune(textFolderFiles)
+            cache.save()
+
+    with profiler.stage("split"):
+        accepted_chars, excluded_chars = split_char_set(char_set, policy)
+        tiers = None
+        if frequencies is not None:
+            accepted_chars = order_by_frequency(accepted_chars, frequencies)
+            tiers = FrequencyTiers(frequencies, args.frequency_tiers)
+
+    with profiler.stage("save"):
+        outFileAccepted = save_chunk_files(accepted_chars, excluded_chars, frequencies)
+        if normalizer is not None:
+            report = normalization_report(raw_chars, char_set, normalizer, policy.skip)
+            print_normalization_report(report)
+            write_normalization_report(report, os.path.join(char2chunkFolder, "normalization.tsv"))
 
 
     print()
@@ -113,6 +668,18 @@ def main():
     for i, f in enumerate(ttfFiles):
         print(f"{i + 1}. {f}")
 
+    fallback_ttf_files = []
+    for name in args.fallback_ttf or []:
+        fallback_ttf_file = resolve_ttf_file(ttf_folder, name)
+        if fallback_ttf_file is None:
+            print(f"Could not find fallback TTF file '{name}' in {ttf_folder}.")
+            sys.exit(1)
+        fallback_ttf_files.append(fallback_ttf_file)
+
+    if args.batch or args.batch_glob:
+        run_batch_mode(args, accepted_chars, outFileAccepted, policy, fallback_ttf_files, tiers)
+        return
+
     # default: pick the first ttf file found
     selectedTtfFile = ttfFiles[0]
 
@@ -130,6 +697,10 @@ def main():
 
     ttf_file = os.path.join(ttf_folder, selectedTtfFile)
 
+    if args.groups:
+        run_group_mode(args, per_file_chars, policy, ttf_file, fallback_ttf_files, tiers)
+        return
+
 
     print()
     print()
@@ -147,15 +718,38 @@ def main():
         print(f"Using default FNT output name based on TTF filename. ({selectedTtfFile})")
 
 
-    from source.util.fontgen import use_fontgen
-    use_fontgen(
-        char_chunk_file=char_chunk_file,
-        ttf_file=ttf_file,
-        font_size=args.font_size,
-        custom_fnt_output_folder=args.fnt_folder,
-        custom_fnt_output_name=custom_fnt_output_name,
-    )
+    if fallback_ttf_files:
+        print("Fallback TTF Files:", ", ".join(fallback_ttf_files))
+
+    font_size, config_overrides = args.font_size, None
+    if args.auto_size:
+        with profiler.stage("auto_size"):
+            font_size, config_overrides = run_auto_size(
+                args, accepted_chars, char_chunk_file, ttf_file, custom_fnt_output_name, policy, fallback_ttf_files, tiers
+            )
+
+    with profiler.stage("fontgen"):
+        ok = generate_font(args, accepted_chars, char_chunk_file, ttf_file, custom_fnt_output_name, font_size, policy, fallback_ttf_files, tiers,
+                           config_overrides=config_overrides)
+
+    if args.analyze and ok:
+        from source.util.fontgen import resolve_output_fnt
+
+        print_atlas_report(analyze_atlas(resolve_output_fnt(ttf_file, args.fnt_folder, custom_fnt_output_name) + ".fnt"))
+
+    if args.watch:
+        # report the initial build now, watch mode only ends with Ctrl+C
+        finish_profiling(args)
+        profiler.active = None
+
+        def regenerate(new_accepted, new_excluded):
+            new_chunk_file = save_chunk_files(new_accepted, new_excluded)
+            generate_font(args, new_accepted, new_chunk_file, ttf_file, custom_fnt_output_name, args.font_size, policy, fallback_ttf_files)
+
+        run_watch_mode(args, policy, per_file_chars, accepted_chars, regenerate)
 
 
 if __name__ == "__main__":
+    # required for the process pool when running as a frozen (PyInstaller) exe
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file